@@ -12,6 +12,15 @@ from app.models.ingredient import Ingredient
 from app.models.game import Game
 from app.models.activity import ActivityLog
 from app.models.notification import Notification
+from app.models.recipe_view import RecipeViewSketch
+from app.models.revoked_token import RevokedToken
+from app.models.rate_limit import RateLimitCounter
+from app.models.otp import OtpCode
+from app.models.email_outbox import OutboxEmail
+from app.models.notification_counter import NotificationCounter
+from app.models.notification_broadcast import NotificationBroadcast
+from app.models.notification_archive import ArchivedNotification
+from app.models.chat_message import ChatMessage
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,26 @@
+"""Add digested_at to notifications
+
+Revision ID: 0a6d4e2b9c71
+Revises: f3b8d1a6c092
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6d4e2b9c71'
+down_revision: Union[str, None] = 'f3b8d1a6c092'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notifications', sa.Column('digested_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('notifications', 'digested_at')
@@ -0,0 +1,34 @@
+"""Add recipe view sketches for unique viewer estimates
+
+Revision ID: 3f9c2a7d1b64
+Revises: abcd1234efgh
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a7d1b64'
+down_revision: Union[str, None] = 'abcd1234efgh'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('recipe_view_sketches',
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('registers', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('recipe_id', 'day')
+    )
+    op.create_index('ix_recipe_view_sketches_day', 'recipe_view_sketches', ['day'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_recipe_view_sketches_day', table_name='recipe_view_sketches')
+    op.drop_table('recipe_view_sketches')
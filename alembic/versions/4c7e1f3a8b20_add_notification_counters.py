@@ -0,0 +1,43 @@
+"""Add notification_counters and the notifications (recipient_id, is_read, created_at) index
+
+Revision ID: 4c7e1f3a8b20
+Revises: 0a6d4e2b9c71
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c7e1f3a8b20'
+down_revision: Union[str, None] = '0a6d4e2b9c71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_notifications_recipient_read_created', 'notifications',
+                    ['recipient_id', 'is_read', 'created_at'], unique=False)
+    op.create_table(
+        'notification_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('unread', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    # Backfill from existing history (uses the new index)
+    op.execute(
+        "INSERT INTO notification_counters (user_id, unread, updated_at) "
+        "SELECT n.recipient_id, COUNT(*), CURRENT_TIMESTAMP FROM notifications n "
+        "JOIN users u ON u.id = n.recipient_id "
+        "WHERE n.is_read = false GROUP BY n.recipient_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('notification_counters')
+    op.drop_index('ix_notifications_recipient_read_created', table_name='notifications')
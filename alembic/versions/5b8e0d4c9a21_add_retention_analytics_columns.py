@@ -0,0 +1,30 @@
+"""Add game completion time and activity log index for retention analytics
+
+Revision ID: 5b8e0d4c9a21
+Revises: 3f9c2a7d1b64
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e0d4c9a21'
+down_revision: Union[str, None] = '3f9c2a7d1b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user_game_progress', sa.Column('completed_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_user_game_progress_completed_at', 'user_game_progress', ['completed_at'], unique=False)
+    op.create_index('ix_activity_logs_action_timestamp', 'activity_logs', ['action', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_activity_logs_action_timestamp', table_name='activity_logs')
+    op.drop_index('ix_user_game_progress_completed_at', table_name='user_game_progress')
+    op.drop_column('user_game_progress', 'completed_at')
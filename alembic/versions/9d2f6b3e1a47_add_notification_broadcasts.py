@@ -0,0 +1,49 @@
+"""Add notification_broadcasts
+
+Revision ID: 9d2f6b3e1a47
+Revises: 4c7e1f3a8b20
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2f6b3e1a47'
+down_revision: Union[str, None] = '4c7e1f3a8b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_broadcasts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('message', sa.String(), nullable=False),
+        sa.Column('type', sa.String(), nullable=True),
+        sa.Column('language', sa.String(), nullable=True),
+        sa.Column('active_only', sa.Boolean(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('sent', sa.Integer(), nullable=False),
+        sa.Column('last_user_id', sa.Integer(), nullable=False),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_notification_broadcasts_id'), 'notification_broadcasts', ['id'], unique=False)
+    op.create_index('ix_notification_broadcasts_status', 'notification_broadcasts', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_broadcasts_status', table_name='notification_broadcasts')
+    op.drop_index(op.f('ix_notification_broadcasts_id'), table_name='notification_broadcasts')
+    op.drop_table('notification_broadcasts')
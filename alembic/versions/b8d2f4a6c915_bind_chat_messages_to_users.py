@@ -0,0 +1,54 @@
+"""Bind chat_messages to users
+
+Revision ID: b8d2f4a6c915
+Revises: a3c7e9f1d284
+Create Date: 2026-10-19 23:00:00.000000
+
+Rows written so far belong to no user and were readable by anyone who
+guessed a client_id; they are dropped with the old table.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d2f4a6c915'
+down_revision: Union[str, None] = 'a3c7e9f1d284'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_chat_messages_client_id_id', table_name='chat_messages')
+    op.drop_table('chat_messages')
+    op.create_table(
+        'chat_messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('client_id', sa.String(), nullable=False),
+        sa.Column('role', sa.String(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_chat_messages_user_client_id', 'chat_messages', ['user_id', 'client_id', 'id'], unique=False)
+    op.create_index('ix_chat_messages_created_at', 'chat_messages', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_messages_created_at', table_name='chat_messages')
+    op.drop_index('ix_chat_messages_user_client_id', table_name='chat_messages')
+    op.drop_table('chat_messages')
+    op.create_table(
+        'chat_messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('client_id', sa.String(), nullable=False),
+        sa.Column('role', sa.String(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_chat_messages_client_id_id', 'chat_messages', ['client_id', 'id'], unique=False)
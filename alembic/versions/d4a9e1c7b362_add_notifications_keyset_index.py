@@ -0,0 +1,26 @@
+"""Add the notifications (recipient_id, created_at, id) index for keyset pages
+
+Revision ID: d4a9e1c7b362
+Revises: b6e2c8f4d153
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a9e1c7b362'
+down_revision: Union[str, None] = 'b6e2c8f4d153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_notifications_recipient_created_id', 'notifications',
+                    ['recipient_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_recipient_created_id', table_name='notifications')
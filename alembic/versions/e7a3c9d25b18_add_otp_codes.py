@@ -0,0 +1,41 @@
+"""Add otp_codes table
+
+Revision ID: e7a3c9d25b18
+Revises: c41e9b7f2d05
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c9d25b18'
+down_revision: Union[str, None] = 'c41e9b7f2d05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'otp_codes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('purpose', sa.String(length=32), nullable=False),
+        sa.Column('code_hash', sa.String(length=64), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email', 'purpose', name='uq_otp_codes_email_purpose'),
+    )
+    op.create_index(op.f('ix_otp_codes_id'), 'otp_codes', ['id'], unique=False)
+    op.create_index(op.f('ix_otp_codes_expires_at'), 'otp_codes', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_otp_codes_expires_at'), table_name='otp_codes')
+    op.drop_index(op.f('ix_otp_codes_id'), table_name='otp_codes')
+    op.drop_table('otp_codes')
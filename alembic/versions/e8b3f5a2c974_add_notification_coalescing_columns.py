@@ -0,0 +1,32 @@
+"""Add group_key, event_count and actors to notifications (and the archive)
+
+Revision ID: e8b3f5a2c974
+Revises: d4a9e1c7b362
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3f5a2c974'
+down_revision: Union[str, None] = 'd4a9e1c7b362'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ('notifications', 'notifications_archive'):
+        op.add_column(table, sa.Column('group_key', sa.String(), nullable=True))
+        op.add_column(table, sa.Column('event_count', sa.Integer(), nullable=False, server_default='1'))
+        op.add_column(table, sa.Column('actors', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in ('notifications_archive', 'notifications'):
+        op.drop_column(table, 'actors')
+        op.drop_column(table, 'event_count')
+        op.drop_column(table, 'group_key')
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, recipes, chat, ingredients, analytics, games, notifications, cloudinary
+from app.api.v1.endpoints import auth, users, recipes, chat, ingredients, analytics, games, notifications, cloudinary, metrics
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -10,4 +10,5 @@ api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
 api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
 api_router.include_router(games.router, prefix="/games", tags=["games"])
 api_router.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
-api_router.include_router(cloudinary.router, prefix="/cloudinary", tags=["cloudinary"])
\ No newline at end of file
+api_router.include_router(cloudinary.router, prefix="/cloudinary", tags=["cloudinary"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
\ No newline at end of file
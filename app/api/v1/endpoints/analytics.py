@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, extract
 from datetime import datetime, timedelta
 
@@ -10,6 +10,11 @@ from app.models.game import Game
 from app.models.activity import ActivityLog
 from app.core import security
 from app.schemas.recipe import RecipeOut
+from app.core.config import settings
+from app.core.hyperloglog import HyperLogLog
+from app.crud import crud_recipe_view, crud_activity, crud_analytics
+from app.services.view_tracker import view_tracker
+from app.services import cohort_analytics
 
 router = APIRouter()
 
@@ -19,26 +24,38 @@ def get_dashboard_overview(
     current_user_id: int = Depends(security.get_current_user) 
 ):
     # 1. TOP CARDS (Counts + Growth Logic)
-    total_recipes = db.query(Recipe).count()
-    total_users = db.query(User).count()
-    total_games = db.query(Game).count()
-
     # Calculate "Growth %" (Simple logic: Users joined in last 30 days)
     last_month = datetime.utcnow() - timedelta(days=30)
-    new_users = db.query(User).filter(User.joined_at >= last_month).count()
+
+    # All independent counts in one round trip (see crud_analytics.fetch_counts)
+    counts = crud_analytics.fetch_counts(db, {
+        "total_recipes": crud_analytics.count_of(Recipe),
+        "total_users": crud_analytics.count_of(User),
+        "total_games": crud_analytics.count_of(Game),
+        "new_users": crud_analytics.count_of(User, User.joined_at >= last_month),
+        "new_recipes": crud_analytics.count_of(Recipe, Recipe.created_at >= last_month),
+        "new_games": crud_analytics.count_of(Game, Game.created_at >= last_month),
+    })
+    total_recipes = counts["total_recipes"]
+    total_users = counts["total_users"]
+    total_games = counts["total_games"]
+    new_users = counts["new_users"]
     
     # Avoid division by zero
     previous_users = total_users - new_users
     user_growth_pct = round((new_users / previous_users * 100), 1) if previous_users > 0 else 100
 
-    previous_recipes = total_recipes - db.query(Recipe).filter(Recipe.created_at >= last_month).count()
+    previous_recipes = total_recipes - counts["new_recipes"]
     recipe_growth_pct = round((new_users / previous_recipes * 100), 1) if previous_recipes > 0 else 100
     
-    previous_games = total_games - db.query(Game).filter(Game.created_at >= last_month).count()
+    previous_games = total_games - counts["new_games"]
     game_growth_pct = round((new_users / previous_games * 100), 1) if previous_games > 0 else 100
 
     # 2. RECENT ACTIVITY FEED
+    # Recipe views are logged for retention analytics but would flood the feed
     activities = db.query(ActivityLog)\
+        .options(joinedload(ActivityLog.user))\
+        .filter(ActivityLog.action != crud_activity.ACTION_VIEWED_RECIPE)\
         .order_by(ActivityLog.timestamp.desc())\
         .limit(5)\
         .all()
@@ -70,12 +87,18 @@ def get_dashboard_overview(
         .limit(5)\
         .all()
 
+    view_tracker.flush(db)
+    unique_views = crud_recipe_view.get_unique_viewers(
+        db, [r.id for r in top_recipes], since=_unique_views_since()
+    )
+
     top_recipes_data = []
     for r in top_recipes:
         top_recipes_data.append({
             "id": r.id,
             "name": r.title,
             "views": r.views_count,
+            "unique_views": unique_views[r.id],
             "favorites": r.favorites_count,
             # If you add Reviews later, calculate average rating here
             "rating": 4.5, 
@@ -97,21 +120,12 @@ def get_dashboard_overview(
         "top_recipes": top_recipes_data
     }
 # analytics
-# Helper function to calculate growth
-def calculate_growth(db: Session, model, date_column):
-    # 1. Get Total Count
-    total_count = db.query(model).count()
-    
-    # 2. Get Count from 30 days ago
-    last_month_date = datetime.utcnow() - timedelta(days=30)
-    
-    # Note: This assumes your models have a date column (joined_at, created_at)
-    # If a model doesn't have one, return 0 growth
-    if not hasattr(model, date_column):
-        return total_count, 0.0
-
-    previous_count = db.query(model).filter(getattr(model, date_column) < last_month_date).count()
+def _unique_views_since():
+    # Unique views cover the last UNIQUE_VIEWS_WINDOW_DAYS days (today included)
+    return datetime.utcnow().date() - timedelta(days=settings.UNIQUE_VIEWS_WINDOW_DAYS - 1)
 
+# Helper function to calculate growth
+def calculate_growth(total_count: int, previous_count: int):
     if previous_count == 0:
         growth = 100.0 if total_count > 0 else 0.0
     else:
@@ -127,14 +141,24 @@ def get_analytics_page(db: Session = Depends(get_db)):
     """
     
     # 1. Calculate Stats & Growth
+    # Compare today's totals with the totals as of 30 days ago, all in one round trip
+    last_month_date = datetime.utcnow() - timedelta(days=30)
+    counts = crud_analytics.fetch_counts(db, {
+        "users": crud_analytics.count_of(User),
+        "users_previous": crud_analytics.count_of(User, User.joined_at < last_month_date),
+        "recipes": crud_analytics.count_of(Recipe),
+        "recipes_previous": crud_analytics.count_of(Recipe, Recipe.created_at < last_month_date),
+        "games": crud_analytics.count_of(Game),
+    })
+
     # Users (uses 'joined_at')
-    user_count, user_growth = calculate_growth(db, User, "joined_at")
+    user_count, user_growth = calculate_growth(counts["users"], counts["users_previous"])
     
-    # Recipes (uses 'created_at' - ensure your Recipe model has this, otherwise add it)
-    recipe_count, recipe_growth = calculate_growth(db, Recipe, "created_at")
+    # Recipes (uses 'created_at')
+    recipe_count, recipe_growth = calculate_growth(counts["recipes"], counts["recipes_previous"])
     
     # Games (Assuming Game model doesn't store created_at, we might mock this or add the column)
-    game_count = db.query(Game).count()
+    game_count = counts["games"]
     game_growth = 0.0 # Placeholder if no date column exists
 
     # 2. Get Most Popular Recipes
@@ -144,6 +168,11 @@ def get_analytics_page(db: Session = Depends(get_db)):
         .limit(10)\
         .all()
 
+    view_tracker.flush(db)
+    unique_views = crud_recipe_view.get_unique_viewers(
+        db, [r.id for r in popular_recipes], since=_unique_views_since()
+    )
+
     # 3. Construct JSON
     return {
         "stats": {
@@ -163,5 +192,48 @@ def get_analytics_page(db: Session = Depends(get_db)):
                 "label": "Up from last month"
             }
         },
-        "popular_recipes": [RecipeOut.model_validate(r) for r in popular_recipes]
-    }
\ No newline at end of file
+        "popular_recipes": [
+            {**RecipeOut.model_validate(r).model_dump(), "unique_views": unique_views[r.id]}
+            for r in popular_recipes
+        ]
+    }
+
+
+@router.get("/recipes/{recipe_id}/unique-viewers")
+def get_recipe_unique_viewers(
+    recipe_id: int,
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(security.get_current_user)
+):
+    """
+    Daily unique-viewer estimates for a recipe (HyperLogLog).
+    Each value has a relative standard error of `error_rate`.
+    """
+    view_tracker.flush(db)
+    daily = crud_recipe_view.get_daily_unique_viewers(db, recipe_id, days=days)
+    total = crud_recipe_view.get_unique_viewers(
+        db, [recipe_id], since=datetime.utcnow().date() - timedelta(days=days - 1)
+    )[recipe_id]
+
+    return {
+        "recipe_id": recipe_id,
+        "error_rate": round(HyperLogLog.standard_error(settings.HLL_PRECISION), 4),
+        "unique_viewers": total,
+        "daily": daily
+    }
+
+
+@router.get("/cohorts")
+def get_cohort_retention(
+    weeks: int = Query(12, ge=1, le=52),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(security.get_current_user)
+):
+    """
+    Weekly signup cohorts and their return rates (recipes viewed, favorites,
+    games completed, any). retention[metric][cohort][week] is the share of the
+    cohort active in that week after signup; null means the week hasn't happened yet.
+    Computed once per day.
+    """
+    return cohort_analytics.get_cohorts(db, weeks=weeks)
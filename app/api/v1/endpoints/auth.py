@@ -3,14 +3,16 @@ from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic.v1 import BaseModel, EmailStr
 from sqlalchemy.orm import Session
-import random
-import string
-import os
-from typing import Annotated
+from starlette.concurrency import run_in_threadpool
+from typing import Annotated, Optional
 from app.database import get_db
-from app.core import security
+from app.core import security, password_hashing
 from app.core.config import settings
-from app.crud import crud_user
+from app.core.principal import invalidate_principal
+from app.core.email_utils import smtp_configured, otp_email, verification_email
+from app.core.mailer import mailer
+from app.core.notification_coalescer import coalescer
+from app.crud import crud_user, crud_otp
 from app.schemas.token import Token, RefreshTokenRequest 
 from app.schemas.auth import LoginRequest
 from app.schemas.user import (
@@ -29,62 +31,54 @@ from app.crud import crud_notification
 from app.schemas.notification import NotificationCreate
 from jose import jwt, JWTError
 
-# Email Logic Import (Try/Except allows code to run even if haven't created the email util yet)
-try:
-    from app.core.email_utils import send_otp_email, send_email_verification_otp
-except ImportError:
-    send_otp_email = None
-    send_email_verification_otp = None
-
 router = APIRouter()
 
 # HELPER: OTP SENDER
-def deliver_otp(email: str, otp: str):
+def deliver_otp(db: Session, email: str, otp: str):
     """
-    Attempts to send OTP via Email. 
-    Falls back to Console Print if Email fails or isn't configured.
+    Queues the OTP email in the outbox (sent by the background workers).
+    Falls back to Console Print if SMTP isn't configured.
     """
-    email_sent = False
-    
-    # Try sending real email if utility exists and config is present
-    if send_otp_email and os.getenv("EMAIL_PASSWORD"):
-        print(f"📧 Attempting to send email to {email}...")
-        email_sent = send_otp_email(email, otp)
-    
+    if smtp_configured():
+        mailer.enqueue(db, email, *otp_email(otp))
+        return
+
     # Fallback to Console (For Development/Testing)
-    if not email_sent:
-        print(f"\n" + "="*50)
-        print(f"⚠️  EMAIL SIMULATION (SMTP not configured or failed)")
-        print(f"📨  To: {email}")
-        print(f"🔑  OTP CODE: {otp}")
-        print(f"="*50 + "\n")
+    print(f"\n" + "="*50)
+    print(f"⚠️  EMAIL SIMULATION (SMTP not configured)")
+    print(f"📨  To: {email}")
+    print(f"🔑  OTP CODE: {otp}")
+    print(f"="*50 + "\n")
 
 # HELPER: VERIFICATION OTP SENDER
-def deliver_verification_otp(email: str, otp: str):
+def deliver_verification_otp(db: Session, email: str, otp: str):
     """
-    Attempts to send Verification OTP via Email using the Welcome template. 
+    Queues the Verification OTP email (Welcome template) in the outbox.
     """
-    email_sent = False
-    
-    if send_email_verification_otp and os.getenv("EMAIL_PASSWORD"):
-        print(f"📧 Attempting to send verification email to {email}...")
-        email_sent = send_email_verification_otp(email, otp)
-    
+    if smtp_configured():
+        mailer.enqueue(db, email, *verification_email(otp))
+        return
+
     # Fallback to Console (For Development/Testing)
-    if not email_sent:
-        print(f"\n" + "="*50)
-        print(f"⚠️  EMAIL SIMULATION (SMTP not configured or failed)")
-        print(f"📨  To: {email}")
-        print(f"🔑  VERIFICATION OTP CODE: {otp}")
-        print(f"="*50 + "\n")
+    print(f"\n" + "="*50)
+    print(f"⚠️  EMAIL SIMULATION (SMTP not configured)")
+    print(f"📨  To: {email}")
+    print(f"🔑  VERIFICATION OTP CODE: {otp}")
+    print(f"="*50 + "\n")
+
+def save_password_hash(db: Session, user: User, hashed_password: str):
+    """Sync, for run_in_threadpool from the async handlers."""
+    user.hashed_password = hashed_password
+    db.commit()
 
 # 1. SIGN UP (Step 1: Create Inactive User & Send OTP)
 @router.post("/signup")
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user. The account will be inactive until the email is verified with an OTP.
+    Async only to await the hashing pool: every DB and mail call goes through the threadpool.
     """
-    db_user = crud_user.get_user_by_email(db, email=user.email)
+    db_user = await run_in_threadpool(crud_user.get_user_by_email, db, email=user.email)
     
     if db_user:
         if db_user.is_active:
@@ -95,25 +89,25 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         # If user exists but is NOT active, we just generate a new OTP and resend it
     else:
         # Create new user
-        db_user = crud_user.create_user(db, user=user)
-        # Force the user to be inactive initially
-        db_user.is_active = False 
-
-    # Generate 6-digit OTP
-    otp = "".join(random.choices(string.digits, k=6))
-    expiration = datetime.utcnow() + timedelta(minutes=10)
+        hashed_password = await password_hashing.hash_password(user.password)
+        # The user stays inactive until the email is verified
+        db_user = await run_in_threadpool(
+            crud_user.create_user, db, user=user, hashed_password=hashed_password, is_active=False
+        )
+    # Read before the next commit expires it (a reload would query on the event loop)
+    email = db_user.email
 
-    # Save OTP to database (reusing the reset_otp columns for simplicity)
-    db_user.reset_otp = otp
-    db_user.reset_otp_expires = expiration
-    db.commit()
+    # Generate 6-digit OTP (valid 10 minutes, stored hashed in otp_codes)
+    otp = await run_in_threadpool(
+        crud_otp.issue_otp, db, email, crud_otp.PURPOSE_EMAIL_VERIFICATION, ttl_minutes=10
+    )
 
     # Send the OTP
-    deliver_verification_otp(db_user.email, otp)
+    await run_in_threadpool(deliver_verification_otp, db, email, otp)
 
     return {
         "message": "Account created. Please check your email for the verification OTP.",
-        "email": db_user.email
+        "email": email
     }
 
 
@@ -131,25 +125,25 @@ def verify_email(
     if getattr(user, 'is_email_verified', False) and user.is_active:
         return {"message": "Account is already verified. You can log in."}
 
-    # Check if OTP matches
-    if not user.reset_otp or user.reset_otp != request.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
-
-    # Check if OTP expired
-    if user.reset_otp_expires and datetime.utcnow() > user.reset_otp_expires:
+    # Check the OTP (and use it up, so it can't be replayed)
+    result = crud_otp.verify_otp(db, request.email, crud_otp.PURPOSE_EMAIL_VERIFICATION, request.otp, consume=True)
+    if result == crud_otp.OTP_EXPIRED:
         raise HTTPException(status_code=400, detail="OTP has expired.")
+    if result != crud_otp.OTP_OK:
+        raise HTTPException(status_code=400, detail="Invalid OTP")
 
     # Success! Activate the user AND verify email
     user.is_active = True
     user.is_email_verified = True  # <--- THIS WAS THE MISSING LINE!
     
-    user.reset_otp = None
-    user.reset_otp_expires = None
-    
     # Forces SQLAlchemy to track the update and save
     db.add(user)      
     db.commit()       
     db.refresh(user)  
+    invalidate_principal(user.id)
+
+    # "New user joined" for the admins; signup bursts become one notification per window
+    coalescer.add(crud_user.get_admin_ids(db), "user_joined", actor=user.full_name or user.email)
 
     return {"message": "Email verified successfully! You can now log in."}
 
@@ -184,7 +178,7 @@ def verify_email(
 
 # 2. LOGIN (JSON - For Flutter/React)
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     # Annotated + Body to strictly define this as JSON Body
     login_data: Annotated[LoginRequest, Body()],
     db: Session = Depends(get_db)
@@ -196,8 +190,8 @@ def login(
       "password": "secretpassword"
     }
     """
-    # Authenticate
-    user = crud_user.authenticate_user(db, email=login_data.email, password=login_data.password)
+    # Authenticate (bcrypt runs in the hashing pool)
+    user = await crud_user.authenticate_user_async(db, email=login_data.email, password=login_data.password)
     
     if not user:
         raise HTTPException(
@@ -240,8 +234,8 @@ def refresh_access_token(
     Takes a valid refresh token and returns a new access token (and new refresh token).
     """
     try:
-        # Decode the refresh token
-        payload = jwt.decode(request.refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        # Decode the refresh token (rejects revoked ones, e.g. already rotated)
+        payload = security.decode_token(request.refresh_token)
         user_id: str = payload.get("sub")
         token_type: str = payload.get("type")
         
@@ -256,7 +250,8 @@ def refresh_access_token(
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="User not found or inactive")
 
-    # Generate NEW tokens
+    # Generate NEW tokens; the old refresh token can't be used again
+    security.revoke_token(request.refresh_token)
     new_access_token = security.create_access_token(subject=user.id)
     new_refresh_token = security.create_refresh_token(subject=user.id) # Issue a rotating refresh token
     
@@ -271,14 +266,14 @@ def refresh_access_token(
 
 # 3. LOGIN (Form Data - For Swagger UI Support)
 @router.post("/login/access-token", response_model=Token)
-def login_access_token(
+async def login_access_token(
     db: Session = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """
     OAuth2 compatible token login, required for the Swagger UI 'Authorize' button.
     """
-    user = crud_user.authenticate_user(db, email=form_data.username, password=form_data.password)
+    user = await crud_user.authenticate_user_async(db, email=form_data.username, password=form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -317,19 +312,11 @@ def forgot_password(
     if not user:
         return {"message": "If this email exists, an OTP has been sent."}
 
-    # Generate 6-digit OTP
-    otp = "".join(random.choices(string.digits, k=6))
-    
-    # Set expiration (10 minutes from now)
-    expiration = datetime.utcnow() + timedelta(minutes=10)
-
-    # Save to DB
-    user.reset_otp = otp
-    user.reset_otp_expires = expiration
-    db.commit()
+    # Generate 6-digit OTP (expires in 10 minutes)
+    otp = crud_otp.issue_otp(db, user.email, crud_otp.PURPOSE_PASSWORD_RESET, ttl_minutes=10)
 
     # Send the OTP
-    deliver_otp(user.email, otp)
+    deliver_otp(db, user.email, otp)
 
     return {"message": "OTP sent successfully"}
 
@@ -348,19 +335,17 @@ def resend_otp(
     if not user:
         return {"message": "OTP resent successfully"}
 
-    # 1. Generate a NEW 6-digit OTP
-    new_otp = "".join(random.choices(string.digits, k=6))
-    
-    # 2. Reset expiration (10 minutes from NOW)
-    expiration = datetime.utcnow() + timedelta(minutes=10)
+    # 1. Unverified accounts are still in the signup flow: resend the verification code
+    if not user.is_email_verified:
+        new_otp = crud_otp.issue_otp(db, user.email, crud_otp.PURPOSE_EMAIL_VERIFICATION, ttl_minutes=10)
+        deliver_verification_otp(db, user.email, new_otp)
+        return {"message": "OTP resent successfully"}
 
-    # 3. Update Database
-    user.reset_otp = new_otp
-    user.reset_otp_expires = expiration
-    db.commit()
+    # 2. Generate a NEW 6-digit OTP (replaces the previous one, 10 minutes from NOW)
+    new_otp = crud_otp.issue_otp(db, user.email, crud_otp.PURPOSE_PASSWORD_RESET, ttl_minutes=10)
 
-    # 4. Send the new OTP
-    deliver_otp(user.email, new_otp)
+    # 3. Send the new OTP
+    deliver_otp(db, user.email, new_otp)
 
     return {"message": "OTP resent successfully"}
 
@@ -377,20 +362,19 @@ def verify_otp(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Check matches
-    if not user.reset_otp or user.reset_otp != request.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
-
-    # Check expiration
-    if user.reset_otp_expires and datetime.utcnow() > user.reset_otp_expires:
+    # Check the code (it stays valid for /reset-password)
+    result = crud_otp.verify_otp(db, request.email, crud_otp.PURPOSE_PASSWORD_RESET, request.otp)
+    if result == crud_otp.OTP_EXPIRED:
         raise HTTPException(status_code=400, detail="OTP has expired")
+    if result != crud_otp.OTP_OK:
+        raise HTTPException(status_code=400, detail="Invalid OTP")
 
     return {"message": "OTP verified successfully"}
 
 
 # 6. RESET PASSWORD (Unauthenticated flow)
 @router.post("/reset-password")
-def reset_password(
+async def reset_password(
     request: ResetPasswordRequest,
     db: Session = Depends(get_db)
 ):
@@ -400,25 +384,30 @@ def reset_password(
     if request.new_password != request.confirm_password:
         raise HTTPException(status_code=400, detail="Passwords do not match")
 
-    user = crud_user.get_user_by_email(db, email=request.email)
+    user = await run_in_threadpool(crud_user.get_user_by_email, db, email=request.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Verify OTP again (Critical Security Step)
-    if user.reset_otp != request.otp:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
-    
-    if user.reset_otp_expires and datetime.utcnow() > user.reset_otp_expires:
+    result = await run_in_threadpool(
+        crud_otp.verify_otp, db, request.email, crud_otp.PURPOSE_PASSWORD_RESET, request.otp
+    )
+    if result == crud_otp.OTP_EXPIRED:
         raise HTTPException(status_code=400, detail="OTP has expired")
+    if result != crud_otp.OTP_OK:
+        raise HTTPException(status_code=400, detail="Invalid OTP")
+
+    hashed_password = await password_hashing.hash_password(request.new_password)
+
+    # Use up the OTP so it can't be reused (fails if a concurrent reset already did)
+    consumed = await run_in_threadpool(
+        crud_otp.verify_otp, db, request.email, crud_otp.PURPOSE_PASSWORD_RESET, request.otp, consume=True
+    )
+    if consumed != crud_otp.OTP_OK:
+        raise HTTPException(status_code=400, detail="Invalid OTP")
 
     # Update Password
-    user.hashed_password = security.get_password_hash(request.new_password)
-    
-    # Clear OTP so it can't be reused
-    user.reset_otp = None
-    user.reset_otp_expires = None
-    
-    db.commit()
+    await run_in_threadpool(save_password_hash, db, user, hashed_password)
 
     return {"message": "Password reset successfully. Please login."}
 
@@ -443,34 +432,11 @@ def send_verification_otp(
     if not user:
         return {"message": "If this email exists, a verification OTP has been sent."}
 
-    # Generate 6-digit OTP
-    otp = "".join(random.choices(string.digits, k=6))
-    
-    # Set expiration (2 minutes from now)
-    expiration = datetime.utcnow() + timedelta(minutes=2)
-
-    # Save to DB
-    user.email_verification_otp = otp
-    user.email_verification_otp_expires = expiration
-    db.commit()
+    # Generate 6-digit OTP (expires in 2 minutes)
+    otp = crud_otp.issue_otp(db, user.email, crud_otp.PURPOSE_EMAIL_VERIFICATION, ttl_minutes=2)
 
     # Send the OTP
-    email_sent = False
-    if send_otp_email:
-        from app.core.email_utils import send_email_verification_otp
-        try:
-            email_sent = send_email_verification_otp(user.email, otp)
-        except ImportError:
-            pass
-    
-    # Fallback to Console
-    if not email_sent:
-        print(f"\n" + "="*50)
-        print(f"⚠️  EMAIL SIMULATION (SMTP not configured or failed)")
-        print(f"📨  To: {user.email}")
-        print(f"🔑  VERIFICATION OTP CODE: {otp}")
-        print(f"⏰  Expires in: 2 minutes")
-        print(f"="*50 + "\n")
+    deliver_verification_otp(db, user.email, otp)
 
     return {"message": "Verification OTP sent successfully"}
 
@@ -490,34 +456,11 @@ def resend_verification_otp(
     if not user:
         return {"message": "OTP resent successfully"}
 
-    # 1. Generate a NEW 6-digit OTP
-    new_otp = "".join(random.choices(string.digits, k=6))
-    
-    # 2. Reset expiration (2 minutes from NOW)
-    expiration = datetime.utcnow() + timedelta(minutes=2)
+    # 1. Generate a NEW 6-digit OTP (replaces the previous one, 2 minutes from NOW)
+    new_otp = crud_otp.issue_otp(db, user.email, crud_otp.PURPOSE_EMAIL_VERIFICATION, ttl_minutes=2)
 
-    # 3. Update Database
-    user.email_verification_otp = new_otp
-    user.email_verification_otp_expires = expiration
-    db.commit()
-
-    # 4. Send the new OTP
-    email_sent = False
-    if send_otp_email:
-        from app.core.email_utils import send_email_verification_otp
-        try:
-            email_sent = send_email_verification_otp(user.email, new_otp)
-        except ImportError:
-            pass
-    
-    # Fallback to Console
-    if not email_sent:
-        print(f"\n" + "="*50)
-        print(f"⚠️  EMAIL SIMULATION (SMTP not configured or failed)")
-        print(f"📨  To: {user.email}")
-        print(f"🔑  VERIFICATION OTP CODE: {new_otp}")
-        print(f"⏰  Expires in: 2 minutes")
-        print(f"="*50 + "\n")
+    # 2. Send the new OTP
+    deliver_verification_otp(db, user.email, new_otp)
 
     return {"message": "OTP resent successfully"}
 
@@ -574,7 +517,7 @@ def check_email_verification_status(
 
 # CHANGE PASSWORD (Authenticated flow)>
 @router.post("/change-password")
-def change_password(
+async def change_password(
     request: ChangePasswordRequest,
     db: Session = Depends(get_db),
     current_user_id: int = Depends(security.get_current_user)
@@ -582,27 +525,36 @@ def change_password(
     """
     Allows a logged-in user to change their password from settings.
     """
-    user = crud_user.get_user_by_id(db, user_id=current_user_id)
+    user = await run_in_threadpool(crud_user.get_user_by_id, db, user_id=current_user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Verify current password
-    if not security.verify_password(request.current_password, user.hashed_password):
+    if not await password_hashing.verify_password(request.current_password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect current password")
 
     # Update to new password
-    user.hashed_password = security.get_password_hash(request.new_password)
-    db.commit()
+    hashed_password = await password_hashing.hash_password(request.new_password)
+    await run_in_threadpool(save_password_hash, db, user, hashed_password)
 
     return {"message": "Password changed successfully"}
 
 @router.post("/logout")
-def logout(current_user_id: int = Depends(security.get_current_user)):
+def logout(
+    request: Annotated[Optional[RefreshTokenRequest], Body()] = None,
+    token: str = Depends(security.oauth2_scheme),
+    current_user_id: int = Depends(security.get_current_user)
+):
     """
-    Log out the current user. 
-    In a stateless JWT setup, this primarily serves as a confirmation 
-    and a place to hook in analytics or token blacklisting in the future.
+    Log out the current user.
+    Revokes the access token, and the refresh token too if it is sent:
+    {
+      "refresh_token": "..."
+    }
     """
+    security.revoke_token(token)
+    if request and request.refresh_token:
+        security.revoke_token(request.refresh_token)
     return {"message": "Successfully logged out"}
 
 # 8. GET CURRENT USER PROFILE
@@ -1,43 +1,174 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, UploadFile, File, Depends
-from typing import List, Dict
-from app.services.chat_service import transcribe_audio, get_gpt_response
+import json
+from uuid import uuid4
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, UploadFile, File, Depends, HTTPException, Query, status
+from typing import List, Dict, Optional
+from jose import JWTError
+from openai import APIError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core import security
+from app.core.chat_store import chat_store, unwritten
+from app.core.config import settings
+from app.core.conversation_memory import memory
+from app.crud import crud_chat
+from app.database import get_db
+from app.schemas.chat import ChatHistoryMessage
+from app.services.chat_service import (
+    LLMBusyError, transcribe_audio, get_gpt_response, stream_gpt_response, summarize_conversation,
+)
 
 router = APIRouter()
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        self.streaming: Dict[str, bool] = {}  # client_id -> wants start/delta/end frames
+        self.users: Dict[str, Optional[int]] = {}  # client_id -> signed-in user (None: anonymous)
 
-    async def connect(self, client_id: str, websocket: WebSocket):
+    async def connect(self, client_id: str, websocket: WebSocket, stream: bool = False, user_id: Optional[int] = None):
         await websocket.accept()
         self.active_connections[client_id] = websocket
+        self.streaming[client_id] = stream
+        self.users[client_id] = user_id
 
     def disconnect(self, client_id: str):
         if client_id in self.active_connections:
             del self.active_connections[client_id]
+        self.streaming.pop(client_id, None)
+        self.users.pop(client_id, None)
 
     async def send_personal_message(self, message: str, client_id: str):
         if client_id in self.active_connections:
             await self.active_connections[client_id].send_text(message)
 
+    async def send_frame(self, frame: dict, client_id: str):
+        await self.send_personal_message(json.dumps(frame), client_id)
+
 manager = ConnectionManager()
 
-# Simple in-memory history (Use Redis for production)
-chat_histories: Dict[str, List[dict]] = {}
+@router.get("/history/{client_id}", response_model=dict)
+def get_chat_history(
+    client_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (older messages)"),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(security.get_current_user),
+):
+    """
+    Retrieves the current user's previous messages in this chat from
+    chat_messages, newest page first; each page reads oldest to newest. Pass
+    next_cursor to load earlier messages. The first page also ends with any
+    messages this worker hasn't written yet (id null).
+    """
+    # Taken before the read: a flush may write some of these meanwhile
+    queued = chat_store.pending(current_user_id, client_id) if cursor is None else []
+    try:
+        items, next_cursor = crud_chat.get_messages(db, current_user_id, client_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    messages = [ChatHistoryMessage.model_validate(item) for item in items]
+    stored = [message.model_dump() for message in messages]
+    messages += [ChatHistoryMessage(**row) for row in unwritten(queued, stored)]
+    return {"items": messages, "next_cursor": next_cursor}
+
+def conversation(client_id: str) -> str:
+    """
+    The memory key of the chat on this socket. A signed-in user's chat is
+    "<user_id>/<client_id>" (a path segment has no "/"), so an anonymous
+    socket on the same client_id never sees it.
+    """
+    user_id = manager.users.get(client_id)
+    return client_id if user_id is None else f"{user_id}/{client_id}"
+
+def remember(client_id: str, role: str, content: str):
+    """
+    A turn goes into the memory window now and, for a signed-in user, into
+    chat_messages with the next batch. Anonymous chats are never stored.
+    """
+    memory.append(conversation(client_id), role, content)
+    user_id = manager.users.get(client_id)
+    if user_id is not None:
+        chat_store.add(user_id, client_id, role, content)
+
+async def resume(client_id: str):
+    """If a signed-in user's conversation isn't in this worker's memory, load its recent turns from chat_messages."""
+    user_id = manager.users.get(client_id)
+    key = conversation(client_id)
+    if user_id is None or key in memory:
+        return
+    try:
+        stored = await run_in_threadpool(chat_store.recent, user_id, client_id, settings.CHAT_HYDRATE_MESSAGES)
+    except Exception as e:
+        print(f"Couldn't load chat history for {key}: {e}")
+        return
+    memory.hydrate(key, stored)
+
+BUSY_MESSAGE = "Dwane is helping lots of chefs right now, try again in a moment!"
 
-@router.get("/history/{client_id}", response_model=List[dict])
-async def get_chat_history(client_id: str):
+async def reply(client_id: str):
     """
-    Retrieves previous messages for a user.
-    This handles the standard HTTP GET request seen in your logs.
+    Answer the conversation so far: one text message, or for streaming
+    sockets a {"type": "start"} frame, {"type": "delta", "content"} frames
+    as tokens arrive, and {"type": "end", "content": full text}. The answer
+    joins the history only once complete.
     """
-    return chat_histories.get(client_id, [])
+    history = memory.prompt(conversation(client_id))
+    if not manager.streaming.get(client_id):
+        try:
+            ai_response = await get_gpt_response(history)
+        except LLMBusyError:
+            await manager.send_personal_message(BUSY_MESSAGE, client_id)
+            return
+        remember(client_id, "assistant", ai_response)
+        await manager.send_personal_message(ai_response, client_id)
+        await summarize(client_id)
+        return
+
+    message_id = uuid4().hex
+    await manager.send_frame({"type": "start", "id": message_id}, client_id)
+    parts = []
+    try:
+        async for delta in stream_gpt_response(history):
+            parts.append(delta)
+            await manager.send_frame({"type": "delta", "id": message_id, "content": delta}, client_id)
+    except LLMBusyError:
+        await manager.send_frame({"type": "error", "id": message_id, "detail": BUSY_MESSAGE}, client_id)
+        return
+    except APIError as e:
+        print(f"Chat stream for {client_id} failed: {e}")
+        await manager.send_frame({"type": "error", "id": message_id, "detail": "Dwane couldn't answer, try again"}, client_id)
+        return
+
+    content = "".join(parts)
+    remember(client_id, "assistant", content)
+    await manager.send_frame({"type": "end", "id": message_id, "content": content}, client_id)
+    await summarize(client_id)
+
+async def summarize(client_id: str):
+    """With CHAT_SUMMARY_ENABLED, fold turns that left the window into the rolling summary (after replying)."""
+    if not settings.CHAT_SUMMARY_ENABLED:
+        return
+    try:
+        await memory.summarize(conversation(client_id), summarize_conversation)
+    except (LLMBusyError, APIError) as e:
+        print(f"Chat summary for {client_id} failed, will retry next turn: {e}")
 
 @router.websocket("/ws/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    await manager.connect(client_id, websocket)
-    if client_id not in chat_histories:
-        chat_histories[client_id] = []
+async def websocket_endpoint(
+    websocket: WebSocket,
+    client_id: str,
+    stream: bool = Query(False, description="Send replies as start/delta/end JSON frames"),
+    token: Optional[str] = Query(None, description="Access token; without one the chat is anonymous and not stored"),
+):
+    user_id = None
+    if token is not None:
+        try:
+            claims = security.decode_token(token)
+            user_id = int(claims["sub"])
+        except (JWTError, KeyError, TypeError, ValueError):
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+    await manager.connect(client_id, websocket, stream=stream, user_id=user_id)
     
     # await manager.send_personal_message("Hello! I am Dwane. Let's cook!", client_id)
 
@@ -45,15 +176,12 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         while True:
             data = await websocket.receive_text()
             
-            # 1. Update History
-            chat_histories[client_id].append({"role": "user", "content": data})
+            # 1. Update History (reloaded first if the session was swept or evicted while the socket sat open)
+            await resume(client_id)
+            remember(client_id, "user", data)
             
-            # 2. Get AI Response
-            ai_response = await get_gpt_response(chat_histories[client_id])
-            
-            # 3. Update History & Send
-            chat_histories[client_id].append({"role": "assistant", "content": ai_response})
-            await manager.send_personal_message(ai_response, client_id)
+            # 2. Get AI Response, update history & send
+            await reply(client_id)
             
     except WebSocketDisconnect:
         manager.disconnect(client_id)
@@ -61,20 +189,22 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
 @router.post("/upload-audio/{client_id}")
 async def upload_audio(client_id: str, file: UploadFile = File(...)):
     # 1. Transcribe
-    text = await transcribe_audio(file)
+    try:
+        text = await transcribe_audio(file)
+    except LLMBusyError:
+        raise HTTPException(status_code=503, detail=BUSY_MESSAGE)
     
     # 2. Notify User via WebSocket
-    await manager.send_personal_message(f"🎤 You said: {text}", client_id)
+    if manager.streaming.get(client_id):
+        await manager.send_frame({"type": "transcription", "content": text}, client_id)
+    else:
+        await manager.send_personal_message(f"🎤 You said: {text}", client_id)
     
     # 3. Process with GPT
-    if client_id not in chat_histories:
-        chat_histories[client_id] = []
-        
-    chat_histories[client_id].append({"role": "user", "content": text})
-    ai_response = await get_gpt_response(chat_histories[client_id])
-    chat_histories[client_id].append({"role": "assistant", "content": ai_response})
+    await resume(client_id)
+    remember(client_id, "user", text)
     
-    # 4. Send Response via WebSocket
-    await manager.send_personal_message(ai_response, client_id)
+    # 4. Send Response via WebSocket (streamed if the socket asked for it)
+    await reply(client_id)
     
     return {"status": "processing", "transcription": text}
\ No newline at end of file
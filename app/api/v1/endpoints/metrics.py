@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+from app.core import security
+from app.core.metrics import metrics
+
+router = APIRouter()
+
+@router.get("/")
+def read_metrics(current_user_id: int = Depends(security.get_current_user)):
+    """
+    In-process metrics for this worker (counters, gauges, timers with p50/p95/p99).
+    """
+    return metrics.snapshot()
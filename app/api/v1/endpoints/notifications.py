@@ -1,40 +1,68 @@
-from typing import List, Literal
-from fastapi import APIRouter, Depends, Query
+import json
+import time
+from typing import List, Literal, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from jose import JWTError
 from sqlalchemy.orm import Session
-from app.database import get_db
+from starlette.concurrency import run_in_threadpool
+from app.database import get_db, SessionLocal
 from app.core import security
+from app.core.config import settings
+from app.core.notification_hub import hub
+from app.core.principal import CurrentPrincipal, load_principal
+from app.core.revocation import revocation
 from app.crud import crud_notification
-from app.schemas.notification import NotificationOut
+from app.models.notification_broadcast import NotificationBroadcast
+from app.schemas.notification import BroadcastCreate, BroadcastOut, NotificationOut
+from app.services import notification_broadcast
 
 router = APIRouter()
 
 @router.get("/", response_model=dict)
 def read_notifications(
     skip: int = 0,
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=100),
     filter: Literal["all", "unread"] = "all",
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (infinite scroll)"),
+    include_total: bool = True,
     db: Session = Depends(get_db),
     current_user_id: int = Depends(security.get_current_user)
 ):
     """
     Get notifications for the Dashboard.
-    Supports pagination (skip/limit) and tabs (filter).
+    Supports pagination (skip/limit, or cursor for infinite scroll) and tabs (filter).
+    Scrolling clients pass the previous page's next_cursor and include_total=false.
     """
-    items, total = crud_notification.get_notifications(
-        db, 
-        user_id=current_user_id, 
-        skip=skip, 
-        limit=limit, 
-        filter_type=filter
-    )
+    try:
+        items, total, next_cursor = crud_notification.get_notifications(
+            db, 
+            user_id=current_user_id, 
+            skip=skip, 
+            limit=limit, 
+            filter_type=filter,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Return count for pagination logic on frontend
     return {
         "total": total,
-        "page": (skip // limit) + 1,
+        "page": (skip // limit) + 1 if cursor is None else None,
+        "next_cursor": next_cursor,
         "items": [NotificationOut.model_validate(item) for item in items]
     }
 
+@router.get("/unread-count")
+def read_unread_count(
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(security.get_current_user)
+):
+    """Badge count: one primary-key lookup on notification_counters."""
+    return {"unread_count": crud_notification.get_unread_count(db, current_user_id)}
+
 @router.patch("/read-all")
 def mark_all_read(
     db: Session = Depends(get_db),
@@ -52,4 +80,108 @@ def mark_one_read(
 ):
     """Call this when user clicks a specific notification"""
     crud_notification.mark_one_as_read(db, notification_id, current_user_id)
-    return {"message": "Notification marked as read"}
\ No newline at end of file
+    return {"message": "Notification marked as read"}
+
+@router.post("/broadcast", response_model=BroadcastOut, status_code=status.HTTP_202_ACCEPTED)
+def create_broadcast(
+    broadcast_in: BroadcastCreate,
+    background_tasks: BackgroundTasks,
+    principal: CurrentPrincipal,
+    db: Session = Depends(get_db),
+):
+    """
+    Admin: send a notification to every user in the segment (language,
+    active_only). Returns at once; poll GET /broadcast/{id} for progress.
+    """
+    if not principal.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    broadcast = notification_broadcast.create_broadcast(db, **broadcast_in.model_dump(), created_by=principal.id)
+    background_tasks.add_task(notification_broadcast.run_broadcast, broadcast.id)
+    return broadcast
+
+@router.get("/broadcast/{broadcast_id}", response_model=BroadcastOut)
+def read_broadcast(
+    broadcast_id: int,
+    principal: CurrentPrincipal,
+    db: Session = Depends(get_db),
+):
+    """Admin: progress of a broadcast (status, sent / total)."""
+    if not principal.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    broadcast = db.get(NotificationBroadcast, broadcast_id)
+    if broadcast is None:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return broadcast
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def _unread_for_active_user(user_id: int) -> Optional[int]:
+    # Own short-lived session: a stream must not hold a pooled connection for hours
+    with SessionLocal() as db:
+        principal = load_principal(db, user_id)
+        if principal is None or not principal.is_active:
+            return None
+        return crud_notification.get_unread_count(db, user_id)
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    token: Optional[str] = Query(None, description="Access token, for clients that can't send headers (EventSource)"),
+):
+    """
+    Server-Sent Events stream replacing polling: starts with the unread count,
+    then pushes new notifications and unread-count changes as they happen.
+    Sends a keepalive comment every NOTIFICATION_STREAM_KEEPALIVE_SECONDS and
+    ends (event: expired) when the token expires or is revoked.
+    """
+    if token is None:
+        scheme, _, value = request.headers.get("Authorization", "").partition(" ")
+        token = value if scheme.lower() == "bearer" else None
+    try:
+        claims = security.decode_token(token) if token else None
+    except JWTError:
+        claims = None
+    if not claims or claims.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user_id = int(claims["sub"])
+
+    subscription = hub.subscribe(user_id)
+    if subscription is None:
+        raise HTTPException(status_code=429, detail="Too many open notification streams")
+    try:
+        unread = await run_in_threadpool(_unread_for_active_user, user_id)
+    except Exception:
+        hub.unsubscribe(subscription)
+        raise
+    if unread is None:
+        hub.unsubscribe(subscription)
+        raise HTTPException(status_code=403, detail="Inactive user")
+
+    expires_at = float(claims.get("exp") or time.time() + 3600)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            yield _sse({"type": "unread_count", "unread_count": unread})
+            while True:
+                remaining = expires_at - time.time()
+                if remaining <= 0 or revocation.is_revoked(claims):
+                    yield _sse({"type": "expired"})
+                    return
+                event = await subscription.get(min(settings.NOTIFICATION_STREAM_KEEPALIVE_SECONDS, remaining))
+                if await request.is_disconnected():
+                    return
+                yield _sse(event) if event is not None else ": keepalive\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
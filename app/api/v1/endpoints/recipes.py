@@ -1,27 +1,28 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from app.database import get_db
-from app.schemas.recipe import Recipe, RecipeOut, RecipeCreate, RecipeExploreOut, RecipePagination, RecipeUpdate
-from app.crud import crud_recipe
+from app.schemas.recipe import Recipe, RecipeOut, RecipeCreate, RecipeExploreOut, RecipePagination, RecipeUpdate, RecipeTrendingOut
+from app.crud import crud_recipe, crud_activity
 from app.core import security
-from app.models.user import User
+from app.core.principal import CurrentPrincipal
+from app.services.view_tracker import view_tracker
+from app.services.trending import trending
 router = APIRouter()
 
 # 1. GET ALL RECIPES (Home Page & Search)
 @router.get("/", response_model=List[dict])
 def read_recipes(
+    principal: CurrentPrincipal,
     skip: int = 0,
     limit: int = 100,
     q: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user_id: int = Depends(security.get_current_user),
 ):
     recipes = crud_recipe.get_recipes(db, skip=skip, limit=limit, search=q)
 
-    user = db.query(User).filter(User.id == current_user_id).first()
-    user_fav_ids = {r.id for r in user.favorite_recipes} if user else set()
+    user_fav_ids = crud_recipe.get_favorite_ids(db, principal.id, [r.id for r in recipes])
 
     results = []
     for r in recipes:
@@ -36,16 +37,15 @@ def read_recipes(
 
 @router.get("/search", response_model=List[dict])
 def read_recipes(
+    principal: CurrentPrincipal,
     skip: int = 0,
     limit: int = 100,
     q: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user_id: int = Depends(security.get_current_user),
 ):
     recipes = crud_recipe.get_recipes(db, skip=skip, limit=limit, search=q)
 
-    user = db.query(User).filter(User.id == current_user_id).first()
-    user_fav_ids = {r.id for r in user.favorite_recipes} if user else set()
+    user_fav_ids = crud_recipe.get_favorite_ids(db, principal.id, [r.id for r in recipes])
 
     results = []
     for r in recipes:
@@ -60,11 +60,11 @@ def read_recipes(
 
 @router.get("/explore", response_model=List[RecipeExploreOut])
 def explore_recipes(
+    principal: CurrentPrincipal,
     skip: int = 0, 
     limit: int = 100, 
     q: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user_id: int = Depends(security.get_current_user)
+    db: Session = Depends(get_db)
 ):
     """
     Get a simplified list of recipes for the Home/Explore feed.
@@ -74,8 +74,7 @@ def explore_recipes(
     recipes = crud_recipe.get_recipes(db, skip=skip, limit=limit, search=q)
     
     # 2. Get User Favorites (to mark is_favorite=True/False)
-    user = db.query(User).filter(User.id == current_user_id).first()
-    user_fav_ids = [r.id for r in user.favorite_recipes] if user else []
+    user_fav_ids = crud_recipe.get_favorite_ids(db, principal.id, [r.id for r in recipes])
 
     # 3. Map to the simplified schema
     results = []
@@ -99,17 +98,16 @@ def explore_recipes(
 # GET TOP PERFORMING RECIPES (Based on Favorites)
 @router.get("/popular", response_model=RecipePagination) 
 def get_popular_recipes(
+    principal: CurrentPrincipal,
     skip: int = 0,
     limit: int = 5,
-    db: Session = Depends(get_db),
-    current_user_id: int = Depends(security.get_current_user)
+    db: Session = Depends(get_db)
 ):
     # 1. Fetch Items AND Total Count
     recipes, total_count = crud_recipe.get_top_recipes(db, skip=skip, limit=limit)
     
     # 2. Calculate Favorites logic
-    user = db.query(User).filter(User.id == current_user_id).first()
-    user_fav_ids = [r.id for r in user.favorite_recipes] if user else []
+    user_fav_ids = crud_recipe.get_favorite_ids(db, principal.id, [r.id for r in recipes])
 
     # 3. Process Items
     results = []
@@ -133,6 +131,44 @@ def get_popular_recipes(
         "items": results
     }
 
+# GET TRENDING RECIPES (Time-decayed views + favorites)
+@router.get("/trending", response_model=List[RecipeTrendingOut])
+def get_trending_recipes(
+    principal: CurrentPrincipal,
+    window: Literal["1h", "24h", "7d"] = "24h",
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """
+    Recipes with the most recent attention. Views and favorites decay
+    exponentially with a time constant equal to the window.
+    Falls back to all-time favorites until there is enough traffic.
+    """
+    ranked = trending.top(window=window, limit=limit)
+    scores = dict(ranked)
+
+    if ranked:
+        by_id = {r.id: r for r in db.query(Recipe).filter(Recipe.id.in_(scores)).all()}
+        recipes = [by_id[rid] for rid, _ in ranked if rid in by_id]
+    else:
+        recipes, _ = crud_recipe.get_top_recipes(db, skip=0, limit=limit)
+
+    user_fav_ids = crud_recipe.get_favorite_ids(db, principal.id, [r.id for r in recipes])
+
+    return [
+        RecipeTrendingOut(
+            id=r.id,
+            title=r.title,
+            difficulty=r.difficulty,
+            cooking_time=r.cooking_time,
+            image_url=r.image_url,
+            is_favorite=(r.id in user_fav_ids),
+            favorites_count=r.favorites_count,
+            trending_score=scores.get(r.id, 0.0)
+        )
+        for r in recipes
+    ]
+
 # 2. CREATE RECIPE (Restored Endpoint)
 @router.post("/", response_model=RecipeOut)
 def create_recipe(
@@ -179,19 +215,26 @@ def update_recipe(
 @router.get("/{recipe_id}", response_model=RecipeOut)
 def read_recipe(
     recipe_id: int, 
-    db: Session = Depends(get_db),
-    current_user_id: int = Depends(security.get_current_user)
+    principal: CurrentPrincipal,
+    db: Session = Depends(get_db)
 ):
+    current_user_id = principal.id
     recipe = crud_recipe.get_recipe(db, recipe_id=recipe_id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
     recipe.views_count += 1
+    crud_activity.log_weekly_view(db, current_user_id, recipe.title)  # cohort analytics
     db.commit() # Save to database
     db.refresh(recipe) # Refresh to get the new number
+
+    # Unique viewers are tracked separately (HyperLogLog), refreshes don't inflate them
+    view_tracker.record(recipe.id, current_user_id)
+    trending.record_view(recipe.id)
+    if view_tracker.should_flush():
+        view_tracker.flush(db)
     
-    user = db.query(User).filter(User.id == current_user_id).first()
-    is_fav = recipe in user.favorite_recipes if user else False
+    is_fav = recipe.id in crud_recipe.get_favorite_ids(db, current_user_id, [recipe.id])
     
     r_out = RecipeOut.model_validate(recipe)
     r_out.is_favorite = is_fav
@@ -213,6 +256,8 @@ def favorite_recipe(
     is_now_favorite = crud_recipe.toggle_favorite(db, user_id=current_user_id, recipe_id=recipe_id)
     if is_now_favorite is None:
         raise HTTPException(status_code=404, detail="Recipe or User not found")
+    if is_now_favorite:
+        trending.record_favorite(recipe_id)
         
     return {
         "recipe_id": recipe_id, 
@@ -249,6 +294,7 @@ def delete_recipe(
     deleted_recipe = crud_recipe.delete_recipe(db, recipe_id)
     if not deleted_recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
+    trending.forget(recipe_id)
     return {"message": "Recipe deleted successfully"}
 
 # Add these imports at the top of recipes.py
@@ -8,7 +8,8 @@ from typing import Optional
 from app.database import get_db
 from app.schemas.user import User as UserSchema, UserUpdateProfile, UserUpdate, AdminProfileUpdate
 from app.core import security
-from app.crud import crud_user
+from app.core.principal import CurrentPrincipal, invalidate_principal
+from app.crud import crud_user, crud_recipe
 from app.models.game import UserGameProgress
 from app.schemas.user import UserAdminList
 from app.core.config import settings
@@ -17,13 +18,14 @@ router = APIRouter()
 
 @router.get("/me", response_model=UserSchema)
 def get_my_profile(
-    db: Session = Depends(get_db),
-    current_user_id: int = Depends(security.get_current_user)
+    principal: CurrentPrincipal,
+    db: Session = Depends(get_db)
 ):
     """
     Get the current logged-in user's profile.
     This MUST be defined before /{user_id} to avoid conflicts.
     """
+    current_user_id = principal.id
     db_user = crud_user.get_user_by_id(db, user_id=current_user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -34,7 +36,7 @@ def get_my_profile(
         UserGameProgress.is_completed == True
     ).count()
 
-    recipes_done = len(db_user.favorite_recipes) 
+    recipes_done = crud_recipe.count_favorites(db, current_user_id)
 
     # Attach to schema
     user_out = UserSchema.model_validate(db_user)
@@ -60,6 +62,7 @@ def update_my_profile(
         
     db.commit()
     db.refresh(db_user)
+    invalidate_principal(current_user_id)
     
     # Return with stats
     user_out = UserSchema.model_validate(db_user)
@@ -177,6 +180,9 @@ def toggle_status(
     # Flip the boolean
     db_user.is_active = not db_user.is_active
     db.commit()
+    invalidate_principal(user_id)
+    if not db_user.is_active:
+        security.revoke_user_tokens(user_id)
     
     return {
         "id": user_id, 
@@ -207,6 +213,9 @@ def toggle_user_status(
     
     db_user.is_active = not db_user.is_active
     db.commit()
+    invalidate_principal(user_id)
+    if not db_user.is_active:
+        security.revoke_user_tokens(user_id)
     return {"message": "User status updated", "is_active": db_user.is_active}
 
 
@@ -0,0 +1,188 @@
+"""
+Write-behind persistence for chat messages.
+
+add() only appends to an in-memory queue, so a chat turn never waits on
+the database. A background thread writes the queue to chat_messages every
+CHAT_STORE_FLUSH_SECONDS (sooner once CHAT_STORE_BATCH_SIZE messages are
+waiting), one multi-row INSERT per batch. Messages stay in order: if the
+database can't be reached, the batch goes back to the front of the queue and
+is retried on the next flush. Any other failure means a row itself is bad,
+so the batch is written again row by row and the rows that still fail are
+dropped (chat.store.rejected), leaving one bad message unable to block the
+rest. If the database stays away, the queue is capped at
+CHAT_STORE_MAX_PENDING and the oldest unsaved messages are dropped.
+
+stop() flushes everything, so a clean shutdown loses nothing (a crash
+loses at most one flush interval). Messages still queued, or in the batch
+being written, are visible through pending(), so reads in this worker don't
+miss them: take pending() before reading chat_messages, then drop what the
+read already returned with unwritten().
+
+Gauge chat.store.pending, counters chat.store.rows / chat.store.errors /
+chat.store.dropped / chat.store.rejected, timer chat.store.flush.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlalchemy.exc import InterfaceError, OperationalError
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud import crud_chat
+from app.database import SessionLocal
+
+# The database is down or unreachable: keep the rows and try again later
+UNAVAILABLE = (OperationalError, InterfaceError)
+
+def unwritten(queued: List[Dict], stored: List[Dict]) -> List[Dict]:
+    """
+    The rows of `queued` (from pending(), taken before `stored` was read)
+    that aren't in `stored`: a flush may have written them in between. Rows
+    match on (role, content, created_at), which the INSERT copies as is.
+    """
+    written = {(row["role"], row["content"], row["created_at"]) for row in stored}
+    return [row for row in queued if (row["role"], row["content"], row["created_at"]) not in written]
+
+class ChatStore:
+    def __init__(
+        self,
+        flush_seconds: float = 1.0,
+        batch_size: int = 500,
+        max_pending: int = 50000,
+        session_factory=SessionLocal,
+    ):
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self._queue: Deque[Dict] = deque()
+        self._inflight: List[Dict] = []  # popped by flush(), not committed yet
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, user_id: int, client_id: str, role: str, content: str):
+        """Queue one message of a user's conversation for writing; never touches the database."""
+        row = {"user_id": user_id, "client_id": client_id, "role": role, "content": content,
+               "created_at": datetime.utcnow()}
+        with self._lock:
+            self._queue.append(row)
+            while len(self._queue) > self.max_pending:
+                self._queue.popleft()
+                metrics.inc("chat.store.dropped")
+            pending = len(self._queue)
+        metrics.set_gauge("chat.store.pending", pending)
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def pending(self, user_id: int, client_id: str) -> List[Dict]:
+        """This worker's unwritten messages of the conversation (queued or being written), oldest first."""
+        with self._lock:
+            return [dict(row) for row in (*self._inflight, *self._queue)
+                    if row["client_id"] == client_id and row["user_id"] == user_id]
+
+    def recent(self, user_id: int, client_id: str, limit: int) -> List[Dict]:
+        """The last `limit` turns of a conversation as {role, content, created_at}, oldest first, queued ones included."""
+        queued = self.pending(user_id, client_id)
+        with self.session_factory() as db:
+            stored = crud_chat.get_recent(db, user_id, client_id, limit)
+        queued = [{key: row[key] for key in ("role", "content", "created_at")} for row in unwritten(queued, stored)]
+        return (stored + queued)[-limit:]
+
+    def _requeue(self, rows: List[Dict]):
+        with self._lock:
+            self._queue.extendleft(reversed(rows))
+            self._inflight = []
+
+    def _write_rows(self, rows: List[Dict]) -> Tuple[int, bool]:
+        """
+        Insert a failed batch one row at a time, dropping rows that can't be
+        stored. Returns (rows written, False if the database went away; the
+        unwritten rows are then back at the front of the queue).
+        """
+        written = 0
+        for position, row in enumerate(rows):
+            try:
+                with self.session_factory() as db:
+                    crud_chat.add_messages(db, [row])
+            except UNAVAILABLE as e:
+                self._requeue(rows[position:])
+                metrics.inc("chat.store.errors")
+                print(f"Chat store flush failed, {len(rows) - position} messages kept for retry: {e}")
+                return written, False
+            except Exception as e:
+                metrics.inc("chat.store.rejected")
+                print(f"Chat store dropped a message for {row['client_id']} that can't be stored: {e}")
+                continue
+            written += 1
+        return written, True
+
+    def flush(self) -> int:
+        """Write everything queued, batch by batch; returns rows written (stops if the database is unavailable)."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                    self._inflight = batch
+                if not batch:
+                    break
+                started = time.perf_counter()
+                available = True
+                try:
+                    with self.session_factory() as db:
+                        crud_chat.add_messages(db, batch)
+                    count = len(batch)
+                except UNAVAILABLE as e:
+                    self._requeue(batch)
+                    metrics.inc("chat.store.errors")
+                    print(f"Chat store flush failed, {len(batch)} messages kept for retry: {e}")
+                    break
+                except Exception as e:
+                    metrics.inc("chat.store.errors")
+                    print(f"Chat store batch of {len(batch)} failed, writing it row by row: {e}")
+                    count, available = self._write_rows(batch)
+                if available:
+                    with self._lock:
+                        self._inflight = []
+                metrics.observe("chat.store.flush", time.perf_counter() - started)
+                metrics.inc("chat.store.rows", count)
+                written += count
+                if not available:
+                    break
+        with self._lock:
+            metrics.set_gauge("chat.store.pending", len(self._queue))
+        return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Chat store flush failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="chat-store", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still queued."""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+chat_store = ChatStore(
+    flush_seconds=settings.CHAT_STORE_FLUSH_SECONDS,
+    batch_size=settings.CHAT_STORE_BATCH_SIZE,
+    max_pending=settings.CHAT_STORE_MAX_PENDING,
+)
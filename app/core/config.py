@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -9,6 +9,32 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7 
     OPENAI_API_KEY: str
+    OPENAI_BASE_URL: Optional[str] = None   # OpenAI-compatible server (e.g. scripts/fake_openai_server.py)
+    OPENAI_CHAT_MODEL: str = "gpt-4"
+    OPENAI_MAX_CONCURRENCY: int = 20          # completions in flight per worker; the rest queue
+    OPENAI_QUEUE_TIMEOUT_SECONDS: float = 30  # give up waiting for a slot after this
+    OPENAI_TIMEOUT_SECONDS: float = 60        # per request (for streams: between chunks)
+    OPENAI_CONNECT_TIMEOUT_SECONDS: float = 5
+    OPENAI_MAX_CONNECTIONS: int = 50
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    OPENAI_MAX_RETRIES: int = 2
+
+    # Chat memory: a token-budgeted window of recent turns per client, evicted when idle or over the cap
+    CHAT_HISTORY_TOKEN_BUDGET: int = 2000     # tokens of recent turns sent with each prompt
+    CHAT_SUMMARY_ENABLED: bool = False        # fold turns that fall out of the window into a rolling summary
+    CHAT_SUMMARY_MAX_TOKENS: int = 300
+    CHAT_SESSION_TTL_SECONDS: float = 1800    # idle sessions are dropped after this
+    CHAT_MAX_SESSIONS: int = 10000            # per worker; least recently used go first
+    CHAT_MEMORY_MAX_TOKENS: int = 2000000     # across all sessions per worker
+    CHAT_MEMORY_SWEEP_SECONDS: float = 60
+
+    # Chat history of signed-in users in chat_messages, written behind the conversation in batches
+    CHAT_STORE_FLUSH_SECONDS: float = 1
+    CHAT_STORE_BATCH_SIZE: int = 500         # rows per INSERT
+    CHAT_STORE_MAX_PENDING: int = 50000      # while the database is away; past this the oldest are dropped
+    CHAT_HYDRATE_MESSAGES: int = 40          # stored turns loaded into memory when a conversation resumes
+    CHAT_HISTORY_RETENTION_DAYS: int = 30    # older messages are deleted (0 = keep forever)
+    CHAT_HISTORY_PURGE_INTERVAL_HOURS: float = 6
     EMAIL_SENDER: Optional[str] = None
     EMAIL_PASSWORD: Optional[str] = None
     CLOUDINARY_CLOUD_NAME: Optional[str] = None
@@ -16,6 +42,103 @@ class Settings(BaseSettings):
     CLOUDINARY_API_SECRET: Optional[str] = None
     BASE_URL: str = "http://127.0.0.1:8000"
 
+    # SMTP (EMAIL_SENDER / EMAIL_PASSWORD are the login). SMTP_AUTH=False for a local relay or stub.
+    SMTP_HOST: str = "smtp.gmail.com"
+    SMTP_PORT: int = 465
+    SMTP_USE_SSL: bool = True
+    SMTP_STARTTLS: bool = False
+    SMTP_AUTH: bool = True
+    SMTP_TIMEOUT_SECONDS: float = 10
+    SMTP_IDLE_SECONDS: float = 60          # drop pooled sessions idle longer than this
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
+
+    # Email outbox: requests enqueue, background workers send over pooled connections
+    EMAIL_OUTBOX_WORKERS: int = 2
+    EMAIL_OUTBOX_BATCH_SIZE: int = 20
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5
+    EMAIL_MAX_ATTEMPTS: int = 6
+    EMAIL_RETRY_BASE_SECONDS: float = 30   # doubles per attempt
+    EMAIL_CLAIM_SECONDS: int = 120         # a claimed row becomes due again after this (worker crash)
+    EMAIL_OUTBOX_RETENTION_DAYS: int = 7   # sent / failed rows are deleted after this (0 = keep forever)
+    EMAIL_OUTBOX_PURGE_INTERVAL_HOURS: float = 6
+
+    # Notification push (SSE): "local" (one worker) or "postgres" (LISTEN/NOTIFY between workers)
+    NOTIFICATION_BACKPLANE: str = "local"
+    NOTIFICATION_STREAM_QUEUE_SIZE: int = 100
+    NOTIFICATION_MAX_STREAMS_PER_USER: int = 5
+    NOTIFICATION_STREAM_KEEPALIVE_SECONDS: int = 15
+
+    # Coalescing bursts of same-kind events into one notification per recipient ("12 new users joined")
+    NOTIFICATION_COALESCE_WINDOW_SECONDS: float = 60
+    NOTIFICATION_COALESCE_WINDOWS: Dict[str, float] = {}  # per kind, e.g. '{"user_joined": 300}'
+    NOTIFICATION_COALESCE_MAX_ACTORS: int = 3             # names kept per coalesced notification
+
+    # Broadcast fan-out: recipients per INSERT ... SELECT transaction
+    BROADCAST_CHUNK_SIZE: int = 10000
+    BROADCAST_STALE_SECONDS: int = 120     # a running broadcast without progress this long is resumed
+
+    # Retention: read notifications older than this move to notifications_archive (0 = keep forever)
+    NOTIFICATION_RETENTION_DAYS: int = 90
+    NOTIFICATION_RETENTION_MODE: str = "archive"          # "archive" or "delete"
+    NOTIFICATION_RETENTION_INTERVAL_HOURS: float = 6
+    NOTIFICATION_RETENTION_BATCH_SIZE: int = 1000         # rows per transaction
+    NOTIFICATION_RETENTION_PAUSE_SECONDS: float = 0.05    # between batches, so writers get the table
+    NOTIFICATION_RETENTION_MAX_SECONDS: float = 300       # per run; the next run carries on
+
+    # Unread-notification digest emails (the scheduler or scripts/send_digest.py; safe to run in several workers)
+    DIGEST_ENABLED: bool = False
+    DIGEST_INTERVAL_HOURS: float = 24
+    DIGEST_BATCH_SIZE: int = 500           # users per batch, sent over one SMTP session
+    DIGEST_MAX_ITEMS: int = 10             # notifications listed per email
+
+    # Unique viewer sketches (HyperLogLog). Error ~ 1.04 / sqrt(2 ** precision)
+    HLL_PRECISION: int = 12
+    VIEW_SKETCH_FLUSH_SECONDS: int = 30
+    UNIQUE_VIEWS_WINDOW_DAYS: int = 30
+
+    # Dashboard counts: "auto", "single", "concurrent" or "sequential"
+    ANALYTICS_AGGREGATE_STRATEGY: str = "auto"
+    ANALYTICS_QUERY_WORKERS: int = 4
+
+    # Trending recipes (in-memory, per worker)
+    TRENDING_MAX_RECIPES: int = 5000
+    TRENDING_RING_MINUTES: int = 60
+    TRENDING_TOP_K: int = 50
+    TRENDING_VIEW_WEIGHT: float = 1.0
+    TRENDING_FAVORITE_WEIGHT: float = 5.0
+
+    # Verified JWT claims kept in memory (LRU, expire at the token's exp); 0 disables
+    AUTH_CLAIMS_CACHE_SIZE: int = 10000
+
+    # Authenticated principal (id, is_active, is_superuser, language) cache
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    # Token revocation: "local" (this process only) or "database" (shared via revoked_tokens)
+    REVOCATION_BACKEND: str = "local"
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_SYNC_SECONDS: int = 5
+    REVOCATION_SWEEP_SECONDS: int = 300
+    REVOCATION_GAP_SECONDS: int = 60       # ids seen out of commit order are re-read this long
+
+    # Rate limiting of the auth endpoints: "memory" (per process) or "database" (shared)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_SHARDS: int = 16
+    RATE_LIMIT_TRUST_PROXY: bool = False  # key by X-Forwarded-For (only behind a trusted proxy)
+
+    # One-time codes (otp_codes table)
+    OTP_MAX_ATTEMPTS: int = 5
+    OTP_SWEEP_SECONDS: int = 300
+    OTP_MEMORY_CACHE: bool = False  # front cache for checks; single worker deployments
+
+    # bcrypt work factor (see scripts/calibrate_bcrypt.py); other costs are rehashed on login
+    BCRYPT_ROUNDS: int = 12
+
+    # bcrypt runs in a process pool; 0 workers = default thread pool
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
     class Config:
         env_file = ".env"
         extra = "ignore" 
@@ -0,0 +1,236 @@
+"""
+Bounded chat memory: what Dwane remembers of each conversation.
+
+Each client gets a sliding window of its most recent turns, at most
+CHAT_HISTORY_TOKEN_BUDGET tokens; that window (plus the rolling summary, if
+any) is what goes to the model, so prompt size stays flat however long a
+conversation runs. Turns that fall out of the window are dropped, or, with
+CHAT_SUMMARY_ENABLED, kept aside until summarize() folds them into a short
+rolling summary (at most CHAT_SUMMARY_MAX_TOKENS).
+
+Across sessions the memory is capped per worker: sessions idle for
+CHAT_SESSION_TTL_SECONDS are swept, and past CHAT_MAX_SESSIONS or
+CHAT_MEMORY_MAX_TOKENS the least recently used session goes first.
+
+Tokens are estimated (about 4 characters each, plus a few per message for
+the role), which is close enough for budgeting without a tokenizer.
+
+A session that isn't in memory (new worker, restart, evicted) can be
+started from stored turns with hydrate(); see app.core.chat_store.
+
+Gauges chat.memory.sessions / chat.memory.tokens, counters
+chat.memory.evictions (also .idle / .capacity), chat.memory.trimmed
+(messages that fell out of a window), chat.memory.summaries and
+chat.memory.hydrations.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List
+from app.core.config import settings
+from app.core.metrics import metrics
+
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+@dataclass
+class _Session:
+    last_used: float
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    window_tokens: int = 0
+    pending: List[Dict[str, str]] = field(default_factory=list)  # dropped, not yet summarized
+    pending_tokens: int = 0
+    summary: str = ""
+
+    @property
+    def tokens(self) -> int:
+        summary_tokens = estimate_tokens(self.summary) + MESSAGE_OVERHEAD_TOKENS if self.summary else 0
+        return self.window_tokens + self.pending_tokens + summary_tokens
+
+class ConversationMemory:
+    def __init__(
+        self,
+        token_budget: int = 2000,
+        summaries: bool = False,
+        summary_max_tokens: int = 300,
+        ttl: float = 1800,
+        max_sessions: int = 10000,
+        max_tokens: int = 2000000,
+        clock=time.time,
+    ):
+        self.token_budget = token_budget
+        self.summaries = summaries
+        self.summary_max_tokens = summary_max_tokens
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_tokens = max_tokens
+        self.clock = clock
+        self.total_tokens = 0
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _touch(self, client_id: str) -> _Session:
+        now = self.clock()
+        session = self._sessions.get(client_id)
+        if session is not None and now - session.last_used > self.ttl:
+            self._drop(client_id, "idle")
+            session = None
+        if session is None:
+            session = self._sessions[client_id] = _Session(last_used=now)
+        session.last_used = now
+        self._sessions.move_to_end(client_id)
+        return session
+
+    def _drop(self, client_id: str, reason: str):
+        session = self._sessions.pop(client_id)
+        self.total_tokens -= session.tokens
+        metrics.inc("chat.memory.evictions")
+        metrics.inc(f"chat.memory.evictions.{reason}")
+
+    def _trim(self, session: _Session):
+        # Always keep the newest message, even if it alone is over budget
+        while session.window_tokens > self.token_budget and len(session.messages) > 1:
+            message = session.messages.pop(0)
+            tokens = message_tokens(message)
+            session.window_tokens -= tokens
+            metrics.inc("chat.memory.trimmed")
+            if self.summaries:
+                session.pending.append(message)
+                session.pending_tokens += tokens
+        # If summarizing can't keep up, the oldest unsummarized turns are lost
+        while session.pending_tokens > self.token_budget:
+            session.pending_tokens -= message_tokens(session.pending.pop(0))
+
+    def _enforce_caps(self, keep: str):
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self.total_tokens > self.max_tokens
+        ):
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                break
+            self._drop(oldest, "capacity")
+
+    def _report(self):
+        metrics.set_gauge("chat.memory.sessions", len(self._sessions))
+        metrics.set_gauge("chat.memory.tokens", self.total_tokens)
+
+    def append(self, client_id: str, role: str, content: str):
+        """Add a turn to the client's window, trimming the oldest turns past the budget."""
+        message = {"role": role, "content": content}
+        with self._lock:
+            session = self._touch(client_id)
+            before = session.tokens
+            session.messages.append(message)
+            session.window_tokens += message_tokens(message)
+            self._trim(session)
+            self.total_tokens += session.tokens - before
+            self._enforce_caps(keep=client_id)
+            self._report()
+
+    def prompt(self, client_id: str) -> List[Dict[str, str]]:
+        """The messages to send to the model: the rolling summary (if any), then the window."""
+        with self._lock:
+            session = self._touch(client_id)
+            messages = [dict(message) for message in session.messages]
+            if session.summary:
+                messages.insert(0, {"role": "system", "content": f"Earlier in this conversation: {session.summary}"})
+            self._report()
+            return messages
+
+    def history(self, client_id: str) -> List[Dict[str, str]]:
+        """The turns still in the client's window (without creating a session)."""
+        with self._lock:
+            session = self._sessions.get(client_id)
+            if session is None or self.clock() - session.last_used > self.ttl:
+                return []
+            return [dict(message) for message in session.messages]
+
+    def hydrate(self, client_id: str, messages: List[Dict[str, str]]) -> bool:
+        """
+        Start a session from stored turns (oldest first), keeping only what
+        fits the window. Does nothing if the session is already live.
+        """
+        with self._lock:
+            if client_id in self._sessions and self.clock() - self._sessions[client_id].last_used <= self.ttl:
+                return False
+            session = self._touch(client_id)
+            for message in messages:
+                message = {"role": message["role"], "content": message["content"]}
+                session.messages.append(message)
+                session.window_tokens += message_tokens(message)
+            while session.window_tokens > self.token_budget and len(session.messages) > 1:
+                session.window_tokens -= message_tokens(session.messages.pop(0))
+            self.total_tokens += session.tokens
+            self._enforce_caps(keep=client_id)
+            self._report()
+            metrics.inc("chat.memory.hydrations")
+            return True
+
+    def __contains__(self, client_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.get(client_id)
+            return session is not None and self.clock() - session.last_used <= self.ttl
+
+    def forget(self, client_id: str):
+        with self._lock:
+            session = self._sessions.pop(client_id, None)
+            if session is not None:
+                self.total_tokens -= session.tokens
+            self._report()
+
+    async def summarize(self, client_id: str, summarizer: Callable[[str, List[Dict[str, str]]], Awaitable[str]]) -> bool:
+        """
+        Fold the turns that left the window into the rolling summary with
+        summarizer(previous_summary, dropped_turns). Returns False if there
+        was nothing to do; if summarizer raises, the turns stay pending.
+        """
+        with self._lock:
+            session = self._sessions.get(client_id)
+            if session is None or not session.pending:
+                return False
+            previous, dropped = session.summary, list(session.pending)
+
+        summary = await summarizer(previous, dropped)
+        summary = summary.strip()[: self.summary_max_tokens * 4]
+
+        with self._lock:
+            if self._sessions.get(client_id) is not session:
+                return False  # evicted meanwhile
+            before = session.tokens
+            # More turns may have been dropped (or discarded) while the summarizer ran
+            summarized = {id(message) for message in dropped}
+            session.pending = [message for message in session.pending if id(message) not in summarized]
+            session.pending_tokens = sum(message_tokens(message) for message in session.pending)
+            session.summary = summary
+            self.total_tokens += session.tokens - before
+            metrics.inc("chat.memory.summaries")
+            self._report()
+        return True
+
+    def sweep(self) -> int:
+        """Drop sessions idle for longer than the TTL; returns how many."""
+        with self._lock:
+            cutoff = self.clock() - self.ttl
+            idle = [client_id for client_id, session in self._sessions.items() if session.last_used < cutoff]
+            for client_id in idle:
+                self._drop(client_id, "idle")
+            self._report()
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+memory = ConversationMemory(
+    token_budget=settings.CHAT_HISTORY_TOKEN_BUDGET,
+    summaries=settings.CHAT_SUMMARY_ENABLED,
+    summary_max_tokens=settings.CHAT_SUMMARY_MAX_TOKENS,
+    ttl=settings.CHAT_SESSION_TTL_SECONDS,
+    max_sessions=settings.CHAT_MAX_SESSIONS,
+    max_tokens=settings.CHAT_MEMORY_MAX_TOKENS,
+)
@@ -1,97 +1,291 @@
+import html
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import os
-from dotenv import load_dotenv
+from string import Template
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
 
-load_dotenv()
+def smtp_configured() -> bool:
+    """True when emails can actually be sent (otherwise callers print them)."""
+    return bool(settings.EMAIL_SENDER) and (bool(settings.EMAIL_PASSWORD) or not settings.SMTP_AUTH)
 
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 465
-SENDER_EMAIL = os.getenv("EMAIL_SENDER")
-SENDER_PASSWORD = os.getenv("EMAIL_PASSWORD")
+class SafeHTML(str):
+    """A value that is already HTML (e.g. rendered items): inserted without escaping."""
 
-def send_otp_email(to_email: str, otp: str):
-    try:
-        # email content
-        subject = "Password Reset - ChefJunior App"
-        body = f"""
+class EmailTemplate:
+    """
+    A subject and an HTML body with $placeholders (string.Template syntax).
+    Both are parsed once, at registration, into literal chunks and names, so
+    rendering is a join. Values are HTML-escaped in the body unless SafeHTML.
+    """
+
+    def __init__(self, name: str, subject: str, html: str):
+        self.name = name
+        self._subject = self._compile(subject)
+        self._html = self._compile(html)
+
+    @staticmethod
+    def _compile(text: str) -> List[Tuple[bool, str]]:
+        parts, position = [], 0
+        for match in Template.pattern.finditer(text):
+            if match.group("invalid") is not None:
+                raise ValueError(f"Invalid placeholder at position {match.start()}")
+            parts.append((False, text[position:match.start()]))
+            if match.group("escaped") is not None:
+                parts.append((False, "$"))
+            else:
+                parts.append((True, match.group("named") or match.group("braced")))
+            position = match.end()
+        parts.append((False, text[position:]))
+        # Merge neighbouring literals ("$$" leaves them split)
+        merged: List[Tuple[bool, str]] = []
+        for is_name, value in parts:
+            if merged and not is_name and not merged[-1][0]:
+                merged[-1] = (False, merged[-1][1] + value)
+            elif is_name or value:
+                merged.append((is_name, value))
+        return merged
+
+    @staticmethod
+    def _fill(parts, values: Dict[str, object], escape: bool) -> str:
+        out = []
+        for is_name, value in parts:
+            if not is_name:
+                out.append(value)
+                continue
+            item = values[value]
+            if escape and not isinstance(item, SafeHTML):
+                item = html.escape(str(item))
+            out.append(str(item))
+        return "".join(out)
+
+    def render(self, /, **values) -> Tuple[str, str]:
+        """(subject, html body); a missing value raises KeyError."""
+        return self._fill(self._subject, values, escape=False), self._fill(self._html, values, escape=True)
+
+TEMPLATES: Dict[str, EmailTemplate] = {}
+
+def register_template(name: str, subject: str, html: str) -> EmailTemplate:
+    template = TEMPLATES[name] = EmailTemplate(name, subject, html)
+    return template
+
+def render_email(template: str, /, **values) -> Tuple[str, str]:
+    return TEMPLATES[template].render(**values)
+
+register_template(
+    "password_reset_otp",
+    "Password Reset - ChefJunior App",
+    """
         <html>
             <body>
                 <h2>Password Reset Request</h2>
                 <p>Hello,</p>
                 <p>You requested to reset your password. Your OTP code is:</p>
-                <h1 style="color: #FF5722;">{otp}</h1>
+                <h1 style="color: #FF5722;">$otp</h1>
                 <p>This code expires in 10 minutes.</p>
                 <p>If you did not request this, please ignore this email.</p>
             </body>
         </html>
-        """
-
-        # Setup MIME
-        message = MIMEMultipart()
-        message["From"] = SENDER_EMAIL
-        message["To"] = to_email
-        message["Subject"] = subject
-        message.attach(MIMEText(body, "html"))
-
-        # Connect to Gmail Server
-        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT) as server:
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-            server.send_message(message)
-            
-        print(f"Email sent successfully to {to_email}")
-        return True
+        """,
+)
 
-    except Exception as e:
-        print(f"Failed to send email: {e}")
-        return False
-
-def send_email_verification_otp(to_email: str, otp: str):
-    """
-    Send email verification OTP to user's email address.
-    OTP expires in 2 minutes.
+register_template(
+    "email_verification_otp",
+    "Verify Your Email - ChefJunior App",
     """
-    try:
-        # Email content
-        subject = "Verify Your Email - ChefJunior App"
-        body = f"""
         <html>
             <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;">
                 <div style="max-width: 600px; margin: 0 auto; background-color: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
                     <h2 style="color: #333;">Welcome to ChefJunior!</h2>
                     <p style="color: #666; font-size: 16px;">Hello,</p>
                     <p style="color: #666; font-size: 16px;">Thank you for signing up. Please verify your email address by entering the code below:</p>
-                    
+
                     <div style="background-color: #FF5722; color: white; padding: 20px; border-radius: 5px; text-align: center; margin: 20px 0;">
-                        <h1 style="margin: 0; font-size: 32px; letter-spacing: 5px;">{otp}</h1>
+                        <h1 style="margin: 0; font-size: 32px; letter-spacing: 5px;">$otp</h1>
                     </div>
-                    
+
                     <p style="color: #999; font-size: 14px;"><strong>This code expires in 2 minutes.</strong></p>
                     <p style="color: #666; font-size: 16px;">If you did not create this account, please ignore this email.</p>
-                    
+
+                    <hr style="border: none; border-top: 1px solid #eee; margin: 20px 0;">
+                    <p style="color: #999; font-size: 12px; text-align: center;">© 2026 ChefJunior. All rights reserved.</p>
+                </div>
+            </body>
+        </html>
+        """,
+)
+
+register_template(
+    "notification_digest",
+    "You have $count unread notifications - ChefJunior",
+    """
+        <html>
+            <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;">
+                <div style="max-width: 600px; margin: 0 auto; background-color: white; padding: 30px; border-radius: 10px;">
+                    <h2 style="color: #333;">Hello $name,</h2>
+                    <p style="color: #666; font-size: 16px;">Here is what you missed on ChefJunior:</p>
+                    <ul style="padding-left: 20px;">$items</ul>
+                    $more
                     <hr style="border: none; border-top: 1px solid #eee; margin: 20px 0;">
                     <p style="color: #999; font-size: 12px; text-align: center;">© 2026 ChefJunior. All rights reserved.</p>
                 </div>
             </body>
         </html>
-        """
-
-        # Setup MIME
-        message = MIMEMultipart()
-        message["From"] = SENDER_EMAIL
-        message["To"] = to_email
-        message["Subject"] = subject
-        message.attach(MIMEText(body, "html"))
-
-        # Connect to Gmail Server
-        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT) as server:
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
+        """,
+)
+
+# One <li> of the digest; rendered per notification and passed in as SafeHTML
+DIGEST_ITEM = EmailTemplate(
+    "notification_digest_item",
+    "",
+    """<li style="margin-bottom: 12px;"><strong>$title</strong><br><span style="color: #666;">$message</span></li>""",
+)
+
+DIGEST_MORE = EmailTemplate(
+    "notification_digest_more",
+    "",
+    """<p style="color: #666; font-size: 14px;">...and $count more in the app.</p>""",
+)
+
+def otp_email(otp: str) -> Tuple[str, str]:
+    """Password reset OTP: (subject, html body)."""
+    return render_email("password_reset_otp", otp=otp)
+
+def verification_email(otp: str) -> Tuple[str, str]:
+    """Email verification OTP: (subject, html body)."""
+    return render_email("email_verification_otp", otp=otp)
+
+def build_message(to_email: str, subject: str, body: str) -> MIMEText:
+    # A single text/html part: nothing else is ever attached
+    message = MIMEText(body, "html", "utf-8")
+    message["From"] = settings.EMAIL_SENDER
+    message["To"] = to_email
+    message["Subject"] = subject
+    return message
+
+def open_smtp_connection() -> smtplib.SMTP:
+    """Connect (SSL or STARTTLS per settings) and log in."""
+    if settings.SMTP_USE_SSL:
+        server = smtplib.SMTP_SSL(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+    else:
+        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        if settings.SMTP_STARTTLS:
+            server.starttls()
+    if settings.SMTP_AUTH:
+        server.login(settings.EMAIL_SENDER, settings.EMAIL_PASSWORD)
+    return server
+
+class SMTPConnectionPool:
+    """
+    Keeps authenticated SMTP sessions open between sends. The TLS handshake
+    and login cost far more than sending a message, so a connection is reused
+    until it has been idle for `idle_seconds` (servers drop idle sessions) or
+    has sent `max_messages` (servers cap messages per session).
+
+        with pool.connection() as server:
             server.send_message(message)
-            
-        print(f"Email verification OTP sent successfully to {to_email}")
-        return True
 
+    A connection that raised is closed instead of being returned, unless the
+    error was the server rejecting that one message (the session is reset and
+    still usable).
+    """
+
+    def __init__(self, size: int, idle_seconds: float = 60, max_messages: int = 100, connect=open_smtp_connection):
+        self.size = size
+        self.idle_seconds = idle_seconds
+        self.max_messages = max_messages
+        self._connect = connect
+        self._idle: List[list] = []   # [server, messages_sent, last_used]
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def connection(self, messages: int = 1):
+        """Check out a session to send `messages` emails on."""
+        return _PooledConnection(self, messages)
+
+    def _acquire(self) -> list:
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    return [self._connect(), 0, time.monotonic()]
+                if time.monotonic() - entry[2] < self.idle_seconds:
+                    return entry
+                self._close(entry[0])
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, entry: list, broken: bool):
+        try:
+            if broken or entry[1] >= self.max_messages:
+                self._close(entry[0])
+            else:
+                entry[2] = time.monotonic()
+                with self._lock:
+                    self._idle.append(entry)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._close(entry[0])
+
+# smtplib sends RSET before raising these: the session can carry on
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+class _PooledConnection:
+    def __init__(self, pool: SMTPConnectionPool, messages: int):
+        self.pool = pool
+        self.messages = messages
+        self.entry: Optional[list] = None
+
+    def __enter__(self) -> smtplib.SMTP:
+        self.entry = self.pool._acquire()
+        return self.entry[0]
+
+    def __exit__(self, exc_type, exc, tb):
+        self.entry[1] += self.messages
+        broken = exc_type is not None and not issubclass(exc_type, MESSAGE_ERRORS)
+        self.pool._release(self.entry, broken=broken)
+        return False
+
+def send_email(to_email: str, subject: str, body: str) -> bool:
+    """Send one email right away on its own connection. Prefer the outbox (app.core.mailer)."""
+    try:
+        server = open_smtp_connection()
+        try:
+            server.send_message(build_message(to_email, subject, body))
+        finally:
+            SMTPConnectionPool._close(server)
+        print(f"Email sent successfully to {to_email}")
+        return True
     except Exception as e:
-        print(f"Failed to send email verification: {e}")
-        return False
\ No newline at end of file
+        print(f"Failed to send email: {e}")
+        return False
+
+def send_otp_email(to_email: str, otp: str):
+    return send_email(to_email, *otp_email(otp))
+
+def send_email_verification_otp(to_email: str, otp: str):
+    """
+    Send email verification OTP to user's email address.
+    OTP expires in 2 minutes.
+    """
+    return send_email(to_email, *verification_email(otp))
@@ -0,0 +1,263 @@
+"""
+Email outbox.
+
+Request handlers call mailer.enqueue(): one INSERT, and the request returns
+without waiting on SMTP. EMAIL_OUTBOX_WORKERS background threads claim due
+rows in batches and send them over a shared SMTPConnectionPool, so the TLS
+handshake and login are paid once per connection instead of once per email.
+
+Claiming is a conditional UPDATE on (id, next_attempt_at we read), so two
+workers (or two processes) never both claim a row. Claiming also pushes
+next_attempt_at out by EMAIL_CLAIM_SECONDS: if a worker dies mid-batch, its
+rows become due again on their own.
+
+Temporary failures are retried with exponential backoff (EMAIL_RETRY_BASE_SECONDS,
+doubling, with jitter) up to EMAIL_MAX_ATTEMPTS. Permanent ones (5xx replies,
+refused recipients) are marked failed straight away.
+
+Bodies can carry OTP codes, so a row's body is blanked as soon as it is sent
+or has failed for good. purge() deletes sent and failed rows older than
+EMAIL_OUTBOX_RETENTION_DAYS (run by the scheduler).
+"""
+import random
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.email_utils import SMTPConnectionPool, build_message
+from app.core.metrics import metrics
+from app.database import SessionLocal
+from app.models.email_outbox import OutboxEmail
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+MAX_RETRY_DELAY_SECONDS = 6 * 3600
+
+class _ConnectionFailed(Exception):
+    """The SMTP server can't be reached or refused our login: stop the batch."""
+
+def is_permanent_error(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException) and not isinstance(error, smtplib.SMTPAuthenticationError):
+        return 500 <= error.smtp_code < 600
+    return False
+
+class Mailer:
+    def __init__(
+        self,
+        pool: SMTPConnectionPool,
+        workers: int = 2,
+        batch_size: int = 20,
+        poll_seconds: float = 5,
+        max_attempts: int = 6,
+        retry_base_seconds: float = 30,
+        claim_seconds: int = 120,
+        session_factory=SessionLocal,
+    ):
+        self.pool = pool
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.claim_seconds = claim_seconds
+        self.session_factory = session_factory
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    # ---- producer side ----
+
+    def enqueue(self, db: Session, to_email: str, subject: str, body: str) -> int:
+        """Store the email for sending; returns its outbox id. Commits the session."""
+        row = OutboxEmail(to_email=to_email, subject=subject, body=body, status=PENDING,
+                          attempts=0, next_attempt_at=datetime.utcnow())
+        db.add(row)
+        db.commit()
+        metrics.inc("email.enqueued")
+        self._wakeup.set()
+        return row.id
+
+    def enqueue_many(self, db: Session, emails: List[Tuple[str, str, str]]) -> int:
+        """Store several (to_email, subject, body) in one commit; returns how many."""
+        now = datetime.utcnow()
+        db.add_all([
+            OutboxEmail(to_email=to_email, subject=subject, body=body, status=PENDING, attempts=0, next_attempt_at=now)
+            for to_email, subject, body in emails
+        ])
+        db.commit()
+        metrics.inc("email.enqueued", len(emails))
+        self._wakeup.set()
+        return len(emails)
+
+    # ---- worker side ----
+
+    def _claim(self, db: Session) -> List[OutboxEmail]:
+        now = datetime.utcnow()
+        due = db.execute(
+            select(OutboxEmail.id, OutboxEmail.next_attempt_at)
+            .where(OutboxEmail.status == PENDING, OutboxEmail.next_attempt_at <= now)
+            .order_by(OutboxEmail.next_attempt_at)
+            .limit(self.batch_size)
+        ).all()
+        if not due:
+            return []
+
+        lease = now + timedelta(seconds=self.claim_seconds)
+        claimed = []
+        for row in due:
+            result = db.execute(
+                update(OutboxEmail)
+                .where(OutboxEmail.id == row.id, OutboxEmail.status == PENDING,
+                       OutboxEmail.next_attempt_at == row.next_attempt_at)
+                .values(next_attempt_at=lease, attempts=OutboxEmail.attempts + 1)
+            )
+            if result.rowcount:
+                claimed.append(row.id)
+        db.commit()
+        if not claimed:
+            return []
+        return list(db.execute(select(OutboxEmail).where(OutboxEmail.id.in_(claimed))).scalars())
+
+    def _send(self, row: OutboxEmail):
+        message = build_message(row.to_email, row.subject, row.body)
+        # A pooled session may have been dropped by the server: retry once on a fresh one
+        for attempt in range(2):
+            try:
+                with self.pool.connection() as server:
+                    server.send_message(message)
+                return
+            except smtplib.SMTPServerDisconnected:
+                if attempt:
+                    raise _ConnectionFailed("server disconnected")
+            except (smtplib.SMTPConnectError, smtplib.SMTPAuthenticationError) as e:
+                raise _ConnectionFailed(str(e))
+            except smtplib.SMTPException:
+                raise  # a reply about this message; the session is fine
+            except OSError as e:  # refused, timed out, TLS failure
+                raise _ConnectionFailed(str(e) or type(e).__name__)
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = self.retry_base_seconds * (2 ** max(0, attempts - 1))
+        return min(delay, MAX_RETRY_DELAY_SECONDS) * random.uniform(0.8, 1.2)
+
+    def process_batch(self) -> int:
+        """Claim and send one batch; returns how many emails were attempted."""
+        with self.session_factory() as db:
+            rows = self._claim(db)
+            if not rows:
+                return 0
+
+            errors: Dict[int, Optional[Exception]] = {}
+            connection_error = None
+            for row in rows:
+                if connection_error is not None:
+                    errors[row.id] = connection_error
+                    continue
+                started = time.perf_counter()
+                try:
+                    self._send(row)
+                    errors[row.id] = None
+                except _ConnectionFailed as e:
+                    connection_error = errors[row.id] = e
+                except smtplib.SMTPException as e:
+                    errors[row.id] = e
+                finally:
+                    metrics.observe("email.send", time.perf_counter() - started)
+
+            self._record(db, rows, errors)
+            return len(rows)
+
+    def _record(self, db: Session, rows: List[OutboxEmail], errors: Dict[int, Optional[Exception]]):
+        now = datetime.utcnow()
+        sent_ids = [row.id for row in rows if errors[row.id] is None]
+        if sent_ids:
+            db.execute(
+                update(OutboxEmail).where(OutboxEmail.id.in_(sent_ids))
+                .values(status=SENT, sent_at=now, last_error=None, body="")
+            )
+            metrics.inc("email.sent", len(sent_ids))
+
+        for row in rows:
+            error = errors[row.id]
+            if error is None:
+                continue
+            message = f"{type(error).__name__}: {error}"[:1000]
+            if is_permanent_error(error) or row.attempts >= self.max_attempts:
+                db.execute(update(OutboxEmail).where(OutboxEmail.id == row.id)
+                           .values(status=FAILED, last_error=message, body=""))
+                metrics.inc("email.failed")
+                print(f"Email {row.id} to {row.to_email} failed permanently: {message}")
+            else:
+                retry_at = now + timedelta(seconds=self._retry_delay(row.attempts))
+                db.execute(update(OutboxEmail).where(OutboxEmail.id == row.id)
+                           .values(next_attempt_at=retry_at, last_error=message))
+                metrics.inc("email.retried")
+        db.commit()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                if self.process_batch():
+                    continue
+            except Exception as e:
+                print(f"Email outbox worker failed: {e}")
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"email-outbox-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop the workers (each finishes its current batch) and close pooled connections."""
+        if not self._threads:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.pool.close()
+
+    def counts(self, db: Session) -> Dict[str, int]:
+        """Outbox rows per status."""
+        rows = db.execute(select(OutboxEmail.status, func.count()).group_by(OutboxEmail.status)).all()
+        return {status: count for status, count in rows}
+
+    def purge(self, db: Session, older_than: timedelta) -> int:
+        """Delete sent and failed rows created more than `older_than` ago; returns how many."""
+        cutoff = datetime.utcnow() - older_than
+        removed = db.execute(
+            delete(OutboxEmail)
+            .where(OutboxEmail.status.in_([SENT, FAILED]), OutboxEmail.created_at < cutoff)
+        ).rowcount
+        db.commit()
+        metrics.inc("email.purged", removed)
+        return removed
+
+mailer = Mailer(
+    pool=SMTPConnectionPool(
+        size=settings.EMAIL_OUTBOX_WORKERS or 1,
+        idle_seconds=settings.SMTP_IDLE_SECONDS,
+        max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+    ),
+    workers=settings.EMAIL_OUTBOX_WORKERS,
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_seconds=settings.EMAIL_OUTBOX_POLL_SECONDS,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    retry_base_seconds=settings.EMAIL_RETRY_BASE_SECONDS,
+    claim_seconds=settings.EMAIL_CLAIM_SECONDS,
+)
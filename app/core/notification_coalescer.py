@@ -0,0 +1,159 @@
+"""
+Coalesce bursts of same-kind events into one notification per recipient.
+
+Instead of one row per event per recipient, add() buffers events in memory
+keyed by (recipient, kind). A group is written once its window
+(NOTIFICATION_COALESCE_WINDOWS[kind], default
+NOTIFICATION_COALESCE_WINDOW_SECONDS) has passed since its first event:
+
+    1 event     "New user joined"   / "Ana has joined"
+    12 events   "12 new users joined" / "Ana, Ben, Chloe and 9 more joined"
+
+When written, the group is folded into the recipient's unread notification
+of that kind created within the window, if there is one (events buffered by
+another worker, or the previous flush), so a long burst still produces one
+row per window. Only the new row counts as unread.
+
+A background thread flushes due groups every second; stop() flushes
+everything, so a clean shutdown loses nothing (a crash loses at most one
+window of events).
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud import crud_notification
+from app.database import SessionLocal
+
+@dataclass(frozen=True)
+class EventKind:
+    title: str          # one event
+    message: str        # one event; {actor}
+    title_many: str     # {count}
+    message_many: str   # {actors}: "Ana, Ben and 9 more"
+    type: str = "info"
+
+    def render(self, count: int, actors: List[str]) -> Tuple[str, str]:
+        if count == 1 and actors:
+            return self.title, self.message.format(actor=actors[-1])
+        names = ", ".join(actors)
+        if count > len(actors):
+            names = f"{names} and {count - len(actors)} more" if names else f"{count} users"
+        return self.title_many.format(count=count), self.message_many.format(actors=names)
+
+EVENT_KINDS: Dict[str, EventKind] = {
+    "user_joined": EventKind(
+        title="New user joined",
+        message="{actor} has joined",
+        title_many="{count} new users joined",
+        message_many="{actors} joined",
+        type="success",
+    ),
+}
+
+@dataclass
+class _Group:
+    first_at: float
+    window: float
+    count: int = 0
+    actors: List[str] = field(default_factory=list)
+
+class NotificationCoalescer:
+    def __init__(
+        self,
+        window_seconds: float = 60,
+        windows: Optional[Dict[str, float]] = None,
+        max_actors: int = 3,
+        session_factory=SessionLocal,
+        poll_seconds: float = 1.0,
+    ):
+        self.window_seconds = window_seconds
+        self.windows = windows or {}
+        self.max_actors = max_actors
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self._groups: Dict[Tuple[int, str], _Group] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def window_for(self, kind: str) -> float:
+        return self.windows.get(kind, self.window_seconds)
+
+    def add(self, recipient_ids: Iterable[int], kind: str, actor: Optional[str] = None):
+        """Record one `kind` event for each recipient; never touches the database."""
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"Unknown notification event kind: {kind!r}")
+        now = time.monotonic()
+        with self._lock:
+            for recipient_id in recipient_ids:
+                group = self._groups.get((recipient_id, kind))
+                if group is None:
+                    group = self._groups[(recipient_id, kind)] = _Group(first_at=now, window=self.window_for(kind))
+                group.count += 1
+                if actor:
+                    group.actors = (group.actors + [actor])[-self.max_actors:]
+                metrics.inc("notifications.coalesce.events")
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(group.count for group in self._groups.values())
+
+    def flush(self, force: bool = False) -> int:
+        """Write the groups whose window has passed (all of them with force); returns rows written."""
+        now = time.monotonic()
+        with self._lock:
+            due = {key: group for key, group in self._groups.items() if force or now - group.first_at >= group.window}
+            for key in due:
+                del self._groups[key]
+        if not due:
+            return 0
+
+        written = 0
+        with self._flush_lock, self.session_factory() as db:
+            for (recipient_id, kind), group in due.items():
+                event_kind = EVENT_KINDS[kind]
+                try:
+                    crud_notification.add_coalesced(
+                        db, recipient_id, kind, group.count, group.actors, event_kind.render, event_kind.type,
+                        window_start=datetime.utcnow() - timedelta(seconds=group.window),
+                        max_actors=self.max_actors,
+                    )
+                    written += 1
+                except Exception as e:
+                    db.rollback()
+                    metrics.inc("notifications.coalesce.errors")
+                    print(f"Coalesced notification for user {recipient_id} ({kind}) failed: {e}")
+        metrics.inc("notifications.coalesce.rows", written)
+        return written
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Notification coalescer flush failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="notification-coalescer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still buffered."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush(force=True)
+
+coalescer = NotificationCoalescer(
+    window_seconds=settings.NOTIFICATION_COALESCE_WINDOW_SECONDS,
+    windows=settings.NOTIFICATION_COALESCE_WINDOWS,
+    max_actors=settings.NOTIFICATION_COALESCE_MAX_ACTORS,
+)
@@ -0,0 +1,234 @@
+"""
+Push notifications to connected dashboards instead of having them poll.
+
+crud_notification publishes an event whenever a user's notifications
+change; GET /notifications/stream (SSE) subscribes to that user's events.
+
+    {"type": "notification", "notification": {...}, "unread_delta": 1}
+    {"type": "notification_updated", "notification": {...}, "unread_delta": 0}
+                                                       a coalesced one took more events
+    {"type": "unread_delta", "unread_delta": -1}      one marked as read
+    {"type": "unread_count", "unread_count": 0}       absolute (read-all, snapshot)
+    {"type": "resync"}                                 events were dropped: refetch
+
+Broadcasts don't publish per recipient: each fan-out chunk sends one
+"resync" to the streams whose user id falls in the chunk's range.
+
+Each subscriber gets a bounded asyncio.Queue. Publishing is thread-safe
+(sync handlers run in the threadpool) and never blocks: if a slow client's
+queue is full its events are replaced by a single "resync".
+
+The backplane carries events between workers (NOTIFICATION_BACKPLANE):
+  - "local":    this process only (one worker)
+  - "postgres": NOTIFY on publish, and a LISTEN thread in every worker
+                delivers to its own subscribers
+"""
+import asyncio
+import json
+import select
+import threading
+from typing import Dict, Optional, Set
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.database import engine
+
+class Subscription:
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def _put(self, event: dict):
+        # Runs on the subscriber's event loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            metrics.inc("notifications.hub.overflow")
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event.get("type") == "resync":
+            self.overflowed = False
+        return event
+
+class NotificationHub:
+    def __init__(self, backplane=None, queue_size: int = 100, max_streams_per_user: int = 5):
+        self.queue_size = queue_size
+        self.max_streams_per_user = max_streams_per_user
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self.backplane = backplane or LocalBackplane()
+        self.backplane.attach(self)
+
+    def subscribe(self, user_id: int) -> Optional[Subscription]:
+        """Register a stream for the user (call from its event loop); None if at the per-user limit."""
+        subscription = Subscription(user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            streams = self._subscribers.setdefault(user_id, set())
+            if len(streams) >= self.max_streams_per_user:
+                return None
+            streams.add(subscription)
+            metrics.set_gauge("notifications.hub.streams", sum(len(s) for s in self._subscribers.values()))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            streams = self._subscribers.get(subscription.user_id)
+            if streams is not None:
+                streams.discard(subscription)
+                if not streams:
+                    del self._subscribers[subscription.user_id]
+            metrics.set_gauge("notifications.hub.streams", sum(len(s) for s in self._subscribers.values()))
+
+    def publish(self, user_id: int, event: dict):
+        """Send an event to the user's streams in every worker."""
+        metrics.inc("notifications.hub.published")
+        self.backplane.publish(user_id, event)
+
+    def publish_range(self, first_user_id: int, last_user_id: int, event: dict):
+        """Send one event to the streams of every user id in [first, last], in every worker."""
+        metrics.inc("notifications.hub.published")
+        self.backplane.publish_range(first_user_id, last_user_id, event)
+
+    def deliver(self, user_id: int, event: dict):
+        """Hand an event to this process's streams for the user (called by the backplane)."""
+        with self._lock:
+            streams = list(self._subscribers.get(user_id, ()))
+        self._put_all(streams, event)
+
+    def deliver_range(self, first_user_id: int, last_user_id: int, event: dict):
+        with self._lock:
+            streams = [
+                subscription
+                for user_id, subscriptions in self._subscribers.items()
+                if first_user_id <= user_id <= last_user_id
+                for subscription in subscriptions
+            ]
+        self._put_all(streams, event)
+
+    def _put_all(self, streams, event: dict):
+        for subscription in streams:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, event)
+            except RuntimeError:
+                pass  # loop already closed; the stream's finally will unsubscribe it
+
+    def stream_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def start(self):
+        self.backplane.start()
+
+    def stop(self):
+        self.backplane.stop()
+
+class LocalBackplane:
+    def attach(self, hub: NotificationHub):
+        self.hub = hub
+
+    def publish(self, user_id: int, event: dict):
+        self.hub.deliver(user_id, event)
+
+    def publish_range(self, first_user_id: int, last_user_id: int, event: dict):
+        self.hub.deliver_range(first_user_id, last_user_id, event)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+class PostgresBackplane:
+    """
+    pg_notify() on publish; one LISTEN connection per worker delivers to the
+    local hub (including this worker's own events). Payloads must stay under
+    Postgres' 8000 byte limit: oversized events are sent as a "resync".
+    """
+
+    MAX_PAYLOAD = 7900
+
+    def __init__(self, channel: str = "notification_events"):
+        self.channel = channel
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def attach(self, hub: NotificationHub):
+        self.hub = hub
+
+    def publish(self, user_id: int, event: dict):
+        payload = json.dumps({"user_id": user_id, "event": event}, default=str)
+        if len(payload.encode("utf-8")) > self.MAX_PAYLOAD:
+            payload = json.dumps({"user_id": user_id, "event": {"type": "resync"}})
+        self._notify(payload)
+
+    def publish_range(self, first_user_id: int, last_user_id: int, event: dict):
+        self._notify(json.dumps({"user_range": [first_user_id, last_user_id], "event": event}, default=str))
+
+    def _notify(self, payload: str):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+            conn.commit()
+
+    def _listen(self):
+        while not self._stop.is_set():
+            raw = None
+            try:
+                raw = engine.raw_connection()
+                connection = raw.driver_connection
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                while not self._stop.is_set():
+                    if select.select([connection], [], [], 1.0)[0]:
+                        connection.poll()
+                        while connection.notifies:
+                            notify = connection.notifies.pop(0)
+                            message = json.loads(notify.payload)
+                            if "user_range" in message:
+                                self.hub.deliver_range(*message["user_range"], message["event"])
+                            else:
+                                self.hub.deliver(message["user_id"], message["event"])
+            except Exception as e:
+                print(f"Notification backplane listener failed, reconnecting: {e}")
+                self._stop.wait(1.0)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.invalidate()  # LISTEN state must not go back to the pool
+                    except Exception:
+                        pass
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._listen, name="notification-backplane", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+BACKPLANES = {
+    "local": LocalBackplane,
+    "postgres": PostgresBackplane,
+}
+
+hub = NotificationHub(
+    backplane=BACKPLANES[settings.NOTIFICATION_BACKPLANE](),
+    queue_size=settings.NOTIFICATION_STREAM_QUEUE_SIZE,
+    max_streams_per_user=settings.NOTIFICATION_MAX_STREAMS_PER_USER,
+)
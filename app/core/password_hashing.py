@@ -0,0 +1,113 @@
+"""
+Async bcrypt entry points backed by a bounded process pool.
+
+bcrypt burns tens of milliseconds of CPU per call. Running it inline in a
+sync handler ties up one of FastAPI's threadpool slots for the whole time, so
+a login burst starves every other endpoint. Here hashing runs in
+PASSWORD_HASH_WORKERS separate processes; handlers just await the result.
+
+At most PASSWORD_HASH_MAX_PENDING hashes may be queued or running. Beyond
+that we shed load with 503 + Retry-After instead of letting the queue (and
+every caller's latency) grow without bound.
+
+PASSWORD_HASH_WORKERS=0 hashes in the default thread pool instead (handy for
+development and as the "before" case in scripts/benchmark_login.py).
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from fastapi import HTTPException, status
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core import security
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+def _hash_job(password: str, submitted_at: float):
+    started = time.time()
+    hashed = security.get_password_hash(password)
+    return hashed, started - submitted_at, time.time() - started
+
+def _verify_job(password: str, hashed_password: str, submitted_at: float):
+    started = time.time()
+    ok = security.verify_password(password, hashed_password)
+    return ok, started - submitted_at, time.time() - started
+
+def _verify_and_update_job(password: str, hashed_password: str, submitted_at: float):
+    started = time.time()
+    result = security.verify_and_update_password(password, hashed_password)
+    return result, started - submitted_at, time.time() - started
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a process that already runs the server's threads
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _pool
+
+def _acquire_slot():
+    global _pending
+    with _pending_lock:
+        if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            metrics.inc("password_hash.rejected")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+        metrics.set_gauge("password_hash.pending", _pending)
+
+def _release_slot():
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+        metrics.set_gauge("password_hash.pending", _pending)
+
+async def _run(job, *args):
+    _acquire_slot()
+    try:
+        loop = asyncio.get_running_loop()
+        result, queue_wait, hash_time = await loop.run_in_executor(_get_pool(), job, *args, time.time())
+    finally:
+        _release_slot()
+
+    metrics.observe("password_hash.queue_wait", max(queue_wait, 0.0))
+    metrics.observe("password_hash.hash_time", hash_time)
+    return result
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash_job, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run(_verify_job, plain_password, hashed_password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str):
+    """(ok, new_hash); new_hash is set when the stored hash should be replaced."""
+    return await _run(_verify_and_update_job, plain_password, hashed_password)
+
+def warm_up():
+    """Start the worker processes ahead of the first login."""
+    pool = _get_pool()
+    if pool is not None:
+        for _ in range(settings.PASSWORD_HASH_WORKERS):
+            pool.submit(time.time)
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
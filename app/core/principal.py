@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+from typing import Annotated
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core import security
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.database import get_db
+from app.models.user import User
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user, as much of it as request handling needs."""
+    id: int
+    is_active: bool
+    is_superuser: bool
+    language: str = "en"
+
+# user_id -> Principal. Writes that change these fields call invalidate_principal(); the
+# TTL bounds how stale another worker's copy can be.
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    name="auth.principal_cache",
+)
+
+def load_principal(db: Session, user_id: int):
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    row = db.execute(
+        select(User.id, User.is_active, User.is_superuser, User.language).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+
+    principal = Principal(
+        id=row.id,
+        is_active=bool(row.is_active),
+        is_superuser=bool(row.is_superuser),
+        language=row.language or "en",
+    )
+    principal_cache.set(user_id, principal)
+    return principal
+
+def invalidate_principal(user_id: int):
+    """Drop the cached principal after the user's row changes (or is deleted)."""
+    principal_cache.pop(user_id)
+
+def get_current_principal(
+    current_user_id: int = Depends(security.get_current_user),
+    db: Session = Depends(get_db),
+) -> Principal:
+    """Dependency: the active user behind the bearer token (no users query on a cache hit)."""
+    principal = load_principal(db, current_user_id)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
+    return principal
+
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
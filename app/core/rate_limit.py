@@ -0,0 +1,342 @@
+"""
+Rate limiting for the auth endpoints that cost a bcrypt hash, an SMTP send,
+or an OTP guess.
+
+RateLimitMiddleware is a plain ASGI middleware. Requests to paths without a
+policy pass straight through after one dict lookup. For limited paths the
+client IP is checked first. Only then is the (small) body read to key the
+request by email. The body is replayed to the app untouched.
+
+Algorithms:
+  - token bucket: `limit` requests of burst, refilled evenly over `period`
+  - sliding window: at most `limit` requests in any `period` (two-bucket
+    approximation, O(1) state per key)
+
+Backends (RATE_LIMIT_BACKEND):
+  - "memory":   per-process, sharded dicts and locks; microseconds per check
+  - "database": counters in the rate_limit_counters table, shared by every
+                worker. Every policy runs as a sliding window there.
+"""
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from sqlalchemy import select, delete, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.database import SessionLocal
+from app.models.rate_limit import RateLimitCounter
+
+TOKEN_BUCKET = "token_bucket"
+SLIDING_WINDOW = "sliding_window"
+
+@dataclass(frozen=True)
+class Policy:
+    name: str
+    limit: int
+    period: float            # seconds
+    key: str = "ip"          # "ip" or "email"
+    algorithm: str = TOKEN_BUCKET
+
+MINUTE = 60
+_AUTH = "/api/v1/auth"
+
+# path -> policies, checked in order (IP policies first: they don't need the body)
+ROUTE_POLICIES: Dict[str, List[Policy]] = {
+    f"{_AUTH}/login": [
+        Policy("login:ip", 20, MINUTE),
+        Policy("login:email", 5, MINUTE, key="email"),
+    ],
+    f"{_AUTH}/login/access-token": [
+        Policy("login:ip", 20, MINUTE),
+        Policy("login:email", 5, MINUTE, key="email"),
+    ],
+    f"{_AUTH}/signup": [
+        Policy("signup:ip", 5, MINUTE),
+        Policy("signup:email", 3, 15 * MINUTE, key="email", algorithm=SLIDING_WINDOW),
+    ],
+    f"{_AUTH}/forgot-password": [
+        Policy("otp-send:ip", 10, MINUTE),
+        Policy("otp-send:email", 3, 15 * MINUTE, key="email", algorithm=SLIDING_WINDOW),
+    ],
+    f"{_AUTH}/resend-otp": [
+        Policy("otp-send:ip", 10, MINUTE),
+        Policy("otp-send:email", 3, 15 * MINUTE, key="email", algorithm=SLIDING_WINDOW),
+    ],
+    f"{_AUTH}/send-verification-otp": [
+        Policy("otp-send:ip", 10, MINUTE),
+        Policy("otp-send:email", 3, 15 * MINUTE, key="email", algorithm=SLIDING_WINDOW),
+    ],
+    f"{_AUTH}/resend-verification-otp": [
+        Policy("otp-send:ip", 10, MINUTE),
+        Policy("otp-send:email", 3, 15 * MINUTE, key="email", algorithm=SLIDING_WINDOW),
+    ],
+    f"{_AUTH}/verify-otp": [
+        Policy("otp-check:ip", 20, MINUTE),
+        Policy("otp-check:email", 10, 15 * MINUTE, key="email", algorithm=SLIDING_WINDOW),
+    ],
+    f"{_AUTH}/verify-email": [
+        Policy("otp-check:ip", 20, MINUTE),
+        Policy("otp-check:email", 10, 15 * MINUTE, key="email", algorithm=SLIDING_WINDOW),
+    ],
+    f"{_AUTH}/reset-password": [
+        Policy("otp-check:ip", 20, MINUTE),
+        Policy("otp-check:email", 10, 15 * MINUTE, key="email", algorithm=SLIDING_WINDOW),
+    ],
+}
+
+class MemoryRateLimitBackend:
+    """Per-process state, spread over `shards` dicts so threads rarely share a lock."""
+
+    blocking = False
+
+    def __init__(self, shards: int = 16, max_keys_per_shard: int = 10000):
+        self.max_keys_per_shard = max_keys_per_shard
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+
+    def hit(self, key: str, policy: Policy, now: float) -> float:
+        """Counts one request; returns 0 if allowed, else seconds until it would be."""
+        state, lock = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            if policy.algorithm == TOKEN_BUCKET:
+                retry_after = self._token_bucket(state, key, policy, now)
+            else:
+                retry_after = self._sliding_window(state, key, policy, now)
+            if len(state) > self.max_keys_per_shard:
+                self._evict(state, now)
+        return retry_after
+
+    @staticmethod
+    def _token_bucket(state, key, policy, now):
+        rate = policy.limit / policy.period
+        tokens, last, _ = state.get(key, (policy.limit, now, 0.0))
+        tokens = min(policy.limit, tokens + (now - last) * rate)
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / rate
+        # Last field: when the bucket is full again and the entry can be evicted
+        state[key] = (tokens, now, now + (policy.limit - tokens) / rate)
+        return retry_after
+
+    @staticmethod
+    def _sliding_window(state, key, policy, now):
+        window = int(now // policy.period)
+        start, current, previous, _ = state.get(key, (window, 0, 0, 0.0))
+        if window != start:
+            previous = current if window == start + 1 else 0
+            current = 0
+            start = window
+
+        elapsed = now - start * policy.period
+        weight = 1 - elapsed / policy.period
+        if previous * weight + current + 1 > policy.limit:
+            if current + 1 > policy.limit or previous == 0:
+                retry_after = policy.period - elapsed
+            else:
+                # The previous window's share shrinks linearly; wait until one slot frees up
+                needed = 1 - (policy.limit - current - 1) / previous
+                retry_after = max(needed * policy.period - elapsed, 0.001)
+            state[key] = (start, current, previous, (start + 2) * policy.period)
+            return retry_after
+
+        state[key] = (start, current + 1, previous, (start + 2) * policy.period)
+        return 0.0
+
+    @staticmethod
+    def _evict(state, now):
+        for key in [k for k, entry in state.items() if entry[-1] <= now]:
+            del state[key]
+
+    def clear(self):
+        for state, lock in self._shards:
+            with lock:
+                state.clear()
+
+class DatabaseRateLimitBackend:
+    """
+    Sliding-window counters in the rate_limit_counters table, shared by all
+    workers. Costs two short statements per limited request.
+
+    Like the memory backend, a rejected request is not counted: the window
+    is read first and only an allowed request increments it. Workers
+    checking the same key at the same instant can each pass the check, so
+    the limit may be overshot by about the number of concurrent requests.
+    """
+
+    blocking = True  # does I/O: run off the event loop
+
+    def hit(self, key: str, policy: Policy, now: float) -> float:
+        window = int(now // policy.period)
+        with SessionLocal() as db:
+            counts = dict(db.execute(
+                select(RateLimitCounter.window, RateLimitCounter.count)
+                .where(RateLimitCounter.key == key, RateLimitCounter.window.in_([window - 1, window]))
+            ).all())
+            elapsed = now - window * policy.period
+            previous, current = counts.get(window - 1, 0), counts.get(window, 0)
+            if previous * (1 - elapsed / policy.period) + current + 1 > policy.limit:
+                return policy.period - elapsed
+            self._increment(db, key, window, int((window + 2) * policy.period))
+            # Occasionally drop counters that no longer matter
+            if random.random() < 0.001:
+                db.execute(delete(RateLimitCounter).where(RateLimitCounter.expires_at < int(now)))
+                db.commit()
+        return 0.0
+
+    @staticmethod
+    def _increment(db, key: str, window: int, expires_at: int):
+        result = db.execute(
+            update(RateLimitCounter)
+            .where(RateLimitCounter.key == key, RateLimitCounter.window == window)
+            .values(count=RateLimitCounter.count + 1)
+        )
+        if result.rowcount == 0:
+            db.add(RateLimitCounter(key=key, window=window, count=1, expires_at=expires_at))
+            try:
+                db.commit()
+                return
+            except IntegrityError:
+                # Another worker created it first
+                db.rollback()
+                db.execute(
+                    update(RateLimitCounter)
+                    .where(RateLimitCounter.key == key, RateLimitCounter.window == window)
+                    .values(count=RateLimitCounter.count + 1)
+                )
+        db.commit()
+
+    def clear(self):
+        with SessionLocal() as db:
+            db.execute(delete(RateLimitCounter))
+            db.commit()
+
+BACKENDS = {
+    "memory": lambda: MemoryRateLimitBackend(shards=settings.RATE_LIMIT_SHARDS),
+    "database": DatabaseRateLimitBackend,
+}
+
+class RateLimiter:
+    def __init__(self, backend, policies: Dict[str, List[Policy]], clock=time.time):
+        self.backend = backend
+        self.policies = policies
+        self.clock = clock
+
+    def check(self, policy: Policy, identity: str) -> float:
+        retry_after = self.backend.hit(f"{policy.name}:{identity}", policy, self.clock())
+        if retry_after:
+            metrics.inc(f"rate_limit.rejected.{policy.name}")
+        return retry_after
+
+    async def check_async(self, policy: Policy, identity: str) -> float:
+        if not self.backend.blocking:
+            return self.check(policy, identity)
+        retry_after = await run_in_threadpool(self.backend.hit, f"{policy.name}:{identity}", policy, self.clock())
+        if retry_after:
+            metrics.inc(f"rate_limit.rejected.{policy.name}")
+        return retry_after
+
+def _client_ip(scope) -> str:
+    if settings.RATE_LIMIT_TRUST_PROXY:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def _email_from_body(body: bytes, content_type: str) -> Optional[str]:
+    try:
+        if content_type.startswith("application/json"):
+            data = json.loads(body or b"{}")
+            email = data.get("email") if isinstance(data, dict) else None
+        elif content_type.startswith("application/x-www-form-urlencoded"):
+            form = parse_qs(body.decode("utf-8"))
+            email = (form.get("username") or form.get("email") or [None])[0]
+        else:
+            return None
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) else None
+
+class RateLimitMiddleware:
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        policies = self.limiter.policies.get(scope["path"].rstrip("/"))
+        if not policies:
+            return await self.app(scope, receive, send)
+
+        ip = _client_ip(scope)
+        body, email = None, None
+        for policy in policies:
+            if policy.key == "email":
+                if body is None:
+                    body, receive = await self._buffer_body(receive)
+                    email = _email_from_body(body, self._content_type(scope))
+                if email is None:
+                    continue
+                retry_after = await self.limiter.check_async(policy, email)
+            else:
+                retry_after = await self.limiter.check_async(policy, ip)
+
+            if retry_after:
+                return await self._reject(send, retry_after)
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _content_type(scope) -> str:
+        for name, value in scope.get("headers", []):
+            if name == b"content-type":
+                return value.decode("latin-1").lower()
+        return ""
+
+    @staticmethod
+    async def _buffer_body(receive) -> Tuple[bytes, Callable]:
+        chunks = []
+        more = True
+        while more:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return body, replay
+
+    @staticmethod
+    async def _reject(send, retry_after: float):
+        seconds = max(1, math.ceil(retry_after))
+        payload = json.dumps({"detail": f"Too many requests. Try again in {seconds} seconds."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+                (b"retry-after", str(seconds).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+limiter = RateLimiter(BACKENDS[settings.RATE_LIMIT_BACKEND](), ROUTE_POLICIES)
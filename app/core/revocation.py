@@ -0,0 +1,281 @@
+"""
+Token revocation without a database query per request.
+
+Every access/refresh token carries a `jti` and an `iat`. Revoking adds either
+the jti (logout, refresh rotation) or a per-user cutoff (account disabled or
+deleted: every token issued before it is dead) to an in-memory store:
+
+- a Bloom filter answers "definitely not revoked" for almost every token
+  without touching the map;
+- a jti -> expiry map confirms Bloom hits; entries leave when the token
+  would have expired anyway, so memory tracks live revocations only.
+
+A backend shares revocations between workers. "local" keeps them in this
+process (single worker, tests); "database" appends to the revoked_tokens
+table, and a background thread pulls new rows every REVOCATION_SYNC_SECONDS.
+Checks always stay in memory.
+
+Ids are handed out at INSERT but rows become visible at COMMIT, so a sync
+can see id 11 before id 10 exists. Ids skipped over that way are re-read on
+every sync for REVOCATION_GAP_SECONDS (an id that never shows up was a
+rolled-back insert, e.g. a duplicate jti).
+"""
+import calendar
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, delete, or_
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.revoked_token import RevokedToken
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+def _to_epoch(value: datetime) -> float:
+    return calendar.timegm(value.utctimetuple())
+
+def _to_datetime(epoch: float) -> datetime:
+    return datetime.utcfromtimestamp(epoch)
+
+class LocalRevocationBackend:
+    """Nothing is shared: revocations only apply to this process."""
+
+    def publish_token(self, jti: str, expires_at: float):
+        pass
+
+    def publish_user(self, user_id: int, cutoff: float, expires_at: float):
+        pass
+
+    def fetch_since(self, last_id: int) -> Tuple[List[tuple], int]:
+        return [], last_id
+
+    def purge_expired(self, now: float):
+        pass
+
+MAX_TRACKED_GAPS = 1000
+
+class DatabaseRevocationBackend:
+    """Shares revocations through the revoked_tokens table."""
+
+    def __init__(self, gap_seconds: float = 60, clock=time.time):
+        self.gap_seconds = gap_seconds
+        self.clock = clock
+        self._gaps: Dict[int, float] = {}  # id skipped over (not committed yet?) -> when first missed
+
+    def publish_token(self, jti: str, expires_at: float):
+        with SessionLocal() as db:
+            db.add(RevokedToken(jti=jti, expires_at=_to_datetime(expires_at)))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # already revoked (e.g. by another worker)
+
+    def publish_user(self, user_id: int, cutoff: float, expires_at: float):
+        with SessionLocal() as db:
+            db.add(RevokedToken(user_id=user_id, revoked_at=_to_datetime(cutoff), expires_at=_to_datetime(expires_at)))
+            db.commit()
+
+    def fetch_since(self, last_id: int) -> Tuple[List[tuple], int]:
+        """
+        Rows added after last_id, plus rows that were still missing below it,
+        as (jti, user_id, revoked_at, expires_at) epochs.
+        """
+        now = self.clock()
+        self._gaps = {row_id: missed for row_id, missed in self._gaps.items() if now - missed < self.gap_seconds}
+        condition = RevokedToken.id > last_id
+        if self._gaps:
+            condition = or_(condition, RevokedToken.id.in_(list(self._gaps)))
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(RevokedToken.id, RevokedToken.jti, RevokedToken.user_id,
+                       RevokedToken.revoked_at, RevokedToken.expires_at)
+                .where(condition, RevokedToken.expires_at > datetime.utcnow())
+                .order_by(RevokedToken.id)
+            ).all()
+        if not rows:
+            return [], last_id
+
+        seen = {r.id for r in rows}
+        for row_id in seen & self._gaps.keys():
+            del self._gaps[row_id]
+        newest = max(last_id, rows[-1].id)
+        # On the first load, ids below the newest are mostly purged rows: only watch the recent ones
+        for row_id in range(max(last_id, newest - MAX_TRACKED_GAPS) + 1, newest):
+            if row_id not in seen:
+                self._gaps.setdefault(row_id, now)
+        entries = [(r.jti, r.user_id, _to_epoch(r.revoked_at), _to_epoch(r.expires_at)) for r in rows]
+        return entries, newest
+
+    def purge_expired(self, now: float):
+        with SessionLocal() as db:
+            db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= _to_datetime(now)))
+            db.commit()
+
+BACKENDS = {
+    "local": LocalRevocationBackend,
+    "database": lambda: DatabaseRevocationBackend(gap_seconds=settings.REVOCATION_GAP_SECONDS),
+}
+
+class RevocationStore:
+    def __init__(self, backend, bloom_capacity: int = 100000, clock=time.time):
+        self.backend = backend
+        self.bloom_capacity = bloom_capacity
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, float] = {}                   # jti -> expires_at
+        self._users: Dict[str, Tuple[float, float]] = {}      # sub -> (cutoff, expires_at)
+        self._bloom = BloomFilter(bloom_capacity)
+        self._last_id = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ---- checks (hot path) ----
+
+    def is_revoked(self, claims: dict) -> bool:
+        jti = claims.get("jti")
+        if jti is not None and self._tokens and jti in self._bloom:
+            expires_at = self._tokens.get(jti)
+            if expires_at is not None and expires_at > self.clock():
+                return True
+
+        if self._users:
+            entry = self._users.get(claims.get("sub"))
+            if entry is not None and entry[1] > self.clock():
+                # Tokens without iat predate revocation support: treat as old
+                return claims.get("iat", 0) < entry[0]
+        return False
+
+    # ---- revoking ----
+
+    def _add_token(self, jti: str, expires_at: float):
+        with self._lock:
+            if jti in self._tokens:
+                return
+            self._tokens[jti] = expires_at
+            if self._bloom.count >= self._bloom.capacity:
+                self._rebuild_bloom()
+            else:
+                self._bloom.add(jti)
+
+    def _add_user(self, sub: str, cutoff: float, expires_at: float):
+        with self._lock:
+            current = self._users.get(sub)
+            if current is None or cutoff > current[0]:
+                self._users[sub] = (cutoff, max(expires_at, current[1] if current else 0))
+
+    def revoke_token(self, jti: str, expires_at: float):
+        """Revoke one token until it expires."""
+        if expires_at <= self.clock():
+            return
+        self._add_token(jti, expires_at)
+        self.backend.publish_token(jti, expires_at)
+
+    def revoke_claims(self, claims: dict) -> bool:
+        """Revoke the token these (verified) claims came from; False if it has no jti."""
+        jti = claims.get("jti")
+        if jti is None or claims.get("exp") is None:
+            return False
+        self.revoke_token(jti, float(claims["exp"]))
+        return True
+
+    def revoke_user(self, user_id: int):
+        """Revoke every token issued to the user up to now (disable / delete)."""
+        # iat has one-second resolution: cover everything issued during this second too
+        cutoff = math.floor(self.clock()) + 1
+        expires_at = cutoff + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+        self._add_user(str(user_id), cutoff, expires_at)
+        self.backend.publish_user(user_id, cutoff, expires_at)
+
+    # ---- maintenance ----
+
+    def _rebuild_bloom(self):
+        # Caller holds the lock. Grow if the live set outgrew the configured capacity.
+        capacity = max(self.bloom_capacity, 2 * len(self._tokens))
+        bloom = BloomFilter(capacity)
+        for jti in self._tokens:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    def sweep(self) -> int:
+        """Drop expired entries and rebuild the Bloom filter; returns how many were dropped."""
+        now = self.clock()
+        with self._lock:
+            expired = [jti for jti, exp in self._tokens.items() if exp <= now]
+            for jti in expired:
+                del self._tokens[jti]
+            stale_users = [sub for sub, (_, exp) in self._users.items() if exp <= now]
+            for sub in stale_users:
+                del self._users[sub]
+            if expired:
+                self._rebuild_bloom()
+        return len(expired) + len(stale_users)
+
+    def sync(self):
+        """Pull revocations published by other workers."""
+        entries, self._last_id = self.backend.fetch_since(self._last_id)
+        for jti, user_id, revoked_at, expires_at in entries:
+            if jti is not None:
+                self._add_token(jti, expires_at)
+            elif user_id is not None:
+                self._add_user(str(user_id), revoked_at, expires_at)
+
+    def _run(self, interval: float):
+        last_sweep = self.clock()
+        while not self._stop.wait(interval):
+            try:
+                self.sync()
+                if self.clock() - last_sweep >= settings.REVOCATION_SWEEP_SECONDS:
+                    self.sweep()
+                    self.backend.purge_expired(self.clock())
+                    last_sweep = self.clock()
+            except Exception as e:
+                print(f"Revocation sync failed: {e}")
+
+    def start(self):
+        """Load existing revocations and keep syncing in a background thread."""
+        self.sync()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(settings.REVOCATION_SYNC_SECONDS,), name="revocation-sync", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {"tokens": len(self._tokens), "users": len(self._users), "bloom_bits": self._bloom.size}
+
+revocation = RevocationStore(
+    backend=BACKENDS[settings.REVOCATION_BACKEND](),
+    bloom_capacity=settings.REVOCATION_BLOOM_CAPACITY,
+)
@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Callable, List, Optional
+from app.core.metrics import metrics
+from app.database import SessionLocal
+
+class _Job:
+    def __init__(self, name: str, interval: float, fn: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.next_run = time.monotonic() + interval
+
+class Scheduler:
+    """
+    Runs periodic maintenance jobs (sweeps, archival, digests) on one
+    background thread. Jobs run one at a time; a slow job delays the others
+    but never overlaps with itself. Each run is timed as `scheduler.<name>`.
+    """
+
+    def __init__(self):
+        self._jobs: List[_Job] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def every(self, seconds: float, fn: Callable[[], object], name: str = None):
+        with self._lock:
+            self._jobs.append(_Job(name or fn.__name__, seconds, fn))
+        self._wakeup.set()
+
+    def run_job(self, job: _Job):
+        started = time.perf_counter()
+        try:
+            result = job.fn()
+            if result:
+                print(f"[scheduler] {job.name}: {result}")
+        except Exception as e:
+            metrics.inc(f"scheduler.{job.name}.errors")
+            print(f"[scheduler] {job.name} failed: {e}")
+        finally:
+            metrics.observe(f"scheduler.{job.name}", time.perf_counter() - started)
+            job.next_run = time.monotonic() + job.interval
+
+    def _run(self):
+        while not self._stopping:
+            with self._lock:
+                due = [job for job in self._jobs if job.next_run <= time.monotonic()]
+                next_run = min((job.next_run for job in self._jobs), default=None)
+            for job in due:
+                if self._stopping:
+                    return
+                self.run_job(job)
+            if not due:
+                timeout = None if next_run is None else max(0.0, next_run - time.monotonic())
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+
+def with_session(fn: Callable, *args, **kwargs) -> Callable[[], object]:
+    """Wrap fn(db, ...) as a job that gets its own session."""
+    def job():
+        with SessionLocal() as db:
+            return fn(db, *args, **kwargs)
+    job.__name__ = getattr(fn, "__name__", "job")
+    return job
+
+scheduler = Scheduler()
@@ -1,17 +1,30 @@
 from datetime import datetime, timedelta
-from typing import Optional, Union, Any
+from typing import Optional, Tuple, Union, Any
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from passlib.handlers.bcrypt import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.core.config import settings
+from app.core.cache import TTLCache
+from app.core.revocation import revocation
 import hashlib
+import uuid
 
-# Create CryptContext with bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt at exactly BCRYPT_ROUNDS: hashes below (legacy) or above (over-costed)
+# that cost are flagged by needs_update and rehashed on the next login.
+# Pick the value with scripts/calibrate_bcrypt.py on the deployment hardware.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+# Verified JWT claims keyed by sha256(token); an entry lives until the token's exp
+claims_cache = TTLCache(maxsize=settings.AUTH_CLAIMS_CACHE_SIZE, name="auth.claims_cache")
+
 def _truncate_password(password: str, max_bytes: int = 72) -> str:
     """Safely truncate password to max_bytes, respecting UTF-8 boundaries"""
     if not isinstance(password, str):
@@ -35,7 +48,7 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "sub": str(subject), "iat": datetime.utcnow(), "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -46,60 +59,83 @@ def create_refresh_token(subject: Union[str, Any], expires_delta: timedelta = No
         expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
         
     # Notice we added "type": "refresh"
-    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh"}
+    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh", "iat": datetime.utcnow(), "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 def get_password_hash(password: str) -> str:
     """Hash password with bcrypt, safely handling the 72-byte limit"""
-    # Truncate password to 72 bytes first
-    safe_password = _truncate_password(password, max_bytes=72)
-    
-    # Now hash with pwd_context
-    try:
-        hashed = pwd_context.hash(safe_password)
-        return hashed
-    except ValueError as e:
-        # If still getting error, use SHA256 hash as fallback
-        if "password" in str(e) and "72 bytes" in str(e):
-            safe_password_bytes = safe_password.encode('utf-8')[:72]
-            sha_hash = hashlib.sha256(safe_password_bytes).hexdigest()
-            return f"$2b$12${sha_hash[:53]}"
-        raise
+    return pwd_context.hash(_truncate_password(password, max_bytes=72))
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password against hash, handling 72-byte limit"""
-    if not isinstance(plain_password, str):
-        return False
-    
-    # Truncate password to 72 bytes first
-    safe_password = _truncate_password(plain_password, max_bytes=72)
-    
+    return verify_and_update_password(plain_password, hashed_password)[0]
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify password; returns (ok, new_hash). new_hash is set when the stored
+    hash doesn't match the current policy (cost or scheme) and should be saved.
+    One bcrypt computation either way, so a wrong password costs no more than a right one.
+    """
+    if not isinstance(plain_password, str) or not hashed_password:
+        return False, None
+
     try:
-        result = pwd_context.verify(safe_password, hashed_password)
-        if result:
-            return True
-    except Exception as e:
-        print(f"pwd_context.verify raised: {e}")
+        return pwd_context.verify_and_update(_truncate_password(plain_password, max_bytes=72), hashed_password)
+    except ValueError as e:
+        # Malformed or unknown hash format
+        print(f"Password hash could not be verified: {e}")
+        return False, None
 
-    # Fallback: try the bcrypt handler directly (handles some legacy formats)
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+def _decode_claims(token: str) -> dict:
+    """Decoded, signature-checked claims; served from the cache until the token's exp."""
+    key = _token_key(token)
+    claims = claims_cache.get(key)
+    if claims is not None:
+        return claims
+
+    claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if claims.get("exp") is not None:
+        claims_cache.set(key, claims, expires_at=float(claims["exp"]))
+    return claims
+
+def invalidate_token(token: str):
+    """Forget the cached claims of one token (e.g. on logout / revocation)."""
+    claims_cache.pop(_token_key(token))
+
+def invalidate_user_tokens(user_id: int) -> int:
+    """Forget the cached claims of every token issued to a user."""
+    subject = str(user_id)
+    return claims_cache.discard_where(lambda key, claims: claims.get("sub") == subject)
+
+def decode_token(token: str) -> dict:
+    """Verified, unrevoked claims of a token; raises JWTError otherwise"""
+    claims = _decode_claims(token)
+    if revocation.is_revoked(claims):
+        raise JWTError("Token has been revoked")
+    return claims
+
+def revoke_token(token: str):
+    """Revoke a token (logout / refresh rotation); invalid tokens are ignored"""
     try:
-        if hasattr(bcrypt, 'verify'):
-            try:
-                if bcrypt.verify(safe_password, hashed_password):
-                    return True
-            except Exception as be:
-                print(f"bcrypt.verify raised: {be}")
-    except Exception:
-        pass
-
-    # If we reach here, verification failed
-    return False
+        claims = _decode_claims(token)
+    except JWTError:
+        return
+    revocation.revoke_claims(claims)
+    invalidate_token(token)
+
+def revoke_user_tokens(user_id: int):
+    """Revoke every token issued to the user so far (account disabled / deleted)"""
+    revocation.revoke_user(user_id)
+    invalidate_user_tokens(user_id)
 
 def verify_token(token: str) -> int:
     """Verify JWT token and return user_id"""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(
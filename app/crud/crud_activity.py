@@ -1,7 +1,48 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
 from app.models.activity import ActivityLog
 
-def log_activity(db: Session, user_id: int, action: str, target: str):
+# Actions used by the retention/cohort analytics
+ACTION_VIEWED_RECIPE = "viewed recipe"
+ACTION_FAVORITED_RECIPE = "favorited recipe"
+
+def log_activity(db: Session, user_id: int, action: str, target: str, commit: bool = True):
+    """Pass commit=False to piggyback on the caller's transaction."""
     log = ActivityLog(user_id=user_id, action=action, target=target)
     db.add(log)
-    db.commit()
\ No newline at end of file
+    if commit:
+        db.commit()
+    return log
+
+# (user_id, week start) pairs that already have their weekly view row
+_weekly_views = TTLCache(maxsize=100000, name="activity.weekly_views")
+
+def log_weekly_view(db: Session, user_id: int, target: str) -> bool:
+    """
+    Cohort retention only needs to know a user viewed something in a given
+    (Monday-based, UTC) week, so views write at most one activity row per
+    user per week instead of one per view. Checked in memory first, then
+    in the table (another worker may have written it). Caller commits.
+    Returns whether a row was added.
+    """
+    now = datetime.utcnow()
+    week_start = datetime.combine(now.date() - timedelta(days=now.weekday()), datetime.min.time())
+    key = (user_id, week_start)
+    if _weekly_views.get(key):
+        return False
+
+    expires_at = (week_start + timedelta(days=7) - datetime(1970, 1, 1)).total_seconds()
+    _weekly_views.set(key, True, expires_at=expires_at)
+    seen = db.execute(
+        select(ActivityLog.id).where(
+            ActivityLog.action == ACTION_VIEWED_RECIPE,
+            ActivityLog.timestamp >= week_start,
+            ActivityLog.user_id == user_id,
+        ).limit(1)
+    ).first()
+    if seen:
+        return False
+    log_activity(db, user_id, ACTION_VIEWED_RECIPE, target, commit=False)
+    return True
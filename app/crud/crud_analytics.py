@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from app.core.config import settings
+
+# Dialects where we know a SELECT of scalar subqueries runs as one statement
+SINGLE_QUERY_DIALECTS = {"sqlite", "postgresql", "mysql", "mariadb"}
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ANALYTICS_QUERY_WORKERS, thread_name_prefix="analytics"
+        )
+    return _executor
+
+def count_of(model, *criteria) -> Select:
+    """SELECT count(*) FROM model WHERE criteria"""
+    return select(func.count()).select_from(model).where(*criteria)
+
+def fetch_counts(db: Session, queries: Dict[str, Select], strategy: Optional[str] = None) -> Dict[str, int]:
+    """
+    Runs independent count queries and returns {name: count}.
+
+    Strategies:
+      - "single":     one round trip, SELECT (q1) AS a, (q2) AS b, ...
+      - "concurrent": each query on its own pooled connection, in a thread pool
+      - "sequential": one after another on `db` (the old behaviour)
+      - "auto":       "single" where the dialect supports it, else "concurrent"
+    """
+    strategy = strategy or settings.ANALYTICS_AGGREGATE_STRATEGY
+    if strategy == "auto":
+        strategy = "single" if db.get_bind().dialect.name in SINGLE_QUERY_DIALECTS else "concurrent"
+
+    if strategy == "single":
+        stmt = select(*[q.scalar_subquery().label(name) for name, q in queries.items()])
+        row = db.execute(stmt).one()
+        return {name: row._mapping[name] or 0 for name in queries}
+
+    if strategy == "concurrent":
+        engine = db.get_bind()
+
+        def run(query):
+            with engine.connect() as conn:
+                return conn.execute(query).scalar() or 0
+
+        futures = {name: _get_executor().submit(run, q) for name, q in queries.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    if strategy == "sequential":
+        return {name: db.execute(q).scalar() or 0 for name, q in queries.items()}
+
+    raise ValueError(f"Unknown aggregate strategy: {strategy}")
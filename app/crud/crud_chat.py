@@ -0,0 +1,53 @@
+import base64
+import binascii
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from app.models.chat_message import ChatMessage
+
+def add_messages(db: Session, rows: List[Dict]):
+    """One multi-row INSERT for a batch of {user_id, client_id, role, content, created_at}."""
+    if rows:
+        db.execute(insert(ChatMessage), rows)
+    db.commit()
+
+def encode_cursor(message: ChatMessage) -> str:
+    """Opaque position before `message` in the conversation."""
+    return base64.urlsafe_b64encode(str(message.id).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """Raises ValueError for a cursor we didn't issue."""
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (UnicodeDecodeError, binascii.Error, ValueError):
+        raise ValueError("Invalid cursor")
+
+def get_messages(
+    db: Session, user_id: int, client_id: str, limit: int = 50, cursor: Optional[str] = None
+) -> Tuple[List[ChatMessage], Optional[str]]:
+    """
+    The newest `limit` messages of a user's conversation (before the
+    cursor's message, if given), returned oldest first so a page reads in
+    order. next_cursor pages further back; None once the conversation's
+    start is reached. Keyset on (user_id, client_id, id): no skipped rows
+    are read.
+    """
+    query = select(ChatMessage).where(ChatMessage.user_id == user_id, ChatMessage.client_id == client_id)
+    if cursor is not None:
+        query = query.where(ChatMessage.id < decode_cursor(cursor))
+    # One extra row tells whether there is an older page
+    items = db.execute(query.order_by(ChatMessage.id.desc()).limit(limit + 1)).scalars().all()
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return list(reversed(items[:limit])), next_cursor
+
+def get_recent(db: Session, user_id: int, client_id: str, limit: int) -> List[Dict]:
+    """The last `limit` turns as {role, content, created_at}, oldest first (to hydrate chat memory)."""
+    items, _ = get_messages(db, user_id, client_id, limit)
+    return [{"role": item.role, "content": item.content, "created_at": item.created_at} for item in items]
+
+def purge(db: Session, older_than: timedelta) -> int:
+    """Delete messages written more than `older_than` ago; returns how many."""
+    removed = db.execute(delete(ChatMessage).where(ChatMessage.created_at < datetime.utcnow() - older_than)).rowcount
+    db.commit()
+    return removed
@@ -1,3 +1,4 @@
+from datetime import datetime
 from sqlalchemy.orm import Session
 from app.models.game import Game, UserGameProgress
 from app.models.user import User
@@ -54,7 +55,8 @@ def record_progress(db: Session, user_id: int, game_id: int, score: int):
             user_id=user_id,
             game_id=game_id,
             is_completed=True,
-            score=score
+            score=score,
+            completed_at=datetime.utcnow()
         )
         db.add(progress)
         
@@ -1,43 +1,198 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.core.notification_hub import hub
 from app.models.notification import Notification
-from app.schemas.notification import NotificationCreate
+from app.models.notification_counter import NotificationCounter
+from app.schemas.notification import NotificationCreate, NotificationOut
+
+def ensure_unread_counter(db: Session, user_id: int) -> int:
+    """
+    The user's unread count, creating the counter row from the table the
+    first time. Call before changing the user's notifications: it commits.
+    """
+    unread = db.execute(
+        select(NotificationCounter.unread).where(NotificationCounter.user_id == user_id)
+    ).scalar_one_or_none()
+    if unread is not None:
+        return unread
+
+    unread = count_unread(db, user_id)
+    db.add(NotificationCounter(user_id=user_id, unread=unread))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Created concurrently: use that one
+        db.rollback()
+        return ensure_unread_counter(db, user_id)
+    return unread
+
+def _add_unread(db: Session, user_id: int, delta: int):
+    # Part of the caller's transaction; never goes below zero
+    db.execute(
+        update(NotificationCounter)
+        .where(NotificationCounter.user_id == user_id)
+        .values(unread=case(
+            (NotificationCounter.unread + delta < 0, 0),
+            else_=NotificationCounter.unread + delta,
+        ))
+    )
+
+def get_unread_count(db: Session, user_id: int) -> int:
+    return ensure_unread_counter(db, user_id)
 
 def create_notification(db: Session, notification: NotificationCreate):
+    ensure_unread_counter(db, notification.recipient_id)
     db_obj = Notification(**notification.model_dump())
     db.add(db_obj)
+    _add_unread(db, notification.recipient_id, 1)
     db.commit()
     db.refresh(db_obj)
+
+    # Push to the recipient's open streams
+    hub.publish(db_obj.recipient_id, {
+        "type": "notification",
+        "notification": NotificationOut.model_validate(db_obj).model_dump(mode="json"),
+        "unread_delta": 1,
+    })
     return db_obj
 
+def add_coalesced(
+    db: Session,
+    recipient_id: int,
+    group_key: str,
+    count: int,
+    actors: List[str],
+    render: Callable[[int, List[str]], Tuple[str, str]],
+    type: str,
+    window_start: datetime,
+    max_actors: int,
+):
+    """
+    Fold `count` events into the recipient's unread `group_key` notification
+    created since window_start, or start a new one. render(count, actors)
+    gives (title, message). Returns (notification, created).
+    """
+    ensure_unread_counter(db, recipient_id)
+    db_obj = db.execute(
+        select(Notification)
+        .where(
+            Notification.recipient_id == recipient_id,
+            Notification.is_read == False,
+            Notification.created_at >= window_start,
+            Notification.group_key == group_key,
+        )
+        .order_by(Notification.created_at.desc())
+        .limit(1)
+        .with_for_update()
+    ).scalar_one_or_none()
+
+    created = db_obj is None
+    if created:
+        db_obj = Notification(recipient_id=recipient_id, group_key=group_key, type=type, event_count=0, actors=[])
+        db.add(db_obj)
+    db_obj.event_count += count
+    db_obj.actors = (list(db_obj.actors or []) + actors)[-max_actors:]
+    db_obj.title, db_obj.message = render(db_obj.event_count, db_obj.actors)
+    if created:
+        _add_unread(db, recipient_id, 1)
+    db.commit()
+    db.refresh(db_obj)
+
+    hub.publish(recipient_id, {
+        "type": "notification" if created else "notification_updated",
+        "notification": NotificationOut.model_validate(db_obj).model_dump(mode="json"),
+        "unread_delta": 1 if created else 0,
+    })
+    return db_obj, created
+
+def count_unread(db: Session, user_id: int) -> int:
+    """COUNT(*) of unread rows (index range scan); get_unread_count() is the cheap one."""
+    return db.execute(
+        select(func.count()).select_from(Notification)
+        .where(Notification.recipient_id == user_id, Notification.is_read == False)
+    ).scalar_one()
+
+def encode_cursor(notification: Notification) -> str:
+    """Opaque position after `notification` in the (created_at, id) DESC order."""
+    raw = f"{notification.created_at.isoformat()}|{notification.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for a cursor we didn't issue."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, _, notification_id = raw.partition("|")
+        return datetime.fromisoformat(created_at), int(notification_id)
+    except (UnicodeDecodeError, binascii.Error, ValueError):
+        raise ValueError("Invalid cursor")
+
 def get_notifications(
     db: Session, 
     user_id: int, 
     skip: int = 0, 
     limit: int = 10, 
-    filter_type: str = "all" # "all" or "unread"
+    filter_type: str = "all", # "all" or "unread"
+    cursor: Optional[str] = None,
+    include_total: bool = True,
 ):
+    """
+    Newest first, ordered by (created_at, id) so rows sharing a timestamp
+    (broadcasts) have a stable order. With a cursor the page starts right
+    after the cursor's row (keyset: no skipped rows are read, and rows
+    inserted meanwhile don't shift it); skip is the older offset paging.
+    Returns (items, total or None, next_cursor or None at the end).
+    """
     query = db.query(Notification).filter(Notification.recipient_id == user_id)
     
     # Handle the Tabs (All vs Unread)
     if filter_type == "unread":
         query = query.filter(Notification.is_read == False)
         
+    # Total for pagination (unread: the maintained counter; all: index-only count, unordered)
+    total = None
+    if include_total:
+        if filter_type == "unread":
+            total = get_unread_count(db, user_id)
+        else:
+            total = query.count()
+
+    if cursor is not None:
+        created_at, notification_id = decode_cursor(cursor)
+        # The first condition is the index range; the second drops the ties already shown
+        query = query.filter(
+            Notification.created_at <= created_at,
+            or_(Notification.created_at < created_at, Notification.id < notification_id),
+        )
+
     # Apply Ordering (Newest first)
-    query = query.order_by(Notification.created_at.desc())
+    query = query.order_by(Notification.created_at.desc(), Notification.id.desc())
+    if cursor is None:
+        query = query.offset(skip)
     
-    # Apply Pagination
-    total = query.count()
-    items = query.offset(skip).limit(limit).all()
+    # One extra row tells whether there is a next page
+    items = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
     
-    return items, total
+    return items[:limit], total, next_cursor
 
 def mark_all_as_read(db: Session, user_id: int):
-    db.query(Notification).filter(
+    ensure_unread_counter(db, user_id)
+    updated = db.query(Notification).filter(
         Notification.recipient_id == user_id,
         Notification.is_read == False
     ).update({"is_read": True})
+    if updated:
+        _add_unread(db, user_id, -updated)
     db.commit()
 
+    if updated:
+        hub.publish(user_id, {"type": "unread_count", "unread_count": 0})
+
 def mark_one_as_read(db: Session, notification_id: int, user_id: int):
     notification = db.query(Notification).filter(
         Notification.id == notification_id,
@@ -45,7 +200,18 @@ def mark_one_as_read(db: Session, notification_id: int, user_id: int):
     ).first()
     
     if notification:
-        notification.is_read = True
+        if not notification.is_read:
+            ensure_unread_counter(db, user_id)
+        # Conditional, so two concurrent clicks decrement the counter once
+        was_unread = db.execute(
+            update(Notification)
+            .where(Notification.id == notification_id, Notification.is_read == False)
+            .values(is_read=True)
+        ).rowcount
+        if was_unread:
+            _add_unread(db, user_id, -1)
         db.commit()
         db.refresh(notification)
-    return notification
\ No newline at end of file
+        if was_unread:
+            hub.publish(user_id, {"type": "unread_delta", "unread_delta": -1})
+    return notification
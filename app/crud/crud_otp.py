@@ -0,0 +1,117 @@
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.otp import OtpCode
+
+PURPOSE_EMAIL_VERIFICATION = "email_verification"
+PURPOSE_PASSWORD_RESET = "password_reset"
+
+# verify_otp() results
+OTP_OK = "ok"
+OTP_INVALID = "invalid"
+OTP_EXPIRED = "expired"
+
+# Optional front cache: (email, purpose) -> (code_hash, expires_at). Only
+# non-consuming checks are answered from it; consuming a code always goes
+# through the table, so a code can't be used twice even across workers.
+_front_cache = TTLCache(maxsize=10000, name="otp.front_cache") if settings.OTP_MEMORY_CACHE else None
+
+def _normalize(email: str) -> str:
+    return email.strip().lower()
+
+def _hash_code(email: str, purpose: str, code: str) -> str:
+    message = f"{purpose}:{email}:{code}".encode("utf-8")
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+def generate_code(length: int = 6) -> str:
+    return "".join(secrets.choice("0123456789") for _ in range(length))
+
+def issue_otp(db: Session, email: str, purpose: str, ttl_minutes: int) -> str:
+    """Create (or replace) the code for this email and purpose; returns the plain code."""
+    email = _normalize(email)
+    code = generate_code()
+    code_hash = _hash_code(email, purpose, code)
+    now = datetime.utcnow()
+    expires_at = now + timedelta(minutes=ttl_minutes)
+    values = {"code_hash": code_hash, "attempts": 0, "created_at": now, "expires_at": expires_at}
+
+    replaced = db.execute(
+        update(OtpCode).where(OtpCode.email == email, OtpCode.purpose == purpose).values(**values)
+    ).rowcount
+    if not replaced:
+        db.add(OtpCode(email=email, purpose=purpose, **values))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Issued concurrently for the same email: overwrite that one
+            db.rollback()
+            db.execute(
+                update(OtpCode).where(OtpCode.email == email, OtpCode.purpose == purpose).values(**values)
+            )
+            db.commit()
+    else:
+        db.commit()
+
+    if _front_cache is not None:
+        _front_cache.set((email, purpose), (code_hash, expires_at), ttl=ttl_minutes * 60)
+    return code
+
+def verify_otp(db: Session, email: str, purpose: str, code: str, consume: bool = False) -> str:
+    """
+    Checks a code in constant time. Returns OTP_OK, OTP_INVALID or OTP_EXPIRED.
+    consume=True deletes the code on success (atomically: only one caller wins).
+    Too many wrong guesses (OTP_MAX_ATTEMPTS) invalidate the code.
+    """
+    email = _normalize(email)
+    code_hash = _hash_code(email, purpose, code or "")
+    now = datetime.utcnow()
+
+    if _front_cache is not None and not consume:
+        cached = _front_cache.get((email, purpose))
+        if cached is not None and hmac.compare_digest(cached[0], code_hash) and cached[1] > now:
+            return OTP_OK
+
+    row = db.execute(
+        select(OtpCode.id, OtpCode.code_hash, OtpCode.expires_at, OtpCode.attempts)
+        .where(OtpCode.email == email, OtpCode.purpose == purpose)
+    ).first()
+    if row is None:
+        return OTP_INVALID
+
+    if not hmac.compare_digest(row.code_hash, code_hash):
+        if row.attempts + 1 >= settings.OTP_MAX_ATTEMPTS:
+            db.execute(delete(OtpCode).where(OtpCode.id == row.id))
+            _forget(email, purpose)
+        else:
+            db.execute(update(OtpCode).where(OtpCode.id == row.id).values(attempts=OtpCode.attempts + 1))
+        db.commit()
+        return OTP_INVALID
+
+    if row.expires_at <= now:
+        return OTP_EXPIRED
+
+    if consume:
+        deleted = db.execute(
+            delete(OtpCode).where(OtpCode.id == row.id, OtpCode.code_hash == code_hash)
+        ).rowcount
+        db.commit()
+        _forget(email, purpose)
+        if not deleted:
+            return OTP_INVALID
+    return OTP_OK
+
+def _forget(email: str, purpose: str):
+    if _front_cache is not None:
+        _front_cache.pop((email, purpose))
+
+def purge_expired(db: Session) -> int:
+    """Delete expired codes; returns how many were removed."""
+    removed = db.execute(delete(OtpCode).where(OtpCode.expires_at <= datetime.utcnow())).rowcount
+    db.commit()
+    return removed
@@ -1,10 +1,11 @@
-from sqlalchemy import desc
+from sqlalchemy import desc, func, select
 from sqlalchemy.orm import Session
 from fastapi import HTTPException 
 from app.models.receipe import Recipe, RecipeIngredient
 from app.models.ingredient import Ingredient 
-from app.models.user import User
+from app.models.user import User, favorites_table
 from app.schemas.recipe import RecipeCreate, RecipeUpdate
+from app.crud import crud_activity
 
 def get_recipes(db: Session, skip: int = 0, limit: int = 100, search: str = None):
     query = db.query(Recipe)
@@ -128,12 +129,25 @@ def toggle_favorite(db: Session, user_id: int, recipe_id: int):
         
         # Increment Count
         recipe.favorites_count += 1
+        crud_activity.log_activity(db, user_id, crud_activity.ACTION_FAVORITED_RECIPE, recipe.title, commit=False)
         is_fav = True
         
     db.commit()
     db.refresh(recipe) 
     return is_fav
 
+def get_favorite_ids(db: Session, user_id: int, recipe_ids=None) -> set:
+    """Ids of the user's favorite recipes (optionally only among recipe_ids), straight from the favorites table"""
+    query = select(favorites_table.c.recipe_id).where(favorites_table.c.user_id == user_id)
+    if recipe_ids is not None:
+        query = query.where(favorites_table.c.recipe_id.in_(list(recipe_ids)))
+    return set(db.execute(query).scalars())
+
+def count_favorites(db: Session, user_id: int) -> int:
+    return db.execute(
+        select(func.count()).select_from(favorites_table).where(favorites_table.c.user_id == user_id)
+    ).scalar() or 0
+
 def get_user_favorites(db: Session, user_id: int):
     user = db.query(User).filter(User.id == user_id).first()
     return user.favorite_recipes if user else []
@@ -0,0 +1,72 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Iterable
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.recipe_view import RecipeViewSketch
+from app.core.hyperloglog import HyperLogLog
+
+def merge_sketch(db: Session, recipe_id: int, day: date, sketch: HyperLogLog):
+    """
+    Union a sketch into the stored row for (recipe, day). Caller commits.
+    The row is locked (FOR UPDATE) until then, so concurrent flushes from
+    other workers merge one after another instead of losing registers.
+    """
+    def locked_row():
+        return db.query(RecipeViewSketch).filter(
+            RecipeViewSketch.recipe_id == recipe_id,
+            RecipeViewSketch.day == day
+        ).with_for_update().first()
+
+    row = locked_row()
+    if row is None:
+        try:
+            with db.begin_nested():
+                db.add(RecipeViewSketch(recipe_id=recipe_id, day=day, registers=sketch.to_bytes()))
+            return None
+        except IntegrityError:
+            # Another worker created the row first: merge into theirs
+            row = locked_row()
+
+    stored = HyperLogLog.from_bytes(row.registers)
+    row.registers = stored.merge(sketch).to_bytes()
+    return row
+
+def get_unique_viewers(db: Session, recipe_ids: Iterable[int], since: date) -> Dict[int, int]:
+    """
+    Estimated distinct viewers per recipe from `since` (inclusive) until today.
+    Recipes without any sketch are reported as 0.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return {}
+
+    rows = db.query(RecipeViewSketch).filter(
+        RecipeViewSketch.recipe_id.in_(recipe_ids),
+        RecipeViewSketch.day >= since
+    ).all()
+
+    merged: Dict[int, HyperLogLog] = {}
+    for row in rows:
+        sketch = HyperLogLog.from_bytes(row.registers)
+        if row.recipe_id in merged:
+            merged[row.recipe_id].merge(sketch)
+        else:
+            merged[row.recipe_id] = sketch
+
+    return {rid: (merged[rid].count() if rid in merged else 0) for rid in recipe_ids}
+
+def get_daily_unique_viewers(db: Session, recipe_id: int, days: int = 30) -> List[dict]:
+    """One estimate per day for the last `days` days (oldest first)."""
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+
+    rows = db.query(RecipeViewSketch).filter(
+        RecipeViewSketch.recipe_id == recipe_id,
+        RecipeViewSketch.day >= start
+    ).all()
+    by_day = {row.day: HyperLogLog.from_bytes(row.registers).count() for row in rows}
+
+    return [
+        {"date": (start + timedelta(days=i)).isoformat(), "unique_viewers": by_day.get(start + timedelta(days=i), 0)}
+        for i in range(days)
+    ]
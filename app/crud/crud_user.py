@@ -1,8 +1,12 @@
 from operator import or_
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, verify_and_update_password, revoke_user_tokens
+from app.core import password_hashing
+from app.core.metrics import metrics
+from app.core.principal import invalidate_principal
 
 def get_user_by_email(db: Session, email: str):
     """Get user by email"""
@@ -12,14 +16,20 @@ def get_user_by_id(db: Session, user_id: int):
     """Get user by ID"""
     return db.query(User).filter(User.id == user_id).first()
 
-def create_user(db: Session, user: UserCreate):
-    """Create a new user"""
-    hashed_password = get_password_hash(user.password)
+def get_admin_ids(db: Session):
+    """Ids of active superusers (recipients of admin notifications)"""
+    return [row.id for row in db.query(User.id).filter(User.is_superuser == True, User.is_active == True)]
+
+def create_user(db: Session, user: UserCreate, hashed_password: str = None, is_active: bool = True):
+    """Create a new user (pass hashed_password if it was already hashed off-thread)"""
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         email=user.email,
         full_name=user.full_name,
         hashed_password=hashed_password,
-        is_superuser=user.is_superuser
+        is_superuser=user.is_superuser,
+        is_active=is_active
     )
     db.add(db_user)
     db.commit()
@@ -72,6 +82,9 @@ def update_user(db: Session, user_id: int, user_update: UserUpdate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    invalidate_principal(user_id)
+    if update_data.get("is_active") is False:
+        revoke_user_tokens(user_id)
     return db_user
 
 def delete_user(db: Session, user_id: int):
@@ -82,6 +95,8 @@ def delete_user(db: Session, user_id: int):
     
     db.delete(db_user)
     db.commit()
+    invalidate_principal(user_id)
+    revoke_user_tokens(user_id)
     return db_user
 
 def authenticate_user(db: Session, email: str, password: str):
@@ -89,6 +104,36 @@ def authenticate_user(db: Session, email: str, password: str):
     user = get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    ok, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not ok:
+        return None
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+    return user
+
+async def authenticate_user_async(db: Session, email: str, password: str):
+    """
+    Same as authenticate_user, for async handlers: the queries run in the
+    threadpool and bcrypt in the password hashing pool, so nothing blocks
+    the event loop. The session is closed before hashing so a login burst
+    doesn't pin every pooled DB connection; the returned user is detached
+    but fully loaded.
+    """
+    user = await run_in_threadpool(get_user_by_email, db, email)
+    await run_in_threadpool(db.close)
+    if not user:
         return None
-    return user
\ No newline at end of file
+    ok, new_hash = await password_hashing.verify_and_update_password(password, user.hashed_password)
+    if not ok:
+        return None
+    if new_hash:
+        # Legacy or over-costed hash: store one at the current BCRYPT_ROUNDS
+        await run_in_threadpool(_store_password_hash, db, user.id, new_hash)
+        user.hashed_password = new_hash
+        metrics.inc("password_hash.rehashed")
+    return user
+
+def _store_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.query(User).filter(User.id == user_id).update({"hashed_password": hashed_password})
+    db.commit()
@@ -1,8 +1,25 @@
+from datetime import timedelta
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.api.v1.api import api_router
 from app.database import engine, Base
+from app.core import password_hashing
+from app.core.revocation import revocation
+from app.core.config import settings
+from app.core.rate_limit import RateLimitMiddleware, limiter
+from app.core.scheduler import scheduler, with_session
+from app.core.email_utils import smtp_configured
+from app.core.mailer import mailer
+from app.core.notification_hub import hub
+from app.core.notification_coalescer import coalescer
+from app.core.conversation_memory import memory
+from app.core.chat_store import chat_store
+from app.crud import crud_chat, crud_otp
+from app.services.notification_digest import send_digests
+from app.services.notification_broadcast import resume_broadcasts
+from app.services.notification_retention import retention_job
+from app.services.chat_service import llm
 
 try:
     Base.metadata.create_all(bind=engine)
@@ -11,6 +28,10 @@ except Exception as e:
 
 app = FastAPI(title="ChefJunior API")
 
+# Added before CORS so 429 responses still carry the CORS headers
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
 origins = [
     "http://localhost:3000",
     "http://10.10.12.70:3001",  
@@ -31,6 +52,48 @@ app.add_middleware(
 )
 
 app.include_router(api_router, prefix="/api/v1")
+
+@app.on_event("startup")
+def start_background_services():
+    password_hashing.warm_up()
+    revocation.start()
+    hub.start()
+    coalescer.start()
+    chat_store.start()
+    scheduler.every(settings.OTP_SWEEP_SECONDS, with_session(crud_otp.purge_expired), name="otp_sweep")
+    scheduler.every(settings.BROADCAST_STALE_SECONDS, resume_broadcasts, name="broadcast_resume")
+    scheduler.every(settings.CHAT_MEMORY_SWEEP_SECONDS, memory.sweep, name="chat_memory_sweep")
+    if settings.CHAT_HISTORY_RETENTION_DAYS > 0:
+        scheduler.every(settings.CHAT_HISTORY_PURGE_INTERVAL_HOURS * 3600,
+                        with_session(crud_chat.purge, timedelta(days=settings.CHAT_HISTORY_RETENTION_DAYS)),
+                        name="chat_history_purge")
+    if settings.EMAIL_OUTBOX_RETENTION_DAYS > 0:
+        scheduler.every(settings.EMAIL_OUTBOX_PURGE_INTERVAL_HOURS * 3600,
+                        with_session(mailer.purge, timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)),
+                        name="email_outbox_purge")
+    if settings.NOTIFICATION_RETENTION_DAYS > 0:
+        scheduler.every(settings.NOTIFICATION_RETENTION_INTERVAL_HOURS * 3600, retention_job,
+                        name="notification_retention")
+    if settings.DIGEST_ENABLED and smtp_configured():
+        scheduler.every(settings.DIGEST_INTERVAL_HOURS * 3600, send_digests, name="notification_digest")
+    scheduler.start()
+    if smtp_configured():
+        mailer.start()
+
+@app.on_event("shutdown")
+def stop_background_services():
+    scheduler.stop()
+    coalescer.stop()
+    chat_store.stop()
+    mailer.stop()
+    password_hashing.shutdown()
+    revocation.stop()
+    hub.stop()
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await llm.aclose()
+
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 @app.get("/")
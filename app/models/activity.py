@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -12,4 +12,9 @@ class ActivityLog(Base):
     target = Column(String) # e.g., "Spaghetti Aglio", "New User"
     timestamp = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("app.models.user.User")
\ No newline at end of file
+    user = relationship("app.models.user.User")
+
+    __table_args__ = (
+        # Cohort analytics scan one action type over a time range
+        Index("ix_activity_logs_action_timestamp", "action", "timestamp"),
+    )
\ No newline at end of file
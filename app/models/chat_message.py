@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.database import Base
+
+class ChatMessage(Base):
+    """
+    One turn of a chat conversation: the signed-in user's chat with the
+    given client_id (the socket path). Written in batches by
+    app.core.chat_store; ids grow in write order, so (user_id, client_id, id)
+    is the conversation order. Anonymous chats are never stored.
+    """
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    client_id = Column(String, nullable=False)
+    role = Column(String, nullable=False)   # "user" or "assistant"
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # History pages and reconnect hydration: newest first within one user's conversation
+        Index("ix_chat_messages_user_client_id", "user_id", "client_id", "id"),
+        # Retention purge (CHAT_HISTORY_RETENTION_DAYS)
+        Index("ix_chat_messages_created_at", "created_at"),
+    )
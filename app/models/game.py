@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, JSON, Boolean, DateTime
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -32,6 +32,7 @@ class UserGameProgress(Base):
     game_id = Column(Integer, ForeignKey("games.id"))
     is_completed = Column(Boolean, default=False)
     score = Column(Integer, default=0)
+    completed_at = Column(DateTime, nullable=True, index=True) # First completion, for retention analytics
     
     user = relationship("app.models.user.User", back_populates="game_progress")
     game = relationship("Game", back_populates="user_progress")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -12,9 +12,22 @@ class Notification(Base):
     message = Column(String) # e.g., "John Doe has joined"
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    digested_at = Column(DateTime, nullable=True)  # when it went out in an email digest
     
     # Optional: Type of notification (for the icon color/shape)
     # "info", "warning", "success"
     type = Column(String, default="info") 
 
-    recipient = relationship("app.models.user.User", back_populates="notifications")
\ No newline at end of file
+    # Coalesced events ("12 new users joined"): one row per recipient, kind and window
+    group_key = Column(String, nullable=True)     # event kind, e.g. "user_joined"; None = not coalesced
+    event_count = Column(Integer, nullable=False, default=1, server_default="1")
+    actors = Column(JSON, nullable=True)          # a sample of who triggered it, newest last
+
+    recipient = relationship("app.models.user.User", back_populates="notifications")
+
+    __table_args__ = (
+        # Badge counts and the (unread) pages: one range scan per user, newest first
+        Index("ix_notifications_recipient_read_created", "recipient_id", "is_read", "created_at"),
+        # The "all" tab's keyset pages: (created_at, id) DESC within one user
+        Index("ix_notifications_recipient_created_id", "recipient_id", "created_at", "id"),
+    )
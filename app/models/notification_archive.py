@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index, JSON
+from datetime import datetime
+from app.database import Base
+
+class ArchivedNotification(Base):
+    """
+    Read notifications past NOTIFICATION_RETENTION_DAYS, moved out of
+    `notifications` so its indexes only cover what inboxes still show.
+    Keeps the original id; no foreign key, so writes to users never touch
+    the archive.
+    """
+    __tablename__ = "notifications_archive"
+
+    id = Column(Integer, primary_key=True)
+    recipient_id = Column(Integer, nullable=True)
+    title = Column(String)
+    message = Column(String)
+    is_read = Column(Boolean, default=True)
+    type = Column(String, default="info")
+    created_at = Column(DateTime)
+    digested_at = Column(DateTime, nullable=True)
+    group_key = Column(String, nullable=True)
+    event_count = Column(Integer, nullable=False, default=1, server_default="1")
+    actors = Column(JSON, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_notifications_archive_recipient_created", "recipient_id", "created_at"),
+    )
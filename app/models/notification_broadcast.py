@@ -0,0 +1,35 @@
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.database import Base
+
+class NotificationBroadcast(Base):
+    """
+    One notification sent to every user in a segment. The fan-out runs in
+    chunks of user ids; last_user_id and sent record progress, so a broadcast
+    interrupted by a restart resumes where it stopped.
+    """
+    __tablename__ = "notification_broadcasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String, nullable=False)
+    message = Column(String, nullable=False)
+    type = Column(String, default="info")
+
+    # Segment: None / False means everyone
+    language = Column(String, nullable=True)
+    active_only = Column(Boolean, nullable=False, default=True)
+
+    status = Column(String(16), nullable=False, default="queued")  # queued / running / done / failed
+    total = Column(Integer, nullable=True)        # recipients in the segment when the run started
+    sent = Column(Integer, nullable=False, default=0)
+    last_user_id = Column(Integer, nullable=False, default=0)
+    heartbeat_at = Column(DateTime, nullable=True)  # bumped per chunk; stale = the runner died
+    error = Column(Text, nullable=True)
+
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notification_broadcasts_status", "status"),
+    )
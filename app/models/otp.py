@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from datetime import datetime
+from app.database import Base
+
+class OtpCode(Base):
+    """
+    One live one-time code per (email, purpose). Only a keyed hash of the
+    code is stored. Expired rows are removed by the periodic sweep.
+    """
+    __tablename__ = "otp_codes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String, nullable=False)
+    purpose = Column(String(32), nullable=False)
+    code_hash = Column(String(64), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("email", "purpose", name="uq_otp_codes_email_purpose"),
+    )
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+class RateLimitCounter(Base):
+    """
+    Request count for one rate-limit key in one fixed window, used by the
+    shared ("database") rate limit backend. Rows expire after two windows.
+    """
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String(255), primary_key=True)
+    window = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    expires_at = Column(Integer, nullable=False, index=True)  # epoch seconds
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Date, LargeBinary, ForeignKey
+from app.database import Base
+
+class RecipeViewSketch(Base):
+    """
+    HyperLogLog sketch of the users who viewed a recipe on a given day.
+    One row per (recipe, day), 2**HLL_PRECISION bytes each.
+    """
+    __tablename__ = "recipe_view_sketches"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    registers = Column(LargeBinary, nullable=False)
@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from app.database import Base
+
+class RevokedToken(Base):
+    """
+    Shared revocation log for multi-worker deployments.
+    A row revokes either one token (jti) or every token a user was issued
+    before `revoked_at` (user_id). Rows are purged once `expires_at` passes.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(64), nullable=True, unique=True)
+    user_id = Column(Integer, nullable=True, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -25,3 +25,11 @@ class Chat(ChatBase):
 
     class Config:
         from_attributes = True
+
+
+class ChatHistoryMessage(ChatMessage):
+    id: Optional[int] = None  # None: not written yet (see app.core.chat_store)
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
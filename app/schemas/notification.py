@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class NotificationBase(BaseModel):
     title: str
@@ -14,6 +14,25 @@ class NotificationOut(NotificationBase):
     id: int
     is_read: bool
     created_at: datetime
+    event_count: int = 1
+    actors: Optional[List[str]] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class BroadcastCreate(NotificationBase):
+    # Segment; by default every active user
+    language: Optional[str] = None
+    active_only: bool = True
+
+class BroadcastOut(BroadcastCreate):
+    id: int
+    status: str
+    total: Optional[int] = None
+    sent: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -88,6 +88,9 @@ class RecipeExploreOut(BaseModel):
     class Config:
         from_attributes = True
 
+class RecipeTrendingOut(RecipeExploreOut):
+    trending_score: float = 0.0
+
 class RecipePagination(BaseModel):
     total: int
     page: int
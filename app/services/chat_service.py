@@ -1,36 +1,187 @@
-from openai import OpenAI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+import httpx
+from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.metrics import metrics
 from fastapi import UploadFile
 
-# Initialize OpenAI client with only API key
-if settings.OPENAI_API_KEY:
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-else:
+if not settings.OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY is not configured")
 
+class LLMBusyError(Exception):
+    """No upstream slot freed up within OPENAI_QUEUE_TIMEOUT_SECONDS."""
+
+class LLMClient:
+    """
+    The worker's shared AsyncOpenAI client: one pooled httpx connection pool,
+    per-request timeouts, and at most OPENAI_MAX_CONCURRENCY requests in
+    flight; the rest wait in line (llm.queue_wait) or give up with
+    LLMBusyError. Nothing blocks the event loop while a completion runs.
+
+    Gauges llm.in_flight / llm.waiting, timers llm.queue_wait / llm.request,
+    counters llm.rejected / llm.errors.
+
+    The client and semaphore belong to the event loop that first uses them
+    (one per worker); a new loop (e.g. another test client) gets new ones.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 20,
+        queue_timeout: float = 30,
+        timeout: float = 60,
+        connect_timeout: float = 5,
+        max_connections: int = 50,
+        max_keepalive: int = 20,
+        max_retries: int = 2,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self.waiting = 0
+        self._loop = None
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=self.max_retries,
+                http_client=httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_keepalive),
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client, self._semaphore
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[AsyncOpenAI]:
+        """Wait for an upstream slot; yields the client to make one request (or stream) with."""
+        client, semaphore = self._bind()
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        metrics.set_gauge("llm.waiting", self.waiting)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.inc("llm.rejected")
+            raise LLMBusyError("Too many chat requests in flight")
+        finally:
+            self.waiting -= 1
+            metrics.set_gauge("llm.waiting", self.waiting)
+        metrics.observe("llm.queue_wait", time.perf_counter() - queued_at)
+
+        started = time.perf_counter()
+        self.in_flight += 1
+        metrics.set_gauge("llm.in_flight", self.in_flight)
+        try:
+            yield client
+        except Exception:
+            metrics.inc("llm.errors")
+            raise
+        finally:
+            self.in_flight -= 1
+            metrics.set_gauge("llm.in_flight", self.in_flight)
+            metrics.observe("llm.request", time.perf_counter() - started)
+            semaphore.release()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._loop = None
+
+llm = LLMClient(
+    api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+    queue_timeout=settings.OPENAI_QUEUE_TIMEOUT_SECONDS,
+    timeout=settings.OPENAI_TIMEOUT_SECONDS,
+    connect_timeout=settings.OPENAI_CONNECT_TIMEOUT_SECONDS,
+    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+    max_keepalive=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    max_retries=settings.OPENAI_MAX_RETRIES,
+)
+
 SYSTEM_PROMPT = """
 You are 'Dwane', a friendly and encouraging cooking assistant for kids using the ChefJunior App.
 Keep answers short, fun, and educational. If they ask about recipes, guide them step by step.
 """
 
 async def transcribe_audio(audio_file: UploadFile) -> str:
-    # IMPORTANT: Pass tuple (filename, file_obj, content_type)
-    file_tuple = (audio_file.filename, audio_file.file, audio_file.content_type)
-    
-    transcript = client.audio.transcriptions.create(
-        model="whisper-1",
-        file=file_tuple,
-        response_format="json"
-    )
+    # IMPORTANT: Pass tuple (filename, file content, content_type)
+    file_tuple = (audio_file.filename, await audio_file.read(), audio_file.content_type)
+
+    async with llm.slot() as client:
+        transcript = await client.audio.transcriptions.create(
+            model="whisper-1",
+            file=file_tuple,
+            response_format="json"
+        )
     return transcript.text
 
-async def get_gpt_response(history: list) -> str:
+def _messages(history: list) -> list:
     # Ensure system prompt is first
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}] + history
-    
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=messages,
-        temperature=0.7
-    )
-    return response.choices[0].message.content
\ No newline at end of file
+    return [{"role": "system", "content": SYSTEM_PROMPT}] + history
+
+async def get_gpt_response(history: list) -> str:
+    async with llm.slot() as client:
+        response = await client.chat.completions.create(
+            model=settings.OPENAI_CHAT_MODEL,
+            messages=_messages(history),
+            temperature=0.7
+        )
+    return response.choices[0].message.content
+
+async def stream_gpt_response(history: list) -> AsyncIterator[str]:
+    """The answer as it is generated: yields text deltas (stream=True). Holds a slot until done."""
+    async with llm.slot() as client:
+        stream = await client.chat.completions.create(
+            model=settings.OPENAI_CHAT_MODEL,
+            messages=_messages(history),
+            temperature=0.7,
+            stream=True,
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
+SUMMARY_PROMPT = """
+Summarize this cooking chat between a kid and Dwane in a few short sentences, keeping names,
+recipes, allergies and anything Dwane promised. Fold in the earlier summary if there is one.
+"""
+
+async def summarize_conversation(previous: str, messages: list) -> str:
+    """A rolling summary of `previous` plus the turns that just left the memory window."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    if previous:
+        transcript = f"Earlier summary: {previous}\n\n{transcript}"
+    async with llm.slot() as client:
+        response = await client.chat.completions.create(
+            model=settings.OPENAI_CHAT_MODEL,
+            messages=[{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": transcript}],
+            temperature=0.2,
+            max_tokens=settings.CHAT_SUMMARY_MAX_TOKENS,
+        )
+    return response.choices[0].message.content
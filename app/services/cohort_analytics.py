@@ -0,0 +1,153 @@
+import threading
+from datetime import datetime, date, timedelta
+from typing import Dict, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.crud import crud_activity
+from app.models.activity import ActivityLog
+from app.models.game import UserGameProgress
+from app.models.user import User
+
+# Weeks are aligned on Mondays. 1970-01-01 was a Thursday, so shift by 3 days.
+_MONDAY_OFFSET_DAYS = 3
+
+_cache: Dict[Tuple[date, int], dict] = {}
+_cache_lock = threading.Lock()
+
+
+def _week_index(timestamps: np.ndarray) -> np.ndarray:
+    days = timestamps.astype("datetime64[D]").astype(np.int64)
+    return (days + _MONDAY_OFFSET_DAYS) // 7
+
+
+def _week_start(index: int) -> date:
+    return date(1970, 1, 1) + timedelta(days=int(index) * 7 - _MONDAY_OFFSET_DAYS)
+
+
+def _fetch_columns(db: Session, stmt) -> Tuple[np.ndarray, np.ndarray]:
+    """Runs a (user_id, timestamp) query and returns two columnar arrays."""
+    rows = db.execute(stmt).all()
+    user_ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    timestamps = np.array([r[1] for r in rows], dtype="datetime64[s]")
+    return user_ids, timestamps
+
+
+def _retention_counts(user_ids, cohort, signup_week, event_users, event_weeks, weeks):
+    """
+    cohort x week-offset matrix of distinct users with at least one event.
+    `user_ids` must be sorted; the other user arrays are aligned with it.
+    """
+    counts = np.zeros((weeks, weeks), dtype=np.int64)
+    if len(event_users) == 0 or len(user_ids) == 0:
+        return counts, np.empty(0, dtype=np.int64)
+
+    # Map each event to its user's row (users outside the window are dropped)
+    pos = np.searchsorted(user_ids, event_users)
+    pos[pos == len(user_ids)] = 0
+    known = user_ids[pos] == event_users
+    pos = pos[known]
+
+    offset = event_weeks[known] - signup_week[pos]
+    keep = (offset >= 0) & (offset < weeks)
+
+    # One hit per (user, week offset), however many events they had that week
+    keys = np.unique(pos[keep] * weeks + offset[keep])
+    cells = cohort[keys // weeks] * weeks + keys % weeks
+    counts += np.bincount(cells, minlength=weeks * weeks).reshape(weeks, weeks)
+    return counts, keys
+
+
+def compute_cohorts(db: Session, weeks: int = 12, now: datetime = None) -> dict:
+    """
+    Weekly signup cohorts for the last `weeks` weeks and the share of each cohort
+    that came back in week 0, 1, 2... after signing up.
+
+    Data is pulled as (user_id, timestamp) column pairs in one query per source
+    and reduced with NumPy; no ORM objects are created.
+    """
+    now = now or datetime.utcnow()
+    current_week = int(_week_index(np.array([now], dtype="datetime64[s]"))[0])
+    first_week = current_week - weeks + 1
+    since = datetime.combine(_week_start(first_week), datetime.min.time())
+
+    user_ids, joined_at = _fetch_columns(
+        # Signups after `now` (clock skew, bad data) would fall past the last cohort
+        db, select(User.id, User.joined_at).where(User.joined_at >= since, User.joined_at <= now)
+    )
+    order = np.argsort(user_ids)
+    user_ids = user_ids[order]
+    signup_week = _week_index(joined_at[order])
+    cohort = signup_week - first_week
+    sizes = np.bincount(cohort, minlength=weeks)
+
+    sources = {
+        "recipes_viewed": select(ActivityLog.user_id, ActivityLog.timestamp).where(
+            ActivityLog.action == crud_activity.ACTION_VIEWED_RECIPE,
+            ActivityLog.timestamp >= since,
+        ),
+        "favorites": select(ActivityLog.user_id, ActivityLog.timestamp).where(
+            ActivityLog.action == crud_activity.ACTION_FAVORITED_RECIPE,
+            ActivityLog.timestamp >= since,
+        ),
+        "games_completed": select(UserGameProgress.user_id, UserGameProgress.completed_at).where(
+            UserGameProgress.completed_at >= since,
+        ),
+    }
+
+    # Cells in the future (cohort c, offset o with c + o past this week) are unknown
+    c_idx, o_idx = np.indices((weeks, weeks))
+    observable = c_idx + o_idx <= weeks - 1
+
+    def to_rates(counts):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = np.where(sizes[:, None] > 0, counts / sizes[:, None], 0.0)
+        return [
+            [round(float(rates[c, o]), 4) if observable[c, o] else None for o in range(weeks)]
+            for c in range(weeks)
+        ]
+
+    metrics = {}
+    all_keys = []
+    for name, stmt in sources.items():
+        event_users, event_ts = _fetch_columns(db, stmt)
+        counts, keys = _retention_counts(
+            user_ids, cohort, signup_week, event_users, _week_index(event_ts), weeks
+        )
+        metrics[name] = to_rates(counts)
+        all_keys.append(keys)
+
+    # "any": returned and did at least one of the above
+    keys = np.unique(np.concatenate(all_keys)) if all_keys else np.empty(0, dtype=np.int64)
+    any_counts = np.bincount(cohort[keys // weeks] * weeks + keys % weeks, minlength=weeks * weeks)
+    metrics["any"] = to_rates(any_counts.reshape(weeks, weeks))
+
+    return {
+        "generated_at": now.isoformat(),
+        "weeks": weeks,
+        "cohorts": [_week_start(first_week + c).isoformat() for c in range(weeks)],
+        "cohort_sizes": sizes.tolist(),
+        "retention": metrics,
+    }
+
+
+def get_cohorts(db: Session, weeks: int = 12) -> dict:
+    """compute_cohorts() cached for the rest of the (UTC) day."""
+    today = datetime.utcnow().date()
+    key = (today, weeks)
+
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = compute_cohorts(db, weeks=weeks)
+
+    with _cache_lock:
+        # Drop yesterday's entries when the day rolls over
+        for stale in [k for k in _cache if k[0] != today]:
+            del _cache[stale]
+        _cache[key] = result
+    return result
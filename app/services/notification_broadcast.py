@@ -0,0 +1,189 @@
+"""
+Broadcast one notification to every user in a segment (language, active).
+
+The fan-out never loads users into Python. It walks users.id upwards in
+chunks of BROADCAST_CHUNK_SIZE recipients, and each chunk is one transaction:
+
+1. INSERT INTO notifications (...) SELECT id, :title, ... FROM users
+   WHERE id > :last AND id <= :chunk_end AND <segment>
+2. UPDATE notification_counters SET unread = unread + 1 for the same users
+   (users without a counter row get one built from the table on first read)
+3. the broadcast's progress (sent, last_user_id, heartbeat_at), conditional
+   on last_user_id, so if another runner took the broadcast over this chunk
+   rolls back instead of being inserted twice
+
+After each chunk, open streams in the chunk's id range get a "resync".
+
+The request handler runs the broadcast as a background task; the scheduler's
+resume_broadcasts job picks up broadcasts whose runner died (queued or
+running with a heartbeat older than BROADCAST_STALE_SECONDS).
+Timer per chunk: broadcast.chunk.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import false, func, literal, or_, select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.notification_hub import hub
+from app.database import SessionLocal
+from app.models.notification import Notification
+from app.models.notification_broadcast import NotificationBroadcast
+from app.models.notification_counter import NotificationCounter
+from app.models.user import User
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+def create_broadcast(
+    db: Session, title: str, message: str, type: str = "info",
+    language: Optional[str] = None, active_only: bool = True, created_by: Optional[int] = None,
+) -> NotificationBroadcast:
+    broadcast = NotificationBroadcast(
+        title=title, message=message, type=type,
+        language=language, active_only=active_only, created_by=created_by,
+    )
+    db.add(broadcast)
+    db.commit()
+    db.refresh(broadcast)
+    return broadcast
+
+def segment(broadcast: NotificationBroadcast) -> list:
+    """WHERE clauses on users selecting the broadcast's recipients."""
+    conditions = []
+    if broadcast.language:
+        conditions.append(User.language == broadcast.language)
+    if broadcast.active_only:
+        conditions.append(User.is_active == True)
+    return conditions
+
+def count_recipients(db: Session, broadcast: NotificationBroadcast) -> int:
+    return db.execute(select(func.count()).select_from(User).where(*segment(broadcast))).scalar_one()
+
+def _claim(db: Session, broadcast_id: int, stale_seconds: float) -> Optional[NotificationBroadcast]:
+    """Take the broadcast if it's queued or its runner stopped heartbeating."""
+    now = datetime.utcnow()
+    claimed = db.execute(
+        update(NotificationBroadcast)
+        .where(
+            NotificationBroadcast.id == broadcast_id,
+            or_(
+                NotificationBroadcast.status == QUEUED,
+                (NotificationBroadcast.status == RUNNING)
+                & (NotificationBroadcast.heartbeat_at < now - timedelta(seconds=stale_seconds)),
+            ),
+        )
+        .values(status=RUNNING, heartbeat_at=now)
+    ).rowcount
+    db.commit()
+    if not claimed:
+        return None
+    return db.get(NotificationBroadcast, broadcast_id)
+
+def _chunk_end(db: Session, broadcast: NotificationBroadcast, after_id: int, chunk_size: int) -> Optional[int]:
+    """The highest user id among the next chunk_size recipients above after_id."""
+    ids = (
+        select(User.id)
+        .where(User.id > after_id, *segment(broadcast))
+        .order_by(User.id)
+        .limit(chunk_size)
+        .subquery()
+    )
+    return db.execute(select(func.max(ids.c.id))).scalar_one_or_none()
+
+def fan_out_chunk(
+    db: Session, broadcast: NotificationBroadcast, after_id: int, chunk_end: int, now: datetime,
+) -> Optional[int]:
+    """Insert the chunk's notifications, bump counters and record progress; rows inserted, or None if taken over."""
+    recipients = (User.id > after_id, User.id <= chunk_end, *segment(broadcast))
+    inserted = db.execute(
+        Notification.__table__.insert().from_select(
+            ["recipient_id", "title", "message", "type", "is_read", "created_at"],
+            select(
+                User.id, literal(broadcast.title), literal(broadcast.message),
+                literal(broadcast.type), false(), literal(now),
+            ).where(*recipients),
+        )
+    ).rowcount
+    db.execute(
+        update(NotificationCounter)
+        .where(NotificationCounter.user_id.in_(select(User.id).where(*recipients)))
+        .values(unread=NotificationCounter.unread + 1, updated_at=now)
+    )
+    progressed = db.execute(
+        update(NotificationBroadcast)
+        .where(NotificationBroadcast.id == broadcast.id, NotificationBroadcast.last_user_id == after_id)
+        .values(
+            last_user_id=chunk_end,
+            sent=NotificationBroadcast.sent + inserted,
+            heartbeat_at=datetime.utcnow(),
+        )
+    ).rowcount
+    if not progressed:
+        db.rollback()
+        return None
+    db.commit()
+    return inserted
+
+def run_broadcast(
+    broadcast_id: int,
+    session_factory=SessionLocal,
+    chunk_size: int = None,
+    stale_seconds: float = None,
+) -> Optional[NotificationBroadcast]:
+    """Fan the broadcast out (or resume it); None if another runner has it."""
+    chunk_size = chunk_size or settings.BROADCAST_CHUNK_SIZE
+    stale_seconds = stale_seconds if stale_seconds is not None else settings.BROADCAST_STALE_SECONDS
+
+    with session_factory() as db:
+        broadcast = _claim(db, broadcast_id, stale_seconds)
+        if broadcast is None:
+            return None
+        try:
+            if broadcast.total is None:
+                broadcast.total = count_recipients(db, broadcast)
+                db.commit()
+
+            # One timestamp for the whole broadcast, so it sorts as one event in every list
+            now = broadcast.created_at or datetime.utcnow()
+            after_id = broadcast.last_user_id
+            while True:
+                chunk_end = _chunk_end(db, broadcast, after_id, chunk_size)
+                if chunk_end is None:
+                    break
+                started = time.perf_counter()
+                inserted = fan_out_chunk(db, broadcast, after_id, chunk_end, now)
+                metrics.observe("broadcast.chunk", time.perf_counter() - started)
+                if inserted is None:
+                    return None  # taken over by another runner
+                metrics.inc("broadcast.notifications", inserted)
+                hub.publish_range(after_id + 1, chunk_end, {"type": "resync"})
+                after_id = chunk_end
+
+            broadcast.status = DONE
+            broadcast.finished_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            broadcast.status = FAILED
+            broadcast.error = str(e)
+            broadcast.finished_at = datetime.utcnow()
+            db.commit()
+            print(f"Broadcast {broadcast_id} failed: {e}")
+        db.refresh(broadcast)
+        return broadcast
+
+def resume_broadcasts(session_factory=SessionLocal, stale_seconds: float = None) -> int:
+    """Scheduler job: finish broadcasts whose background task was lost; returns how many ran."""
+    stale_seconds = stale_seconds if stale_seconds is not None else settings.BROADCAST_STALE_SECONDS
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    with session_factory() as db:
+        ids = list(db.execute(
+            select(NotificationBroadcast.id).where(
+                or_(
+                    (NotificationBroadcast.status == QUEUED) & (NotificationBroadcast.created_at < cutoff),
+                    (NotificationBroadcast.status == RUNNING) & (NotificationBroadcast.heartbeat_at < cutoff),
+                )
+            ).order_by(NotificationBroadcast.id)
+        ).scalars())
+    return sum(1 for broadcast_id in ids if run_broadcast(broadcast_id, session_factory, stale_seconds=stale_seconds))
@@ -0,0 +1,177 @@
+"""
+Email digest of unread notifications.
+
+Recipients are processed in batches of DIGEST_BATCH_SIZE users, walking
+recipient_id upwards (keyset, no OFFSET). For each batch:
+
+1. the batch's pending notifications (unread, not digested yet, created
+   before the run started) are claimed: one conditional UPDATE stamps
+   digested_at where it is still NULL, so when several workers run the job
+   each notification goes to exactly one of them;
+2. one query loads the notifications this run claimed and one loads the
+   users; one email per user is rendered from the precompiled templates;
+3. the emails go out over a single pooled SMTP session (a new one only every
+   SMTP_MAX_MESSAGES_PER_CONNECTION emails). Emails the server defers, and
+   everything left after a dropped connection, are handed to the outbox,
+   which retries them.
+
+A crash between 1 and 3 skips that batch's digest rather than sending it
+twice. A dry run claims nothing.
+Per-batch timers: digest.batch, digest.render, digest.smtp.
+"""
+import smtplib
+import time
+from datetime import datetime
+from itertools import groupby
+from typing import List, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.email_utils import (
+    DIGEST_ITEM, DIGEST_MORE, MESSAGE_ERRORS, SMTPConnectionPool, SafeHTML, build_message, render_email,
+)
+from app.core.mailer import is_permanent_error, mailer
+from app.core.metrics import metrics
+from app.database import SessionLocal
+from app.models.notification import Notification
+from app.models.user import User
+
+def _pending(cutoff: datetime):
+    return (
+        Notification.is_read == False,
+        Notification.digested_at.is_(None),
+        Notification.created_at <= cutoff,
+    )
+
+def next_recipients(db: Session, after_id: int, cutoff: datetime, limit: int) -> List[int]:
+    """The next `limit` user ids above after_id with pending notifications."""
+    return list(db.execute(
+        select(Notification.recipient_id)
+        .where(Notification.recipient_id > after_id, *_pending(cutoff))
+        .group_by(Notification.recipient_id)
+        .order_by(Notification.recipient_id)
+        .limit(limit)
+    ).scalars())
+
+def claim(db: Session, user_ids: List[int], cutoff: datetime) -> int:
+    """Stamp the users' pending notifications digested_at=cutoff; returns how many this run got. Commits."""
+    claimed = db.execute(
+        update(Notification)
+        .where(Notification.recipient_id.in_(user_ids), *_pending(cutoff))
+        .values(digested_at=cutoff)
+    ).rowcount
+    db.commit()
+    return claimed
+
+def build_digests(
+    db: Session, user_ids: List[int], cutoff: datetime, max_items: int, claimed: bool = False,
+) -> List[Tuple[str, str, str]]:
+    """(to_email, subject, body) for each active user in the batch (only rows this run claimed if `claimed`)."""
+    users = {
+        row.id: row for row in db.execute(
+            select(User.id, User.email, User.full_name, User.is_active).where(User.id.in_(user_ids))
+        )
+    }
+    rows = db.execute(
+        select(Notification.recipient_id, Notification.title, Notification.message)
+        .where(Notification.recipient_id.in_(user_ids),
+               *((Notification.digested_at == cutoff,) if claimed else _pending(cutoff)))
+        .order_by(Notification.recipient_id, Notification.created_at.desc())
+    ).all()
+
+    digests = []
+    for user_id, notifications in groupby(rows, key=lambda row: row.recipient_id):
+        user = users.get(user_id)
+        if user is None or not user.is_active or not user.email:
+            continue
+        notifications = list(notifications)
+        items = "".join(
+            DIGEST_ITEM.render(title=n.title or "", message=n.message or "")[1]
+            for n in notifications[:max_items]
+        )
+        extra = len(notifications) - max_items
+        more = DIGEST_MORE.render(count=extra)[1] if extra > 0 else ""
+        subject, body = render_email(
+            "notification_digest",
+            name=user.full_name or "there",
+            count=len(notifications),
+            items=SafeHTML(items),
+            more=SafeHTML(more),
+        )
+        digests.append((user.email, subject, body))
+    return digests
+
+def deliver_batch(db: Session, pool: SMTPConnectionPool, emails: List[Tuple[str, str, str]]) -> dict:
+    """Send over pooled sessions; deferred or unsent emails go to the outbox."""
+    sent, failed = 0, 0
+    retry: List[Tuple[str, str, str]] = []
+    position = 0
+    while position < len(emails):
+        chunk = emails[position:position + pool.max_messages]
+        done = 0
+        try:
+            with pool.connection(messages=len(chunk)) as server:
+                for to_email, subject, body in chunk:
+                    try:
+                        server.send_message(build_message(to_email, subject, body))
+                        sent += 1
+                    except MESSAGE_ERRORS as e:
+                        if is_permanent_error(e):
+                            failed += 1
+                        else:
+                            retry.append((to_email, subject, body))
+                    done += 1
+        except (smtplib.SMTPException, OSError) as e:
+            # Connection lost or unavailable: leave the rest of the batch to the outbox
+            print(f"Digest SMTP session failed, queueing {len(emails) - position - done} emails: {e}")
+            retry.extend(emails[position + done:])
+            break
+        position += len(chunk)
+
+    if retry:
+        mailer.enqueue_many(db, retry)
+    return {"sent": sent, "queued": len(retry), "failed": failed}
+
+def send_digests(
+    session_factory=SessionLocal,
+    pool: SMTPConnectionPool = None,
+    batch_size: int = None,
+    max_items: int = None,
+    dry_run: bool = False,
+) -> dict:
+    """Send one digest per user with pending notifications; returns run totals."""
+    pool = pool or mailer.pool
+    batch_size = batch_size or settings.DIGEST_BATCH_SIZE
+    max_items = max_items or settings.DIGEST_MAX_ITEMS
+    cutoff = datetime.utcnow()
+    totals = {"batches": 0, "users": 0, "emails": 0, "sent": 0, "queued": 0, "failed": 0}
+    after_id = 0
+
+    while True:
+        started = time.perf_counter()
+        with session_factory() as db:
+            user_ids = next_recipients(db, after_id, cutoff, batch_size)
+            if not user_ids:
+                break
+            after_id = user_ids[-1]
+            if not dry_run:
+                claim(db, user_ids, cutoff)
+
+            t = time.perf_counter()
+            emails = build_digests(db, user_ids, cutoff, max_items, claimed=not dry_run)
+            metrics.observe("digest.render", time.perf_counter() - t)
+
+            if not dry_run:
+                t = time.perf_counter()
+                result = deliver_batch(db, pool, emails)
+                metrics.observe("digest.smtp", time.perf_counter() - t)
+                for key, value in result.items():
+                    totals[key] += value
+                    metrics.inc(f"digest.{key}", value)
+
+        totals["batches"] += 1
+        totals["users"] += len(user_ids)
+        totals["emails"] += len(emails)
+        metrics.observe("digest.batch", time.perf_counter() - started)
+
+    return totals
@@ -0,0 +1,151 @@
+"""
+Retention for `notifications`: read notifications older than
+NOTIFICATION_RETENTION_DAYS are moved to notifications_archive (or deleted,
+NOTIFICATION_RETENTION_MODE="delete"). Unread ones are never touched, so
+the unread counters stay correct.
+
+The job walks users.id upwards, a batch of users at a time, and finds their
+old read rows through the (recipient_id, is_read, created_at) index the
+inbox already uses; no extra index on the hot table. Each transaction moves
+at most NOTIFICATION_RETENTION_BATCH_SIZE rows (copy, then delete by id),
+and the job sleeps NOTIFICATION_RETENTION_PAUSE_SECONDS between batches so
+it never holds locks writers are waiting for. A run stops after
+NOTIFICATION_RETENTION_MAX_SECONDS; the next one starts over from the first
+user and only finds what is left.
+
+Every worker's scheduler runs the job. Rows are picked with FOR UPDATE
+SKIP LOCKED (Postgres, MySQL), so concurrent runs take disjoint rows instead
+of archiving the same ids twice; SQLite serializes the writes and the
+second run finds the rows already gone.
+
+Timer per batch: notifications.retention.batch.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, literal, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.database import SessionLocal
+from app.models.notification import Notification
+from app.models.notification_archive import ArchivedNotification
+from app.models.user import User
+
+COLUMNS = (
+    "id", "recipient_id", "title", "message", "is_read", "type", "created_at", "digested_at",
+    "group_key", "event_count", "actors",
+)
+
+def expired(user_ids, cutoff: datetime) -> tuple:
+    return (
+        Notification.recipient_id.in_(user_ids),
+        Notification.is_read == True,
+        Notification.created_at < cutoff,
+    )
+
+def move_batch(db: Session, user_ids, cutoff: datetime, limit: int, mode: str) -> int:
+    """Archive (or delete) up to `limit` expired rows of these users in one transaction; returns rows moved."""
+    ids = list(db.execute(
+        select(Notification.id).where(*expired(user_ids, cutoff)).limit(limit)
+        .with_for_update(skip_locked=True)
+    ).scalars())
+    if not ids:
+        db.commit()
+        return 0
+    if mode == "archive":
+        db.execute(
+            ArchivedNotification.__table__.insert().from_select(
+                [*COLUMNS, "archived_at"],
+                select(*(getattr(Notification, name) for name in COLUMNS), literal(datetime.utcnow()))
+                .where(Notification.id.in_(ids)),
+            )
+        )
+    moved = db.execute(delete(Notification).where(Notification.id.in_(ids))).rowcount
+    db.commit()
+    return moved
+
+def count_expired(db: Session, cutoff: datetime) -> int:
+    return db.execute(
+        select(func.count()).select_from(Notification)
+        .where(Notification.is_read == True, Notification.created_at < cutoff)
+    ).scalar_one()
+
+def apply_retention(
+    session_factory=SessionLocal,
+    cutoff: Optional[datetime] = None,
+    mode: str = None,
+    batch_size: int = None,
+    pause_seconds: float = None,
+    max_seconds: float = None,
+) -> dict:
+    """One retention run; returns rows moved, batches and elapsed seconds."""
+    cutoff = cutoff or datetime.utcnow() - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+    mode = mode or settings.NOTIFICATION_RETENTION_MODE
+    if mode not in ("archive", "delete"):
+        raise ValueError(f"Unknown NOTIFICATION_RETENTION_MODE: {mode!r}")
+    batch_size = batch_size or settings.NOTIFICATION_RETENTION_BATCH_SIZE
+    pause_seconds = settings.NOTIFICATION_RETENTION_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    max_seconds = max_seconds or settings.NOTIFICATION_RETENTION_MAX_SECONDS
+
+    started = time.perf_counter()
+    moved = batches = 0
+    finished = True
+    after_id = 0
+    with session_factory() as db:
+        while True:
+            user_ids = list(db.execute(
+                select(User.id).where(User.id > after_id).order_by(User.id).limit(batch_size)
+            ).scalars())
+            db.commit()  # don't hold a read snapshot across the pause
+            if not user_ids:
+                break
+
+            # Stay on these users until their expired rows are gone
+            while True:
+                if time.perf_counter() - started > max_seconds:
+                    finished = False
+                    break
+                batch_started = time.perf_counter()
+                count = move_batch(db, user_ids, cutoff, batch_size, mode)
+                if count:
+                    metrics.observe("notifications.retention.batch", time.perf_counter() - batch_started)
+                    metrics.inc("notifications.retention.moved", count)
+                    moved += count
+                    batches += 1
+                    if pause_seconds:
+                        time.sleep(pause_seconds)
+                if count < batch_size:
+                    break
+            if not finished:
+                break
+            after_id = user_ids[-1]
+
+    return {
+        "mode": mode,
+        "moved": moved,
+        "batches": batches,
+        "finished": finished,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }
+
+def retention_job():
+    """Scheduler job: only reports runs that moved something."""
+    result = apply_retention()
+    return result if result["moved"] else None
+
+def compact(engine) -> str:
+    """
+    Give the space back after a large first run (maintenance window; the
+    regular runs only need autovacuum). Postgres: VACUUM (ANALYZE) plus
+    REINDEX ... CONCURRENTLY; SQLite: VACUUM, which rewrites the whole file.
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM (ANALYZE) notifications")
+            conn.exec_driver_sql("REINDEX TABLE CONCURRENTLY notifications")
+        return "VACUUM (ANALYZE) + REINDEX CONCURRENTLY notifications"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("ANALYZE")
+    return "VACUUM + ANALYZE"
@@ -0,0 +1,252 @@
+import heapq
+import math
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+# Decay time constants per window, in minutes
+WINDOWS: Dict[str, int] = {"1h": 60, "24h": 24 * 60, "7d": 7 * 24 * 60}
+
+VIEW, FAVORITE = 0, 1
+
+
+class TrendingEngine:
+    """
+    Time-decayed "trending" scores for recipes, kept entirely in memory.
+
+    - The last `ring_minutes` minutes of raw counts live in a ring buffer of
+      shape (ring_minutes, 2, capacity): one slot per minute, views and favorites.
+    - Older minutes are folded into one exponentially decayed accumulator per
+      window (1h / 24h / 7d time constants) when their slot is reused.
+    - A recipe's score is decayed + sum(ring slots weighted by exp(-age / tau)).
+
+    Exponential decay ages every score by the same factor, so the ranking only
+    changes when an event arrives. That lets us keep an exact top-K per window
+    and update it incrementally on each event instead of re-sorting.
+
+    Memory is fixed by `capacity` (rows are recycled, evicting the recipe with
+    the lowest 7d score) and `ring_minutes`, whatever the traffic. For the same
+    reason a row's 7d rank only changes when it gets an event, so the eviction
+    candidate comes from a lazy min-heap keyed by log(score) + minute / tau
+    (time-independent) rather than a scan of every row.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 5000,
+        ring_minutes: int = 60,
+        top_k: int = 50,
+        view_weight: float = 1.0,
+        favorite_weight: float = 5.0,
+        clock=time.time,
+    ):
+        self.capacity = capacity
+        self.ring_minutes = ring_minutes
+        self.top_k = top_k
+        self.clock = clock
+
+        self._weights = np.array([view_weight, favorite_weight], dtype=np.float64)
+        self._window_names = list(WINDOWS)
+        self._taus = np.array([WINDOWS[w] for w in self._window_names], dtype=np.float64)
+
+        self._lock = threading.Lock()
+        self._ring = np.zeros((ring_minutes, 2, capacity), dtype=np.uint32)
+        self._slot_minute = np.full(ring_minutes, -1, dtype=np.int64)
+        self._decayed = np.zeros((len(self._taus), capacity), dtype=np.float64)
+
+        now = self._minute()
+        self._current_minute = now
+        self._folded_minute = now - ring_minutes  # decayed holds everything up to here
+
+        self._row_of: Dict[int, int] = {}
+        self._recipe_at = np.full(capacity, -1, dtype=np.int64)
+        self._free_rows = list(range(capacity - 1, -1, -1))
+
+        # window -> list of (score, minute the score was taken, recipe_id)
+        self._top: Dict[str, List[Tuple[float, int, int]]] = {w: [] for w in self._window_names}
+
+        # Eviction: (key, row) min-heap; entries whose key no longer matches _evict_key[row] are stale
+        self._week = self._window_names.index("7d")
+        self._evict_key = np.full(capacity, np.nan)
+        self._evict_heap: List[Tuple[float, int]] = []
+
+    def _minute(self) -> int:
+        return int(self.clock() // 60)
+
+    # ---- ring maintenance ----
+
+    def _advance(self, minute: int):
+        if minute <= self._current_minute:
+            return
+        target = minute - self.ring_minutes
+        if target > self._folded_minute:
+            self._fold(target)
+        self._current_minute = minute
+
+    def _fold(self, target: int):
+        """Move every ring slot with minute <= target into the decayed accumulators."""
+        decay = np.exp(-(target - self._folded_minute) / self._taus)
+        self._decayed *= decay[:, None]
+
+        slots = np.nonzero((self._slot_minute >= 0) & (self._slot_minute <= target))[0]
+        if len(slots):
+            ages = target - self._slot_minute[slots]
+            weights = np.exp(-ages[None, :] / self._taus[:, None])              # (windows, slots)
+            events = np.tensordot(self._weights, self._ring[slots].astype(np.float64), axes=([0], [1]))  # (slots, capacity)
+            self._decayed += weights @ events
+            self._ring[slots] = 0
+            self._slot_minute[slots] = -1
+
+        self._folded_minute = target
+
+    def _scores(self, rows, minute: int) -> np.ndarray:
+        """Live scores (windows x len(rows)) as of `minute`."""
+        scores = self._decayed[:, rows] * np.exp(-(minute - self._folded_minute) / self._taus)[:, None]
+        live = np.nonzero(self._slot_minute > self._folded_minute)[0]
+        if len(live):
+            ages = minute - self._slot_minute[live]
+            weights = np.exp(-ages[None, :] / self._taus[:, None])
+            ring = self._ring[np.ix_(live, [VIEW, FAVORITE], rows)].astype(np.float64)
+            scores += weights @ np.tensordot(self._weights, ring, axes=([0], [1]))
+        return scores
+
+    # ---- rows ----
+
+    def _row(self, recipe_id: int, minute: int) -> int:
+        row = self._row_of.get(recipe_id)
+        if row is not None:
+            return row
+
+        if not self._free_rows:
+            # Full: recycle the row with the lowest long-window score
+            if self._release(self._victim()):
+                self._rebuild_top(minute)
+
+        row = self._free_rows.pop()
+        self._row_of[recipe_id] = row
+        self._recipe_at[row] = recipe_id
+        return row
+
+    def _victim(self) -> int:
+        """The used row with the lowest 7d score."""
+        while self._evict_heap:
+            key, row = heapq.heappop(self._evict_heap)
+            if self._evict_key[row] == key:
+                return row
+        # Unreachable while every used row has a key; scan as a fallback
+        rows = np.nonzero(self._recipe_at >= 0)[0]
+        return int(rows[np.argmin(self._scores(rows, self._current_minute)[self._week])])
+
+    def _set_evict_key(self, row: int, week_score: float, minute: int):
+        key = math.log(week_score) + minute / self._taus[self._week] if week_score > 0 else -math.inf
+        self._evict_key[row] = key
+        heapq.heappush(self._evict_heap, (key, row))
+        if len(self._evict_heap) > 4 * self.capacity:
+            # Drop the stale entries
+            self._evict_heap = [(float(self._evict_key[r]), int(r)) for r in np.nonzero(self._recipe_at >= 0)[0]]
+            heapq.heapify(self._evict_heap)
+
+    def _release(self, row: int) -> bool:
+        """Free a row; returns whether the recipe was in a top-K list (which then needs refilling)."""
+        recipe_id = int(self._recipe_at[row])
+        self._row_of.pop(recipe_id, None)
+        self._recipe_at[row] = -1
+        self._ring[:, :, row] = 0
+        self._decayed[:, row] = 0.0
+        self._evict_key[row] = np.nan
+        self._free_rows.append(row)
+        was_top = False
+        for window in self._window_names:
+            kept = [entry for entry in self._top[window] if entry[2] != recipe_id]
+            was_top |= len(kept) != len(self._top[window])
+            self._top[window] = kept
+        return was_top
+
+    # ---- top-K ----
+
+    def _rebuild_top(self, minute: int):
+        rows = np.nonzero(self._recipe_at >= 0)[0]
+        if not len(rows):
+            self._top = {w: [] for w in self._window_names}
+            return
+        scores = self._scores(rows, minute)
+        k = min(self.top_k, len(rows))
+        for i, window in enumerate(self._window_names):
+            best = np.argpartition(-scores[i], k - 1)[:k]
+            self._top[window] = sorted(
+                ((float(scores[i, j]), minute, int(self._recipe_at[rows[j]])) for j in best),
+                reverse=True,
+            )
+
+    def _update_top(self, recipe_id: int, row: int, minute: int):
+        scores = self._scores([row], minute)[:, 0]
+        self._set_evict_key(row, float(scores[self._week]), minute)
+        for i, window in enumerate(self._window_names):
+            tau = self._taus[i]
+            # Bring every entry to the same point in time before comparing
+            entries = [
+                (score * math.exp(-(minute - taken) / tau), minute, rid)
+                for score, taken, rid in self._top[window] if rid != recipe_id
+            ]
+            entries.append((float(scores[i]), minute, recipe_id))
+            entries.sort(reverse=True)
+            self._top[window] = entries[: self.top_k]
+
+    # ---- public API ----
+
+    def record(self, recipe_id: int, kind: int = VIEW, count: int = 1):
+        with self._lock:
+            minute = self._minute()
+            self._advance(minute)
+
+            slot = minute % self.ring_minutes
+            if self._slot_minute[slot] != minute:
+                self._ring[slot] = 0
+                self._slot_minute[slot] = minute
+
+            row = self._row(recipe_id, minute)
+            self._ring[slot, kind, row] += count
+            self._update_top(recipe_id, row, minute)
+
+    def record_view(self, recipe_id: int):
+        self.record(recipe_id, VIEW)
+
+    def record_favorite(self, recipe_id: int):
+        self.record(recipe_id, FAVORITE)
+
+    def forget(self, recipe_id: int):
+        """Drop a recipe (e.g. when it is deleted)."""
+        with self._lock:
+            row = self._row_of.get(recipe_id)
+            if row is not None and self._release(row):
+                minute = self._minute()
+                self._advance(minute)
+                self._rebuild_top(minute)
+
+    def top(self, window: str = "24h", limit: int = 10) -> List[Tuple[int, float]]:
+        """[(recipe_id, score)] for the window, best first, scores as of now."""
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown window: {window}")
+
+        with self._lock:
+            minute = self._minute()
+            self._advance(minute)
+            tau = WINDOWS[window]
+            entries = [
+                (rid, round(score * math.exp(-(minute - taken) / tau), 4))
+                for score, taken, rid in self._top[window]
+            ]
+        return [entry for entry in entries if entry[1] > 0][:limit]
+
+
+trending = TrendingEngine(
+    capacity=settings.TRENDING_MAX_RECIPES,
+    ring_minutes=settings.TRENDING_RING_MINUTES,
+    top_k=settings.TRENDING_TOP_K,
+    view_weight=settings.TRENDING_VIEW_WEIGHT,
+    favorite_weight=settings.TRENDING_FAVORITE_WEIGHT,
+)
@@ -0,0 +1,78 @@
+import threading
+import time
+from datetime import datetime, date
+from typing import Dict, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.hyperloglog import HyperLogLog
+from app.crud import crud_recipe_view
+
+class ViewSketchBuffer:
+    """
+    Collects recipe viewers into in-memory HyperLogLog sketches and periodically
+    merges them into `recipe_view_sketches`.
+
+    Only sketches touched since the last flush are kept in memory, and each one
+    is a fixed 2**precision bytes, so memory is bounded by
+    max_pending * 2**precision. Because merging is a register-wise max, flushing
+    the same viewer twice (or from several workers) never double counts.
+    """
+
+    def __init__(self, precision: int = 12, flush_interval: float = 30, max_pending: int = 1000):
+        self.precision = precision
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[int, date], HyperLogLog] = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, recipe_id: int, user_id: int):
+        key = (recipe_id, datetime.utcnow().date())
+        with self._lock:
+            sketch = self._pending.get(key)
+            if sketch is None:
+                sketch = self._pending[key] = HyperLogLog(self.precision)
+            sketch.add(user_id)
+
+    def should_flush(self) -> bool:
+        return (
+            len(self._pending) >= self.max_pending
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def flush(self, db: Session) -> int:
+        """
+        Write pending sketches to the database. Returns the number of rows
+        merged. Called from GET handlers, so a failure is logged and the
+        sketches kept for the next flush rather than failing the read.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return 0
+
+        try:
+            for (recipe_id, day), sketch in pending.items():
+                crud_recipe_view.merge_sketch(db, recipe_id, day, sketch)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Recipe view sketch flush failed, {len(pending)} sketches kept for retry: {e}")
+            # Put the sketches back so the views are not lost
+            with self._lock:
+                for key, sketch in pending.items():
+                    if key in self._pending:
+                        self._pending[key].merge(sketch)
+                    else:
+                        self._pending[key] = sketch
+            return 0
+
+        return len(pending)
+
+view_tracker = ViewSketchBuffer(
+    precision=settings.HLL_PRECISION,
+    flush_interval=settings.VIEW_SKETCH_FLUSH_SECONDS,
+)
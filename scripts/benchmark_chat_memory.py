@@ -0,0 +1,128 @@
+"""
+Prompt size and memory held by the chat conversation memory.
+
+1. One long conversation: --turns messages over the chat WebSocket
+   (in-process app, scripts/fake_openai_server.py in-process), with the
+   window unbounded and then at --budget tokens (plus rolling summaries with
+   --summaries). Reports the prompt size the fake server saw on the first
+   and last turns.
+2. Many clients: --sessions clients of --session-turns turns each go through
+   a ConversationMemory capped at --max-sessions / --max-tokens, on a fake
+   clock that advances --step seconds per client, then a sweep after the
+   TTL. Reports sessions and tokens held, evictions, and Python memory
+   allocated (tracemalloc).
+
+Usage:
+    python -m scripts.benchmark_chat_memory --turns 60 --budget 500 --sessions 50000 --max-sessions 5000
+"""
+import argparse
+import json
+import tracemalloc
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import chat
+from app.core import conversation_memory
+from app.core.conversation_memory import ConversationMemory
+from app.core.metrics import metrics
+from app.services import chat_service
+from scripts.fake_openai_server import DEFAULT_REPLY, FakeOpenAIServer
+
+
+def long_conversation(args, server: FakeOpenAIServer, budget: int, summaries: bool) -> dict:
+    chat.memory = ConversationMemory(token_budget=budget, summaries=summaries)
+    chat.settings.CHAT_SUMMARY_ENABLED = summaries
+    server.prompt_chars.clear()
+    client_id = "long"  # anonymous socket: memory only, nothing read from or written to the database
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    with TestClient(app) as client:
+        with client.websocket_connect(f"/chat/ws/{client_id}") as ws:
+            for n in range(args.turns):
+                ws.send_text(f"Question {n}: what else can I put in my pancakes?")
+                ws.receive_text()
+    # Summary requests are in prompt_chars too; the last entry is the last summary or answer
+    return {
+        "first_prompt_chars": server.prompt_chars[0],
+        "last_prompt_chars": server.prompt_chars[-1],
+        "max_prompt_chars": max(server.prompt_chars),
+        "requests": len(server.prompt_chars),
+        "history_messages": len(chat.memory.history(client_id)),
+    }
+
+
+def many_sessions(args) -> dict:
+    now = [0.0]
+    memory = ConversationMemory(token_budget=args.budget, ttl=args.ttl, max_sessions=args.max_sessions,
+                                max_tokens=args.max_tokens, clock=lambda: now[0])
+    metrics.reset()
+    tracemalloc.start()
+    for n in range(args.sessions):
+        client_id = f"client-{n}"
+        for turn in range(args.session_turns):
+            memory.append(client_id, "user", f"Question {turn}: how do I make pancakes?")
+            memory.append(client_id, "assistant", DEFAULT_REPLY)
+        now[0] += args.step
+    held, peak = tracemalloc.get_traced_memory()
+    sessions_before_sweep, tokens_before_sweep = len(memory), memory.total_tokens
+    now[0] += args.ttl + 1
+    swept = memory.sweep()
+    tracemalloc.stop()
+    counters = metrics.snapshot()["counters"]
+    return {
+        "sessions": sessions_before_sweep,
+        "tokens": tokens_before_sweep,
+        "evicted_capacity": counters.get("chat.memory.evictions.capacity", 0),
+        "swept_idle": swept,
+        "sessions_after_sweep": len(memory),
+        "traced_mb": round(held / 2**20, 1),
+        "peak_mb": round(peak / 2**20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bounded chat memory")
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--budget", type=int, default=500, help="CHAT_HISTORY_TOKEN_BUDGET")
+    parser.add_argument("--summaries", action="store_true", help="Also run with rolling summaries")
+    parser.add_argument("--sessions", type=int, default=50000)
+    parser.add_argument("--session-turns", type=int, default=5)
+    parser.add_argument("--max-sessions", type=int, default=5000)
+    parser.add_argument("--max-tokens", type=int, default=2000000)
+    parser.add_argument("--ttl", type=float, default=1800)
+    parser.add_argument("--step", type=float, default=0.1, help="Fake seconds between clients")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {"config": vars(args).copy()}
+    summaries_enabled = chat.settings.CHAT_SUMMARY_ENABLED
+    server = FakeOpenAIServer(first_token_delay=0, token_delay=0).start()
+    chat_service.llm.base_url = server.base_url
+    try:
+        runs = [("unbounded", 10**9, False), ("windowed", args.budget, False)]
+        if args.summaries:
+            runs.append(("summaries", args.budget, True))
+        for mode, budget, summaries in runs:
+            result = report[mode] = long_conversation(args, server, budget, summaries)
+            print(f"{mode:<10} prompt chars first={result['first_prompt_chars']} last={result['last_prompt_chars']} "
+                  f"max={result['max_prompt_chars']}  {result['requests']} requests, "
+                  f"{result['history_messages']} messages kept")
+    finally:
+        server.stop()
+        chat.memory = conversation_memory.memory
+        chat.settings.CHAT_SUMMARY_ENABLED = summaries_enabled
+
+    result = report["sessions"] = many_sessions(args)
+    print(f"{args.sessions} clients: {result['sessions']} sessions / {result['tokens']} tokens held "
+          f"(cap {args.max_sessions} / {args.max_tokens}), {result['evicted_capacity']} evicted for capacity, "
+          f"{result['swept_idle']} swept idle; {result['traced_mb']}MB held, peak {result['peak_mb']}MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Time to first visible text for chat replies, streamed vs whole.
+
+Starts scripts/fake_openai_server.py in-process, points the chat service
+at it, and sends --turns messages over the chat WebSocket (in-process app)
+twice: with ?stream=1 (start/delta/end frames) and without (one message).
+Reports time to first text and time to the complete answer per mode, and
+checks the streamed deltas add up to the end frame and the history
+(the --turns questions and answers must fit CHAT_HISTORY_TOKEN_BUDGET).
+
+Usage:
+    python -m scripts.benchmark_chat_stream --turns 10 --first-token-delay 0.5 --token-delay 0.03
+"""
+import argparse
+import json
+import time
+from uuid import uuid4
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import chat
+from app.core.conversation_memory import memory
+from app.database import Base, engine
+from app.services import chat_service
+from scripts.benchmark_login import percentiles
+from scripts.fake_openai_server import FakeOpenAIServer
+
+
+def run_turns(client: TestClient, client_id: str, turns: int, stream: bool) -> dict:
+    first, complete, problems = [], [], []
+    path = f"/chat/ws/{client_id}" + ("?stream=1" if stream else "")
+    with client.websocket_connect(path) as ws:
+        for n in range(turns):
+            started = time.perf_counter()
+            ws.send_text(f"Question {n}: how do I make pancakes?")
+            if not stream:
+                answer = ws.receive_text()
+                first.append(time.perf_counter() - started)
+                complete.append(time.perf_counter() - started)
+                continue
+
+            deltas = []
+            start = json.loads(ws.receive_text())
+            if start["type"] != "start":
+                problems.append(f"expected start, got {start['type']}")
+            while True:
+                frame = json.loads(ws.receive_text())
+                if frame["type"] == "delta":
+                    if not deltas:
+                        first.append(time.perf_counter() - started)
+                    deltas.append(frame["content"])
+                    continue
+                complete.append(time.perf_counter() - started)
+                if frame["type"] != "end":
+                    problems.append(f"turn {n} ended with {frame}")
+                elif frame["content"] != "".join(deltas) or frame["id"] != start["id"]:
+                    problems.append(f"turn {n}: end frame doesn't match the deltas")
+                answer = frame.get("content")
+                break
+
+    history = memory.history(client_id)
+    if len(history) != 2 * turns or history[-1] != {"role": "assistant", "content": answer}:
+        problems.append("history doesn't hold every question and answer")
+    return {"first_text": percentiles(first), "complete": percentiles(complete), "problems": problems}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streamed vs whole chat replies")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--first-token-delay", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.03)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(first_token_delay=args.first_token_delay, token_delay=args.token_delay).start()
+    chat_service.llm.base_url = server.base_url
+
+    Base.metadata.create_all(bind=engine)  # chat_messages (history, hydration)
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    report = {"config": vars(args).copy()}
+    try:
+        with TestClient(app) as client:
+            for mode, stream in (("whole", False), ("stream", True)):
+                result = report[mode] = run_turns(client, f"bench-{mode}-{uuid4().hex[:8]}", args.turns, stream)
+                f, c = result["first_text"], result["complete"]
+                print(f"{mode:<6} first text p50={f['p50_ms']}ms p95={f['p95_ms']}ms   "
+                      f"complete p50={c['p50_ms']}ms p95={c['p95_ms']}ms   "
+                      f"{'; '.join(result['problems']) or 'ok'}")
+    finally:
+        server.stop()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Compare one-row-per-event notifications with the coalescer under a burst.
+
+Seeds --admins superusers in a throwaway SQLite database and replays
+--events "user_joined" events spread over --burst-seconds, with:
+
+    direct      crud_notification.create_notification per admin per event
+    coalesced   coalescer.add per event, flushed every second with a
+                --window second window, and a final flush like shutdown
+
+Reports the time spent by the caller per event, rows written to
+notifications and the unread count each admin ends up with.
+
+Usage:
+    python -m scripts.benchmark_coalescing --admins 20 --events 2000 --burst-seconds 10 --window 5
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.notification_coalescer import NotificationCoalescer
+from app.crud import crud_notification
+from app.database import Base
+from app.models.notification import Notification
+from app.models.user import User
+from app.schemas.notification import NotificationCreate
+from scripts.benchmark_login import percentiles
+from scripts.seed_data import make_engine
+
+
+def replay(args, record_event) -> list:
+    """Call record_event(n) --events times, paced over --burst-seconds; returns per-call seconds."""
+    samples = []
+    started = time.perf_counter()
+    for n in range(args.events):
+        due = started + args.burst_seconds * n / args.events
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        call_started = time.perf_counter()
+        record_event(n)
+        samples.append(time.perf_counter() - call_started)
+    return samples
+
+
+def run(args, mode: str) -> dict:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = make_engine(f"sqlite:///{path}")
+    try:
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(User), [
+                {"id": i, "email": f"admin{i}@example.com", "full_name": "Admin", "hashed_password": "x",
+                 "is_active": True, "is_superuser": True}
+                for i in range(1, args.admins + 1)
+            ])
+        SessionFactory = sessionmaker(bind=engine)
+        admin_ids = list(range(1, args.admins + 1))
+
+        started = time.perf_counter()
+        if mode == "direct":
+            with SessionFactory() as db:
+                def record_event(n):
+                    for admin_id in admin_ids:
+                        crud_notification.create_notification(db, NotificationCreate(
+                            recipient_id=admin_id, title="New user joined", message=f"User {n} has joined"))
+                samples = replay(args, record_event)
+        else:
+            coalescer = NotificationCoalescer(window_seconds=args.window, session_factory=SessionFactory)
+            coalescer.start()
+            samples = replay(args, lambda n: coalescer.add(admin_ids, "user_joined", actor=f"User {n}"))
+            coalescer.stop()
+        elapsed = time.perf_counter() - started
+
+        with SessionFactory() as db:
+            rows = db.execute(select(func.count()).select_from(Notification)).scalar_one()
+            unread = crud_notification.get_unread_count(db, admin_ids[0])
+            latest = db.execute(
+                select(Notification.title, Notification.message).where(Notification.recipient_id == admin_ids[0])
+                .order_by(Notification.id.desc()).limit(1)
+            ).first()
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "rows": rows,
+        "unread_per_admin": unread,
+        "latest": f"{latest.title}: {latest.message}" if latest else None,
+        "caller": percentiles(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark notification coalescing")
+    parser.add_argument("--admins", type=int, default=20)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--burst-seconds", type=float, default=10)
+    parser.add_argument("--window", type=float, default=5)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {"config": vars(args).copy()}
+    for mode in ("direct", "coalesced"):
+        result = report[mode] = run(args, mode)
+        caller = result["caller"]
+        print(f"{mode:<10} {result['rows']:>7} rows  {result['unread_per_admin']:>5} unread/admin  "
+              f"caller p50={caller['p50_ms']}ms p99={caller['p99_ms']}ms  ({result['elapsed_s']}s)")
+        print(f"           latest: {result['latest']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
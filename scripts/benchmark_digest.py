@@ -0,0 +1,102 @@
+"""
+Time a full notification digest run against the local SMTP stub.
+
+Seeds a throwaway SQLite database with --users users holding 1-8 unread
+notifications each, starts scripts/smtp_stub.py in-process (each new SMTP
+session costs --connect-delay seconds), then runs send_digests() and
+reports users/s and the per-batch timers.
+
+Usage:
+    python -m scripts.benchmark_digest --users 100000 --batch-size 500
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.email_utils import SMTPConnectionPool
+from app.core.metrics import metrics
+from app.database import Base
+from app.models.notification import Notification
+from app.models.user import User
+from app.services.notification_digest import send_digests
+from scripts.benchmark_email import point_settings_at
+from scripts.seed_data import make_engine
+from scripts.smtp_stub import StubSMTPServer
+
+
+def seed(engine, users: int, rng: random.Random):
+    now = datetime.utcnow()
+    chunk = 5000
+    with engine.begin() as conn:
+        for start in range(0, users, chunk):
+            ids = range(start + 1, min(users, start + chunk) + 1)
+            conn.execute(insert(User), [
+                {"id": i, "email": f"digest{i}@example.com", "full_name": f"User {i}",
+                 "hashed_password": "x", "is_active": True}
+                for i in ids
+            ])
+            conn.execute(insert(Notification), [
+                {"recipient_id": i, "title": "New recipe", "message": f"Recipe #{n} was added",
+                 "is_read": False, "type": "info", "created_at": now - timedelta(minutes=n)}
+                for i in ids for n in range(rng.randint(1, 8))
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the notification digest")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--connect-delay", type=float, default=0.1)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    stub = StubSMTPServer(connect_delay=args.connect_delay).start()
+    point_settings_at(stub)
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        engine = make_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        seed(engine, args.users, random.Random(7))
+
+        pool = SMTPConnectionPool(size=1, max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION)
+        metrics.reset()
+        started = time.perf_counter()
+        totals = send_digests(sessionmaker(bind=engine), pool=pool, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        pool.close()
+        engine.dispose()
+    finally:
+        os.remove(path)
+        stub.stop()
+
+    timers = metrics.snapshot()["timers"]
+    report = {
+        **totals,
+        "elapsed_s": round(elapsed, 2),
+        "users_per_s": round(totals["users"] / elapsed, 1),
+        "smtp_connections": stub.connections,
+        "timers": {name: timers[name] for name in ("digest.batch", "digest.render", "digest.smtp") if name in timers},
+    }
+    print(f"{totals['users']} users, {totals['sent']} emails in {report['elapsed_s']}s "
+          f"({report['users_per_s']} users/s, {stub.connections} SMTP sessions)")
+    for name, timer in report["timers"].items():
+        print(f"  {name:<14} p50={timer['p50_ms']}ms  p95={timer['p95_ms']}ms  max={timer['max_ms']}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
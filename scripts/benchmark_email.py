@@ -0,0 +1,146 @@
+"""
+Email delivery throughput: one SMTP connection per email vs the outbox.
+
+Starts scripts/smtp_stub.py in-process (each new session costs
+--connect-delay seconds, standing in for the TLS handshake and login) and a
+throwaway SQLite outbox, then measures:
+
+  direct  -> send_email() per message, like the request handlers used to
+  outbox  -> Mailer.enqueue() per message (what a request now waits for),
+             then how fast N workers drain the outbox over pooled sessions
+
+--fail-every N makes the stub answer every Nth message with a 451, to
+exercise retries (backoff is shortened for the benchmark).
+
+Usage:
+    python -m scripts.benchmark_email --emails 500 --workers 1 --workers 4 --connect-delay 0.1
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.email_utils import SMTPConnectionPool, send_email, otp_email
+from app.core.mailer import Mailer, SENT, FAILED
+from app.core.metrics import metrics
+from app.database import Base
+from scripts.benchmark_login import percentiles
+from scripts.seed_data import make_engine
+from scripts.smtp_stub import StubSMTPServer
+
+
+def point_settings_at(stub: StubSMTPServer):
+    settings.SMTP_HOST = "127.0.0.1"
+    settings.SMTP_PORT = stub.port
+    settings.SMTP_USE_SSL = False
+    settings.SMTP_STARTTLS = False
+    settings.SMTP_AUTH = False
+    settings.EMAIL_SENDER = settings.EMAIL_SENDER or "noreply@example.com"
+
+
+def run_direct(stub: StubSMTPServer, emails: int) -> dict:
+    connections = stub.connections
+    latencies = []
+    started = time.perf_counter()
+    for i in range(emails):
+        t = time.perf_counter()
+        send_email(f"user{i}@example.com", *otp_email("123456"))
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": "direct",
+        "emails": emails,
+        "emails_per_s": round(emails / elapsed, 1),
+        "request_wait": percentiles(latencies),
+        "smtp_connections": stub.connections - connections,
+    }
+
+
+def run_outbox(stub: StubSMTPServer, SessionFactory, emails: int, workers: int, timeout: float) -> dict:
+    pool = SMTPConnectionPool(size=workers, idle_seconds=settings.SMTP_IDLE_SECONDS,
+                              max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION)
+    mailer = Mailer(pool, workers=workers, batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE, poll_seconds=0.05,
+                    retry_base_seconds=0.05, session_factory=SessionFactory)
+    metrics.reset()
+
+    with SessionFactory() as db:
+        enqueue_latencies = []
+        for i in range(emails):
+            t = time.perf_counter()
+            mailer.enqueue(db, f"user{i}@example.com", *otp_email("123456"))
+            enqueue_latencies.append(time.perf_counter() - t)
+
+    connections = stub.connections
+    started = time.perf_counter()
+    mailer.start()
+    try:
+        while time.perf_counter() - started < timeout:
+            with SessionFactory() as db:
+                counts = mailer.counts(db)
+            if counts.get(SENT, 0) + counts.get(FAILED, 0) >= emails:
+                break
+            time.sleep(0.02)
+        elapsed = time.perf_counter() - started
+    finally:
+        mailer.stop()
+
+    counters = metrics.snapshot()["counters"]
+    return {
+        "mode": "outbox",
+        "workers": workers,
+        "emails": emails,
+        "emails_per_s": round(counts.get(SENT, 0) / elapsed, 1),
+        "status": counts,
+        "retried": counters.get("email.retried", 0),
+        "request_wait": percentiles(enqueue_latencies),
+        "smtp_connections": stub.connections - connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark email delivery")
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--direct-emails", type=int, default=50, help="Emails for the direct run (it is slow)")
+    parser.add_argument("--workers", type=int, action="append", help="Outbox workers to test (repeatable; default 1 and 4)")
+    parser.add_argument("--connect-delay", type=float, default=0.1, help="Simulated handshake + login seconds")
+    parser.add_argument("--fail-every", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    stub = StubSMTPServer(connect_delay=args.connect_delay, fail_every=args.fail_every).start()
+    point_settings_at(stub)
+    runs = []
+
+    result = run_direct(stub, args.direct_emails)
+    runs.append(result)
+    print(f"direct             {result['emails_per_s']:>8} emails/s  request waits p95={result['request_wait']['p95_ms']}ms  "
+          f"connections={result['smtp_connections']}")
+
+    for workers in args.workers or [1, 4]:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        try:
+            engine = make_engine(f"sqlite:///{path}")
+            Base.metadata.create_all(bind=engine)
+            result = run_outbox(stub, sessionmaker(bind=engine), args.emails, workers, args.timeout)
+            engine.dispose()
+        finally:
+            os.remove(path)
+        runs.append(result)
+        print(f"outbox workers={workers:<3} {result['emails_per_s']:>8} emails/s  request waits p95={result['request_wait']['p95_ms']}ms  "
+              f"connections={result['smtp_connections']}  retried={result['retried']}  status={result['status']}")
+
+    stub.stop()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"connect_delay_s": args.connect_delay, "runs": runs}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Measure login throughput under concurrency and its effect on other endpoints.
+
+Runs the real API in-process (httpx + ASGI transport) against a throwaway
+SQLite database. While a burst of concurrent logins is in flight, a probe
+keeps calling GET /api/v1/recipes/ so we can see whether bcrypt work starves
+unrelated requests. Each --workers value is one run:
+
+    0  -> bcrypt in the default thread pool (the "before" case)
+    N  -> bcrypt in N worker processes (PASSWORD_HASH_WORKERS)
+
+--failed-ratio sends that share of logins with a wrong password. A failed
+login should cost the same bcrypt time as a successful one; compare the
+hash_time timers between runs.
+
+Usage:
+    python -m scripts.benchmark_login --workers 0 --workers 2 --workers 4 --logins 200 --concurrency 50
+    python -m scripts.benchmark_login --workers 2 --failed-ratio 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.api import api_router
+from app.core import password_hashing
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.security import get_password_hash
+from app.database import Base, get_db
+from app.models.user import User
+from scripts.seed_data import make_engine, SEED_PASSWORD
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+    return {"count": len(ordered), "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99),
+            "max_ms": round(ordered[-1] * 1000, 2)}
+
+
+def build_app(database_url: str, users: int) -> FastAPI:
+    engine = make_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(bind=engine)
+
+    # One hash shared by every user; hashing N times would dominate setup
+    hashed_password = get_password_hash(SEED_PASSWORD)
+    with SessionFactory() as db:
+        db.add_all([
+            User(email=f"bench{i}@example.com", full_name=f"Bench {i}",
+                 hashed_password=hashed_password, is_active=True, is_email_verified=True)
+            for i in range(users)
+        ])
+        db.commit()
+
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api/v1")
+
+    def override_get_db():
+        db = SessionFactory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+async def run_scenario(app: FastAPI, workers: int, users: int, logins: int, concurrency: int,
+                       failed_ratio: float = 0.0):
+    settings.PASSWORD_HASH_WORKERS = workers
+    password_hashing.shutdown()
+    password_hashing.warm_up()
+    metrics.reset()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Token for the probe, and make sure the worker processes are up
+        response = await client.post("/api/v1/auth/login",
+                                     json={"email": "bench0@example.com", "password": SEED_PASSWORD})
+        response.raise_for_status()
+        probe_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        login_latencies, probe_latencies = [], []
+        statuses = {}
+        semaphore = asyncio.Semaphore(concurrency)
+        done = asyncio.Event()
+
+        rng = random.Random(42)
+        passwords = [SEED_PASSWORD if rng.random() >= failed_ratio else "wrong-password" for _ in range(logins)]
+
+        async def one_login(i):
+            async with semaphore:
+                started = time.perf_counter()
+                r = await client.post("/api/v1/auth/login",
+                                      json={"email": f"bench{i % users}@example.com", "password": passwords[i]})
+                login_latencies.append(time.perf_counter() - started)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/api/v1/recipes/?limit=10", headers=probe_headers)
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.02)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(one_login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return {
+        "workers": workers,
+        "logins": logins,
+        "concurrency": concurrency,
+        "failed_ratio": failed_ratio,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(logins / elapsed, 1),
+        "status_codes": statuses,
+        "login": percentiles(login_latencies),
+        "probe": percentiles(probe_latencies),
+        "hash_metrics": metrics.snapshot()["timers"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent logins")
+    parser.add_argument("--workers", type=int, action="append",
+                        help="PASSWORD_HASH_WORKERS to test (repeat to compare; default: 0 and 2)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--failed-ratio", type=float, default=0.0, help="Share of logins with a wrong password")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        app = build_app(f"sqlite:///{path}", args.users)
+        runs = []
+        for workers in args.workers or [0, 2]:
+            result = asyncio.run(run_scenario(app, workers, args.users, args.logins, args.concurrency, args.failed_ratio))
+            runs.append(result)
+            print(f"workers={workers:<2} {result['logins_per_s']:>7} logins/s  "
+                  f"login p95={result['login']['p95_ms']}ms  probe p95={result['probe'].get('p95_ms')}ms  "
+                  f"status={result['status_codes']}")
+    finally:
+        password_hashing.shutdown()
+        os.remove(path)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"runs": runs}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Microbenchmark of the rate limiter overhead.
+
+Measures, per request:
+  - the in-memory backend (token bucket and sliding window) called directly,
+    single-threaded and with several threads hammering it at once;
+  - RateLimitMiddleware end to end around a no-op ASGI app, for a path with
+    no policy, an IP-only check and an IP + email check (body parsed).
+
+Usage:
+    python -m scripts.benchmark_rate_limit --iterations 200000 --threads 8
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from app.core.rate_limit import (
+    MemoryRateLimitBackend, Policy, RateLimiter, RateLimitMiddleware,
+    SLIDING_WINDOW,
+)
+
+
+def per_call_us(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def threaded_us(fn, iterations: int, threads: int) -> float:
+    per_thread = iterations // threads
+
+    def worker(offset):
+        for i in range(per_thread):
+            fn(offset + i)
+
+    workers = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - started) / (per_thread * threads) * 1e6
+
+
+async def middleware_us(middleware, scope, body: bytes, iterations: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await middleware(scope, receive, send)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rate limiter overhead")
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--keys", type=int, default=5000, help="Distinct clients")
+    args = parser.parse_args()
+
+    # High limits: we measure bookkeeping, not rejections
+    bucket = Policy("bench:bucket", 10**9, 60)
+    window = Policy("bench:window", 10**9, 60, algorithm=SLIDING_WINDOW)
+    backend = MemoryRateLimitBackend()
+    now = time.time
+
+    for policy in (bucket, window):
+        single = per_call_us(lambda i: backend.hit(f"{policy.name}:{i % args.keys}", policy, now()), args.iterations)
+        contended = threaded_us(lambda i: backend.hit(f"{policy.name}:{i % args.keys}", policy, now()),
+                                args.iterations, args.threads)
+        print(f"{policy.algorithm:<15} {single:6.2f} us/check   {contended:6.2f} us/check with {args.threads} threads")
+
+    async def app(scope, receive, send):
+        pass
+
+    limiter = RateLimiter(backend, {
+        "/ip-only": [Policy("bench:ip", 10**9, 60)],
+        "/ip-email": [Policy("bench:ip", 10**9, 60), Policy("bench:email", 10**9, 60, key="email")],
+    })
+    middleware = RateLimitMiddleware(app, limiter)
+    body = json.dumps({"email": "user@example.com", "password": "secret"}).encode()
+    headers = [(b"content-type", b"application/json")]
+
+    def scope(path):
+        return {"type": "http", "method": "POST", "path": path, "headers": headers, "client": ("10.0.0.1", 1234)}
+
+    iterations = args.iterations // 10
+    baseline = asyncio.run(middleware_us(app, scope("/other"), body, iterations))
+    for path in ("/other", "/ip-only", "/ip-email"):
+        total = asyncio.run(middleware_us(middleware, scope(path), body, iterations))
+        print(f"middleware {path:<10} {total - baseline:6.2f} us/request overhead")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Inbox query times before and after a retention run, and how long writers
+wait while it runs.
+
+Seeds --users x --per-user notifications (a third unread, one a minute per
+user) like scripts/explain_notifications.py, then archives read rows older
+than --keep-minutes while a writer thread inserts notifications and times
+each insert. Reports rows moved/s, the per-batch timer, writer latency
+percentiles and the inbox query medians before and after (plus after
+compaction).
+
+Usage:
+    python -m scripts.benchmark_retention --users 2000 --per-user 500 --keep-minutes 60
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.database import Base
+from app.models.notification import Notification
+from app.services.notification_retention import apply_retention, compact
+from scripts.benchmark_login import percentiles
+from scripts.explain_notifications import QUERIES, median_ms, seed
+from scripts.seed_data import make_engine
+
+
+def query_times(engine, uid: int, iterations: int) -> dict:
+    with engine.connect() as conn:
+        return {name: round(median_ms(conn, sql, {"uid": uid}, iterations), 3) for name, sql in QUERIES.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark notification retention")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--per-user", type=int, default=500)
+    parser.add_argument("--keep-minutes", type=int, default=60, help="Read rows older than this are archived")
+    parser.add_argument("--mode", choices=("archive", "delete"), default="archive")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=settings.NOTIFICATION_RETENTION_PAUSE_SECONDS)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = make_engine(f"sqlite:///{path}")
+    try:
+        Base.metadata.create_all(bind=engine)
+        seed(engine, args.users, args.per_user)
+        before = query_times(engine, args.user_id, args.iterations)
+
+        writes = []
+        stop = threading.Event()
+
+        def writer():
+            uid = 0
+            while not stop.is_set():
+                uid = uid % args.users + 1
+                started = time.perf_counter()
+                with engine.begin() as conn:
+                    conn.execute(insert(Notification), {"recipient_id": uid, "title": "t", "message": "m",
+                                                        "is_read": False, "type": "info",
+                                                        "created_at": datetime.utcnow()})
+                writes.append(time.perf_counter() - started)
+                time.sleep(0.002)
+
+        thread = threading.Thread(target=writer, daemon=True)
+        thread.start()
+        metrics.reset()
+        cutoff = datetime.utcnow() - timedelta(minutes=args.keep_minutes)
+        result = apply_retention(sessionmaker(bind=engine), cutoff=cutoff, mode=args.mode,
+                                 batch_size=args.batch_size, pause_seconds=args.pause, max_seconds=3600)
+        stop.set()
+        thread.join()
+
+        after = query_times(engine, args.user_id, args.iterations)
+        compact(engine)
+        compacted = query_times(engine, args.user_id, args.iterations)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+    report = {
+        **result,
+        "rows_per_s": round(result["moved"] / result["elapsed_s"], 1) if result["elapsed_s"] else None,
+        "batch_timer": metrics.snapshot()["timers"].get("notifications.retention.batch", {}),
+        "writer_latency": percentiles(writes),
+        "query_ms": {"before": before, "after": after, "after_compact": compacted},
+    }
+    print(f"{result['mode']}: {result['moved']} rows in {result['elapsed_s']}s ({report['rows_per_s']}/s, "
+          f"{result['batches']} batches)")
+    timer = report["batch_timer"]
+    if timer:
+        print(f"  batch  p50={timer['p50_ms']}ms  p95={timer['p95_ms']}ms  max={timer['max_ms']}ms")
+    w = report["writer_latency"]
+    print(f"  writer inserts={w['count']}  p50={w['p50_ms']}ms  p95={w['p95_ms']}ms  p99={w['p99_ms']}ms")
+    for name in QUERIES:
+        print(f"  {name:<16} {before[name]:8.3f} -> {after[name]:8.3f} -> {compacted[name]:8.3f} ms (compacted)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
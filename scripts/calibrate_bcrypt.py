@@ -0,0 +1,77 @@
+"""
+Pick BCRYPT_ROUNDS for the hardware this runs on.
+
+Times one bcrypt hash at each cost in the range and recommends the highest
+cost whose median stays within --target-ms. Run it on (or next to) the
+production machines: the right value depends on their CPUs.
+
+Also reports the CPU cost of a successful vs. a failed verification at the
+recommended cost; the two should be the same (a wrong password must not be
+more expensive to reject than a right one is to accept).
+
+Usage:
+    python -m scripts.calibrate_bcrypt --target-ms 250
+    python -m scripts.calibrate_bcrypt --target-ms 100 --min-rounds 10 --max-rounds 14 --samples 5
+"""
+import argparse
+import statistics
+import time
+
+from passlib.context import CryptContext
+
+PASSWORD = "correct horse battery staple"
+
+
+def time_hash(context: CryptContext, samples: int) -> float:
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash(PASSWORD)
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def cpu_per_verify(context: CryptContext, hashed: str, password: str, samples: int) -> float:
+    started = time.process_time()
+    for _ in range(samples):
+        context.verify_and_update(password, hashed)
+    return (time.process_time() - started) / samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the bcrypt work factor")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Upper bound for one hash, in ms")
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=15)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6}  {'median ms':>10}")
+    chosen = None
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        median_ms = time_hash(context, args.samples) * 1000
+        print(f"{rounds:>6}  {median_ms:>10.1f}")
+        if median_ms > args.target_ms:
+            break
+        chosen = rounds
+
+    if chosen is None:
+        print(f"\nEven {args.min_rounds} rounds take longer than {args.target_ms} ms here; using --min-rounds.")
+        chosen = args.min_rounds
+
+    # Same policy as app.core.security: exactly `chosen` rounds
+    context = CryptContext(
+        schemes=["bcrypt"], bcrypt__rounds=chosen,
+        bcrypt__min_rounds=chosen, bcrypt__max_rounds=chosen,
+    )
+    hashed = context.hash(PASSWORD)
+    ok_ms = cpu_per_verify(context, hashed, PASSWORD, args.samples) * 1000
+    failed_ms = cpu_per_verify(context, hashed, "wrong password", args.samples) * 1000
+
+    print(f"\nCPU per verification at {chosen} rounds: success {ok_ms:.1f} ms, failure {failed_ms:.1f} ms")
+    print(f"\nRecommended: BCRYPT_ROUNDS={chosen}")
+
+
+if __name__ == "__main__":
+    main()
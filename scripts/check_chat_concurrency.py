@@ -0,0 +1,104 @@
+"""
+Check that chat completions don't block the event loop, and that the
+concurrency cap holds.
+
+Starts scripts/fake_openai_server.py in-process with a slow model and the
+chat router in-process (one event loop, like one uvicorn worker):
+
+1. One chat message whose completion takes --slow-seconds; meanwhile
+   GET /chat/history/probe is requested in a loop. Its latency must stay
+   under --max-probe-ms (a blocking client would hold every probe for the
+   whole completion).
+2. --sessions chat sockets send a message at once with
+   OPENAI_MAX_CONCURRENCY = --max-concurrency: the fake server must never
+   see more than that many completions at once; llm.queue_wait shows the
+   queueing.
+
+Exits non-zero if either check fails.
+
+Usage:
+    python -m scripts.check_chat_concurrency --slow-seconds 3 --sessions 12 --max-concurrency 4
+"""
+import argparse
+import sys
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import chat
+from app.core.metrics import metrics
+from app.database import Base, engine
+from app.services import chat_service
+from scripts.benchmark_login import percentiles
+from scripts.fake_openai_server import FakeOpenAIServer
+
+
+def ask(client: TestClient, client_id: str, answers: list):
+    with client.websocket_connect(f"/chat/ws/{client_id}") as ws:
+        ws.send_text("How do I make pancakes?")
+        answers.append(ws.receive_text())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the chat service keeps the event loop free")
+    parser.add_argument("--slow-seconds", type=float, default=3)
+    parser.add_argument("--max-probe-ms", type=float, default=250)
+    parser.add_argument("--sessions", type=int, default=12)
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(first_token_delay=args.slow_seconds, token_delay=0).start()
+    chat_service.llm.base_url = server.base_url
+    chat_service.llm.max_concurrency = args.max_concurrency
+    chat_service.llm.queue_timeout = args.slow_seconds * (args.sessions // args.max_concurrency + 2)
+
+    Base.metadata.create_all(bind=engine)  # chat_messages (history, hydration)
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    failed = False
+    try:
+        with TestClient(app) as client:
+            # 1. Probes while one slow completion is outstanding
+            answers = []
+            slow = threading.Thread(target=ask, args=(client, "slow", answers))
+            started = time.perf_counter()
+            slow.start()
+            probes = []
+            while slow.is_alive():
+                probe_started = time.perf_counter()
+                client.get("/chat/history/probe")
+                probes.append(time.perf_counter() - probe_started)
+                time.sleep(0.01)
+            slow.join()
+            stats = percentiles(probes)
+            ok = bool(answers) and stats["count"] > 1 and stats["max_ms"] <= args.max_probe_ms
+            failed |= not ok
+            print(f"slow completion {time.perf_counter() - started:.2f}s; {stats['count']} probes meanwhile "
+                  f"p50={stats['p50_ms']}ms max={stats['max_ms']}ms: {'ok' if ok else 'FAILED'}")
+
+            # 2. A burst above the cap
+            metrics.reset()
+            answers = []
+            threads = [threading.Thread(target=ask, args=(client, f"burst-{i}", answers)) for i in range(args.sessions)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            wait = metrics.snapshot()["timers"].get("llm.queue_wait", {})
+            ok = len(answers) == args.sessions and server.max_in_flight <= args.max_concurrency
+            failed |= not ok
+            print(f"{args.sessions} sessions in {elapsed:.2f}s, at most {server.max_in_flight} completions upstream "
+                  f"(cap {args.max_concurrency}), queue_wait p50={wait.get('p50_ms')}ms max={wait.get('max_ms')}ms: "
+                  f"{'ok' if ok else 'FAILED'}")
+    finally:
+        server.stop()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
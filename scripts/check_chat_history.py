@@ -0,0 +1,185 @@
+"""
+Check the persistent chat history: write-behind batches, keyset pages and
+hydration on reconnect. Uses a throwaway SQLite database, the chat router
+in-process and scripts/fake_openai_server.py in-process.
+
+1. --turns messages over one signed-in chat socket. Right away (before any
+   flush) GET /chat/history must already show them (queued, id null); after
+   the flush, walking the pages back with next_cursor (--page-size) must give
+   every message exactly once, in order. The history needs the owner's
+   token: none is a 401, another user's shows nothing.
+2. "Restart": a fresh in-memory window (as on another worker), reconnect
+   and send one more message; the prompt the model gets must carry the
+   earlier turns (hydrated from chat_messages). Same when the session is
+   dropped from memory while the socket stays open. An anonymous socket on
+   the same client_id sees none of it, and its turns aren't stored.
+3. Cost to the chat turn: --messages appends through the write-behind
+   queue vs one INSERT + commit per message.
+
+Exits non-zero if a check fails.
+
+Usage:
+    python -m scripts.check_chat_history --turns 30 --page-size 7 --messages 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints import chat
+from app.core import security
+from app.core.chat_store import ChatStore
+from app.core.conversation_memory import ConversationMemory
+from app.crud import crud_chat
+from app.database import Base, get_db
+from app.models.user import User
+from app.services import chat_service
+from scripts.benchmark_login import percentiles
+from scripts.fake_openai_server import FakeOpenAIServer
+from scripts.seed_data import make_engine
+
+
+def walk_history(client: TestClient, client_id: str, page_size: int, headers: dict) -> list:
+    pages, cursor = [], None
+    while True:
+        params = {"limit": page_size} | ({"cursor": cursor} if cursor else {})
+        body = client.get(f"/chat/history/{client_id}", params=params, headers=headers).json()
+        pages.insert(0, body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return [message for page in pages for message in page]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check persistent chat history")
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--page-size", type=int, default=7)
+    parser.add_argument("--messages", type=int, default=5000)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": f"chat{i}@example.com", "full_name": "Chat", "hashed_password": "x", "is_active": True}
+            for i in (1, 2)
+        ])
+    token = security.create_access_token(1)
+    auth = {"Authorization": f"Bearer {token}"}
+    other = {"Authorization": f"Bearer {security.create_access_token(2)}"}
+    socket = f"/chat/ws/kid?token={token}"
+
+    def override_get_db():
+        with SessionFactory() as db:
+            yield db
+
+    server = FakeOpenAIServer(first_token_delay=0, token_delay=0).start()
+    chat_service.llm.base_url = server.base_url
+    store = ChatStore(flush_seconds=3600, session_factory=SessionFactory)  # flushed by hand below
+    saved = chat.chat_store, chat.memory
+    chat.chat_store, chat.memory = store, ConversationMemory()
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    app.dependency_overrides[get_db] = override_get_db
+    failed = False
+
+    def check(ok: bool, label: str):
+        nonlocal failed
+        failed |= not ok
+        print(f"{label}: {'ok' if ok else 'FAILED'}")
+
+    try:
+        with TestClient(app) as client:
+            # 1. Queued messages show up at once; pages cover everything once, in order
+            sent = []
+            with client.websocket_connect(socket) as ws:
+                for n in range(args.turns):
+                    question = f"Question {n}: can I add blueberries?"
+                    ws.send_text(question)
+                    sent += [question, ws.receive_text()]
+            queued = client.get("/chat/history/kid", headers=auth).json()["items"]
+            check([m["content"] for m in queued] == sent and all(m["id"] is None for m in queued),
+                  f"{len(queued)} messages visible before the flush")
+            written = store.flush()
+            history = walk_history(client, "kid", args.page_size, auth)
+            ids = [m["id"] for m in history]
+            check([m["content"] for m in history] == sent and ids == sorted(set(ids)),
+                  f"{written} rows in one flush, {len(history)} messages over pages of {args.page_size}")
+            check(client.get("/chat/history/kid", params={"cursor": "not-a-cursor"}, headers=auth).status_code == 400,
+                  "bad cursor is a 400")
+            check(client.get("/chat/history/kid").status_code == 401
+                  and client.get("/chat/history/kid", headers=other).json()["items"] == [],
+                  "history needs the owner's token")
+
+            # 2. A fresh worker hydrates the window from chat_messages
+            chat.memory = ConversationMemory()
+            server.prompt_chars.clear()
+            with client.websocket_connect(socket) as ws:
+                ws.send_text("And what about strawberries?")
+                ws.receive_text()
+            window = chat.memory.history("1/kid")
+            check(len(window) > 2 and window[0]["content"] in sent and server.prompt_chars[0] > 100,
+                  f"reconnect hydrated {len(window) - 2} earlier turns, prompt {server.prompt_chars[0]} chars")
+            store.flush()
+
+            # ... and so does a session dropped (idle / capacity) while its socket stays open
+            server.prompt_chars.clear()
+            with client.websocket_connect(socket) as ws:
+                ws.send_text("Do I need butter?")
+                ws.receive_text()
+                chat.memory.forget("1/kid")
+                ws.send_text("How much?")
+                ws.receive_text()
+            check(server.prompt_chars[-1] > 100 and len(chat.memory.history("1/kid")) > 2,
+                  f"dropped session reloaded on the next turn, prompt {server.prompt_chars[-1]} chars")
+            store.flush()
+
+            # An anonymous socket on the same client_id starts empty and isn't stored
+            with client.websocket_connect("/chat/ws/kid") as ws:
+                ws.send_text("Who are you?")
+                ws.receive_text()
+            window = chat.memory.history("kid")
+            check(len(window) == 2 and not store.pending(1, "kid") and store.flush() == 0,
+                  f"anonymous chat on the same client_id: {len(window)} turns in its window, nothing stored")
+    finally:
+        server.stop()
+        chat.chat_store, chat.memory = saved
+
+    # 3. Cost per message to the chat turn
+    queued_samples = []
+    for n in range(args.messages):
+        started = time.perf_counter()
+        store.add(1, f"bench-{n % 50}", "user", "How long do pancakes cook?")
+        queued_samples.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    store.flush()
+    flush_s = time.perf_counter() - started
+
+    direct_samples = []
+    with SessionFactory() as db:
+        for n in range(args.messages):
+            started = time.perf_counter()
+            crud_chat.add_messages(db, [{"user_id": 1, "client_id": f"direct-{n % 50}", "role": "user",
+                                         "content": "How long do pancakes cook?"}])
+            direct_samples.append(time.perf_counter() - started)
+    engine.dispose()
+    os.remove(path)
+
+    q, d = percentiles(queued_samples), percentiles(direct_samples)
+    print(f"write-behind add p50={q['p50_ms']}ms p99={q['p99_ms']}ms, {args.messages} rows flushed in {flush_s:.2f}s")
+    print(f"direct INSERT  p50={d['p50_ms']}ms p99={d['p99_ms']}ms per message")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
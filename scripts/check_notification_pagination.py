@@ -0,0 +1,141 @@
+"""
+Check that cursor pagination of the notification inbox stays stable while
+new notifications arrive.
+
+Seeds one user with --notifications rows (every --tie-every consecutive
+rows share a created_at, like broadcasts do) in a throwaway SQLite
+database. Then, for both modes, it scrolls the whole inbox --page-size at
+a time while a writer thread inserts new notifications for that user:
+
+    cursor   get_notifications(cursor=next_cursor)   must see every seeded row once, in order
+    offset   get_notifications(skip=n)               shown for comparison (duplicates expected)
+
+Exits non-zero if cursor paging returns a duplicate, skips a seeded row, or
+breaks the (created_at, id) DESC order.
+
+Usage:
+    python -m scripts.check_notification_pagination --notifications 5000 --page-size 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import crud_notification
+from app.database import Base
+from app.models.notification import Notification
+from app.models.user import User
+from app.schemas.notification import NotificationCreate
+from scripts.seed_data import make_engine
+
+USER_ID = 1
+
+
+def seed(engine, count: int, tie_every: int) -> set:
+    start = datetime.utcnow() - timedelta(days=1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), {"id": USER_ID, "email": "scroll@example.com", "full_name": "Scroll",
+                                    "hashed_password": "x", "is_active": True})
+        conn.execute(insert(Notification), [
+            {"recipient_id": USER_ID, "title": "t", "message": str(n), "is_read": n % 3 == 0, "type": "info",
+             "created_at": start + timedelta(seconds=n // tie_every)}
+            for n in range(count)
+        ])
+    return set(range(1, count + 1))
+
+
+def scroll(SessionFactory, mode: str, page_size: int, filter_type: str) -> list:
+    seen = []
+    cursor, skip = None, 0
+    while True:
+        with SessionFactory() as db:
+            items, _, next_cursor = crud_notification.get_notifications(
+                db, USER_ID, skip=skip, limit=page_size, filter_type=filter_type,
+                cursor=cursor, include_total=False,
+            )
+        seen.extend((item.created_at, item.id) for item in items)
+        if mode == "cursor":
+            if next_cursor is None:
+                return seen
+            cursor = next_cursor
+        else:
+            if len(items) < page_size:
+                return seen
+            skip += page_size
+        time.sleep(0.001)  # give the writer a chance between pages
+
+
+def check(seen: list, expected: set) -> list:
+    problems = []
+    ids = [notification_id for _, notification_id in seen]
+    duplicates = len(ids) - len(set(ids))
+    if duplicates:
+        problems.append(f"{duplicates} duplicates")
+    missing = expected - set(ids)
+    if missing:
+        problems.append(f"{len(missing)} seeded rows never shown")
+    if any(a <= b for a, b in zip(seen, seen[1:])):
+        problems.append("not in (created_at, id) DESC order")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check notification cursor pagination under concurrent inserts")
+    parser.add_argument("--notifications", type=int, default=5000)
+    parser.add_argument("--tie-every", type=int, default=7, help="Rows sharing one created_at")
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = make_engine(f"sqlite:///{path}")
+    failed = False
+    try:
+        Base.metadata.create_all(bind=engine)
+        seeded = seed(engine, args.notifications, args.tie_every)
+        unread = {i for i in seeded if (i - 1) % 3 != 0}
+        SessionFactory = sessionmaker(bind=engine)
+
+        for filter_type, expected in (("all", seeded), ("unread", unread)):
+            for mode in ("cursor", "offset"):
+                stop = threading.Event()
+                inserted = []
+
+                def writer():
+                    with SessionFactory() as db:
+                        while not stop.is_set():
+                            crud_notification.create_notification(
+                                db, NotificationCreate(recipient_id=USER_ID, title="new", message="arrived"))
+                            inserted.append(1)
+                            time.sleep(0.002)
+
+                thread = threading.Thread(target=writer, daemon=True)
+                thread.start()
+                try:
+                    seen = scroll(SessionFactory, mode, args.page_size, filter_type)
+                finally:
+                    stop.set()
+                    thread.join()
+
+                # Rows inserted during the scroll are newer than the first page: only seeded ones count
+                seen = [row for row in seen if row[1] in seeded]
+                problems = check(seen, expected)
+                status = "ok" if not problems else ", ".join(problems)
+                print(f"{filter_type:<6} {mode:<6} {len(seen)} rows, {len(inserted)} inserted meanwhile: {status}")
+                if mode == "cursor" and problems:
+                    failed = True
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+A minimal OpenAI-compatible server for development and benchmarks.
+
+Serves POST /v1/chat/completions (whole answers, or SSE chunks with
+"stream": true) and POST /v1/audio/transcriptions with canned content,
+paced like a real model: --first-token-delay before the first token, then
+--token-delay per token. --fail-every N answers every Nth request with 503.
+
+Run standalone and point the app at it:
+
+    python -m scripts.fake_openai_server --port 8100 --first-token-delay 0.5 --token-delay 0.03
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+
+or start FakeOpenAIServer in-process (see scripts/benchmark_chat_stream.py).
+"""
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_REPLY = (
+    "Let's make pancakes! First, ask a grown-up to help you crack two eggs into a big bowl. "
+    "Then whisk in a cup of milk and a cup of flour until it's smooth. Yummy!"
+)
+
+
+def tokens(text: str):
+    words = text.split(" ")
+    return [word + " " for word in words[:-1]] + words[-1:]
+
+
+def build_app(server: "FakeOpenAIServer") -> FastAPI:
+    app = FastAPI()
+
+    def failed() -> bool:
+        with server.lock:
+            server.requests += 1
+            return bool(server.fail_every) and server.requests % server.fail_every == 0
+
+    @asynccontextmanager
+    async def tracked():
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            yield
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def unavailable():
+        return JSONResponse(status_code=503, content={"error": {"message": "Fake overload", "type": "server_error"}})
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if failed():
+            return unavailable()
+        with server.lock:
+            server.prompt_chars.append(sum(len(m.get("content") or "") for m in body.get("messages", [])))
+        model = body.get("model", "gpt-4")
+        parts = tokens(server.reply)
+        created = int(time.time())
+
+        if not body.get("stream"):
+            async with tracked():
+                await asyncio.sleep(server.first_token_delay + server.token_delay * len(parts))
+            return {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": server.reply},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(parts), "total_tokens": len(parts)},
+            }
+
+        def chunk(delta: dict, finish_reason=None) -> str:
+            payload = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": model,
+                       "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            async with tracked():
+                await asyncio.sleep(server.first_token_delay)
+                yield chunk({"role": "assistant", "content": ""})
+                for part in parts:
+                    yield chunk({"content": part})
+                    await asyncio.sleep(server.token_delay)
+                yield chunk({}, "stop")
+                yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        await request.body()
+        if failed():
+            return unavailable()
+        await asyncio.sleep(server.first_token_delay)
+        return {"text": server.transcript}
+
+    return app
+
+
+class FakeOpenAIServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, first_token_delay: float = 0.5,
+                 token_delay: float = 0.03, fail_every: int = 0, reply: str = DEFAULT_REPLY,
+                 transcript: str = "How do I make pancakes?"):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.fail_every = fail_every
+        self.reply = reply
+        self.transcript = transcript
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0   # most completions running at once
+        self.prompt_chars = []   # message characters per completion request
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self.host = host
+        self._server = uvicorn.Server(uvicorn.Config(build_app(self), log_level="warning", lifespan="off"))
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._socket.getsockname()[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [self._socket]},
+                                        name="fake-openai", daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join()
+        self._socket.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--first-token-delay", type=float, default=0.5, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="Seconds between tokens")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth request with 503")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.host, args.port, args.first_token_delay, args.token_delay, args.fail_every)
+    print(f"Fake OpenAI listening on {server.base_url} (Ctrl+C to stop)")
+    server._server.run(sockets=[server._socket])
+    print(f"{server.requests} requests served")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Load test of the auth path: login, token refresh and token-protected reads.
+
+Each of --concurrency virtual users logs in once (not measured), then loops
+picking an operation by --mix weight until --duration seconds pass or
+--requests requests were made:
+
+    login    POST /api/v1/auth/login           (bcrypt verify)
+    refresh  POST /api/v1/auth/refresh         (rotates this user's refresh token)
+    read     GET  --read-path with the bearer  (JWT + revocation + principal)
+
+Targets:
+  - in-process (default): the API router on a throwaway SQLite database,
+    driven through httpx's ASGI transport; users are seeded automatically.
+    Rate limiting is not mounted, so logins aren't throttled.
+  - --url http://127.0.0.1:8000: a running uvicorn. Start it with
+    RATE_LIMIT_ENABLED=false and seed its database first with --seed
+    (uses --database-url, default DATABASE_URL).
+
+The JSON report (--output) holds per-operation p50/p95/p99, throughput and
+status codes; --compare prints p95 and throughput deltas against an older report.
+
+Usage:
+    python -m scripts.loadtest_auth --concurrency 50 --duration 20 --mix login=1,refresh=2,read=7 --output auth.json
+    python -m scripts.loadtest_auth --compare auth.json
+    python -m scripts.loadtest_auth --url http://127.0.0.1:8000 --seed --users 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.api import api_router
+from app.core import password_hashing
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.database import Base, get_db
+from app.models.user import User
+from scripts.benchmark_analytics import git_revision
+from scripts.benchmark_login import percentiles
+from scripts.seed_data import make_engine, SEED_PASSWORD
+
+OPERATIONS = ("login", "refresh", "read")
+EMAIL_FORMAT = "loadtest{}@example.com"
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation in --mix: {name!r} (expected {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def seed_users(SessionFactory, users: int) -> int:
+    """Create the load-test users that don't exist yet; returns how many were added."""
+    hashed_password = get_password_hash(SEED_PASSWORD)
+    emails = [EMAIL_FORMAT.format(i) for i in range(users)]
+    with SessionFactory() as db:
+        existing = set(db.execute(select(User.email).where(User.email.in_(emails))).scalars())
+        db.add_all([
+            User(email=email, full_name="Load Test", hashed_password=hashed_password,
+                 is_active=True, is_email_verified=True)
+            for email in emails if email not in existing
+        ])
+        db.commit()
+    return len(emails) - len(existing)
+
+
+def build_app(SessionFactory) -> FastAPI:
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api/v1")
+
+    def override_get_db():
+        db = SessionFactory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, email: str, read_path: str):
+        self.client = client
+        self.email = email
+        self.read_path = read_path
+        self.access_token = None
+        self.refresh_token = None
+
+    def _store(self, response: httpx.Response):
+        if response.status_code == 200:
+            data = response.json()
+            self.access_token = data["access_token"]
+            self.refresh_token = data.get("refresh_token") or self.refresh_token
+
+    async def login(self) -> httpx.Response:
+        response = await self.client.post("/api/v1/auth/login", json={"email": self.email, "password": SEED_PASSWORD})
+        self._store(response)
+        return response
+
+    async def refresh(self) -> httpx.Response:
+        response = await self.client.post("/api/v1/auth/refresh", json={"refresh_token": self.refresh_token})
+        self._store(response)
+        return response
+
+    async def read(self) -> httpx.Response:
+        return await self.client.get(self.read_path, headers={"Authorization": f"Bearer {self.access_token}"})
+
+
+async def run_load(client: httpx.AsyncClient, args, mix: dict) -> dict:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = {name: [] for name in names}
+    statuses = {name: {} for name in names}
+    errors = {name: 0 for name in names}
+    budget = {"left": args.requests or float("inf")}
+
+    vusers = [VirtualUser(client, EMAIL_FORMAT.format(i % args.users), args.read_path) for i in range(args.concurrency)]
+    # Unmeasured first login for everyone (also warms up the hashing pool)
+    logins = await asyncio.gather(*(vu.login() for vu in vusers))
+    failed = [r.status_code for r in logins if r.status_code != 200]
+    if failed:
+        raise SystemExit(f"{len(failed)} warm-up logins failed (status {failed[0]}); are the users seeded?")
+
+    deadline = time.perf_counter() + args.duration
+
+    async def drive(vu: VirtualUser, rng: random.Random):
+        while time.perf_counter() < deadline and budget["left"] > 0:
+            budget["left"] -= 1
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await getattr(vu, name)()
+                code = response.status_code
+            except httpx.HTTPError as e:
+                code = type(e).__name__
+            samples[name].append(time.perf_counter() - started)
+            statuses[name][str(code)] = statuses[name].get(str(code), 0) + 1
+            if code != 200:
+                errors[name] += 1
+                if name == "refresh" or code == 401:
+                    await vu.login()  # start a fresh token chain
+
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(vu, random.Random(i)) for i, vu in enumerate(vusers)))
+    elapsed = time.perf_counter() - started
+
+    operations = {}
+    for name in names:
+        operations[name] = {
+            **percentiles(samples[name]),
+            "per_s": round(len(samples[name]) / elapsed, 1),
+            "errors": errors[name],
+            "status_codes": statuses[name],
+        }
+    total = sum(len(s) for s in samples.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "requests_per_s": round(total / elapsed, 1),
+        "operations": operations,
+    }
+
+
+async def run(args, mix: dict) -> dict:
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            return await run_load(client, args, mix)
+
+    transport = httpx.ASGITransport(app=args.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+        return await run_load(client, args, mix)
+
+
+def compare(report, baseline):
+    """Print p95 and throughput deltas per operation against a previous report."""
+    print(f"\n== Compared with {baseline.get('git_revision')} ({baseline.get('generated_at')}) ==")
+    for name, stats in report["operations"].items():
+        before = baseline.get("operations", {}).get(name)
+        if not before or not before.get("count") or not stats.get("count"):
+            continue
+        p95 = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        rate = (stats["per_s"] - before["per_s"]) / before["per_s"] * 100 if before["per_s"] else 0.0
+        print(f"  {name:<8} p95 {before['p95_ms']:>8.2f} -> {stats['p95_ms']:>8.2f} ms ({p95:+.1f}%)   "
+              f"{before['per_s']:>8.1f} -> {stats['per_s']:>8.1f} /s ({rate:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test login / refresh / authenticated reads")
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--seed", action="store_true", help="With --url: create the load-test users first")
+    parser.add_argument("--database-url", help="Database to seed for --url (default DATABASE_URL)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = duration only)")
+    parser.add_argument("--mix", default="login=1,refresh=2,read=7")
+    parser.add_argument("--read-path", default="/api/v1/users/me")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    path = None
+    if args.url:
+        if args.seed:
+            engine = make_engine(args.database_url or settings.DATABASE_URL)
+            added = seed_users(sessionmaker(bind=engine), args.users)
+            engine.dispose()
+            print(f"Seeded {added} users")
+    else:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        engine = make_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        SessionFactory = sessionmaker(bind=engine)
+        seed_users(SessionFactory, args.users)
+        args.app = build_app(SessionFactory)
+        password_hashing.warm_up()
+
+    try:
+        result = asyncio.run(run(args, mix))
+    finally:
+        if path:
+            password_hashing.shutdown()
+            engine.dispose()
+            os.remove(path)
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "git_revision": git_revision(),
+        "target": args.url or "in-process",
+        "config": {
+            "users": args.users, "concurrency": args.concurrency, "duration_s": args.duration,
+            "mix": mix, "read_path": args.read_path,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS, "password_hash_workers": settings.PASSWORD_HASH_WORKERS,
+        },
+        **result,
+    }
+
+    print(f"{report['requests']} requests in {report['elapsed_s']}s ({report['requests_per_s']} req/s)")
+    for name, stats in report["operations"].items():
+        if stats["count"]:
+            print(f"  {name:<8} {stats['per_s']:>8.1f}/s  p50={stats['p50_ms']}ms  p95={stats['p95_ms']}ms  "
+                  f"p99={stats['p99_ms']}ms  errors={stats['errors']}  {stats['status_codes']}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
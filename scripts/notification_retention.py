@@ -0,0 +1,47 @@
+"""
+Run notification retention once (e.g. from cron, or the first large run
+before enabling the scheduled job), optionally compacting afterwards.
+
+Usage:
+    python -m scripts.notification_retention --dry-run
+    python -m scripts.notification_retention --days 180 --max-seconds 3600
+    python -m scripts.notification_retention --compact
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.database import SessionLocal, engine
+from app.services.notification_retention import apply_retention, compact, count_expired
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive or delete old read notifications")
+    parser.add_argument("--days", type=int, default=settings.NOTIFICATION_RETENTION_DAYS)
+    parser.add_argument("--mode", choices=("archive", "delete"), help="Default NOTIFICATION_RETENTION_MODE")
+    parser.add_argument("--batch-size", type=int, help="Rows per transaction (default NOTIFICATION_RETENTION_BATCH_SIZE)")
+    parser.add_argument("--max-seconds", type=float, help="Stop after this long (default NOTIFICATION_RETENTION_MAX_SECONDS)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be moved")
+    parser.add_argument("--compact", action="store_true", help="VACUUM / REINDEX afterwards (maintenance window)")
+    args = parser.parse_args()
+
+    cutoff = datetime.utcnow() - timedelta(days=args.days)
+    if args.dry_run:
+        with SessionLocal() as db:
+            print(json.dumps({"cutoff": cutoff.isoformat(), "expired": count_expired(db, cutoff)}, indent=2))
+        return
+
+    result = apply_retention(cutoff=cutoff, mode=args.mode, batch_size=args.batch_size, max_seconds=args.max_seconds)
+    result["timers"] = {k: v for k, v in metrics.snapshot()["timers"].items() if k.startswith("notifications.retention")}
+    if args.compact:
+        started = time.perf_counter()
+        result["compact"] = compact(engine)
+        result["compact_s"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
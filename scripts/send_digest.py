@@ -0,0 +1,37 @@
+"""
+Send the unread-notification digest once (e.g. from cron, instead of
+DIGEST_ENABLED in the app). Run it from one place only.
+
+Usage:
+    python -m scripts.send_digest
+    python -m scripts.send_digest --dry-run --batch-size 1000
+"""
+import argparse
+import json
+import sys
+import time
+
+from app.core.email_utils import smtp_configured
+from app.core.metrics import metrics
+from app.services.notification_digest import send_digests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send notification digest emails")
+    parser.add_argument("--batch-size", type=int, help="Users per batch / SMTP session (default DIGEST_BATCH_SIZE)")
+    parser.add_argument("--max-items", type=int, help="Notifications listed per email (default DIGEST_MAX_ITEMS)")
+    parser.add_argument("--dry-run", action="store_true", help="Render only: nothing is sent or marked")
+    args = parser.parse_args()
+
+    if not args.dry_run and not smtp_configured():
+        sys.exit("SMTP is not configured (EMAIL_SENDER / EMAIL_PASSWORD); use --dry-run to just render.")
+
+    started = time.perf_counter()
+    totals = send_digests(batch_size=args.batch_size, max_items=args.max_items, dry_run=args.dry_run)
+    totals["elapsed_s"] = round(time.perf_counter() - started, 2)
+    totals["timers"] = {k: v for k, v in metrics.snapshot()["timers"].items() if k.startswith("digest.")}
+    print(json.dumps(totals, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+A minimal local SMTP server for development and benchmarks.
+
+Accepts every message (plain SMTP, AUTH PLAIN accepted without checking)
+and counts what it received. It can also simulate a slow provider:
+--connect-delay is added to every new session (TLS handshake + login), and
+--fail-every N answers every Nth message with a temporary 451.
+
+Run standalone and point the app at it:
+
+    python -m scripts.smtp_stub --port 2525 --connect-delay 0.2
+    SMTP_HOST=127.0.0.1 SMTP_PORT=2525 SMTP_USE_SSL=false SMTP_AUTH=false EMAIL_SENDER=noreply@example.com ...
+
+or start StubSMTPServer in-process (see scripts/benchmark_email.py).
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        if server.connect_delay:
+            time.sleep(server.connect_delay)
+        self.reply("220 stub ESMTP ready")
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+
+            if verb == "EHLO":
+                self.reply("250-stub")
+                self.reply("250-AUTH PLAIN")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 stub")
+            elif verb == "AUTH":
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                with server.lock:
+                    server.attempts += 1
+                    failed = server.fail_every and server.attempts % server.fail_every == 0
+                    if not failed:
+                        server.messages += 1
+                self.reply("451 4.3.0 Try again later" if failed else "250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, connect_delay: float = 0.0, fail_every: int = 0):
+        super().__init__((host, port), _Handler)
+        self.connect_delay = connect_delay
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.attempts = 0
+        self.messages = 0
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="smtp-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--connect-delay", type=float, default=0.0, help="Seconds added to each new session")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth message with 451")
+    args = parser.parse_args()
+
+    server = StubSMTPServer(args.host, args.port, args.connect_delay, args.fail_every)
+    print(f"SMTP stub listening on {args.host}:{server.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"{server.connections} connections, {server.messages} messages accepted")
+
+
+if __name__ == "__main__":
+    main()